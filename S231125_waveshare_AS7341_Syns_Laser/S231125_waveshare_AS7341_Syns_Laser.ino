@@ -11,6 +11,15 @@
 #define LED_B_PIN 12                 // ich weiß nicht, wieso. Wahrscheinlich wegen der Register. Aber Pin 11 steuert die Brightness des 445 nm Lasers...
 #define SERIAL_DATA_LENGTH 18        // ein Arduino long hat maximal 10 Ziffern. Plus die 6 für den Namen, ein für das = (6+1 Prefix also) und einen für den Null Characer
 #define SERIAL_DATA_PREFIX_LENGTH 7  // SERIAL_DATA_LENGTH - SERIAL_DATA_PREFIX_LENGTH ist demnach die maximal mögliche Anzahl an Ziffern
+#define CONFIG_DATA_LENGTH 96        // mehrere Variablen in einem Frame: Name=Wert;Name=Wert... (5 * SERIAL_DATA_LENGTH + Trennzeichen)
+#define BAUD_RATE 115200
+
+// Frame: FRAME_START, Kommando, Sequenznummer, Länge der Payload, Payload, Prüfsumme (Summe von Kommando bis Payload, modulo 256)
+// Jedes Kommando außer '3' wird mit einem FRAME_ACK-Frame mit derselben Sequenznummer bestätigt (siehe ArduinoProtocol.py)
+#define FRAME_START 0x7E
+#define FRAME_ACK 0x06
+#define FRAME_NAK 0x15  // falsche Prüfsumme oder unbekanntes Kommando
+#define FRAME_MAX_PAYLOAD (CONFIG_DATA_LENGTH - 1)
 
 // PWM-Signal zwischen 0-255
 byte laser405Brightness = 0;
@@ -71,11 +80,13 @@ void osp_setup() {
   }
 
 
+// Kommandos:
 // 0: Laser aus
 // 1: Laser an
-// 2: Es wird auf Daten zum setzen von Parametern gewartet.
+// 2: eine Variable setzen (Payload Name=Wert)
+// 3: keep-alive (bei einem continuousMeasurement), wird nicht bestätigt
+// 4: mehrere Variablen setzen (Payload Name=Wert;Name=Wert)
 char mode = 'z';
-bool modeChanged = false;
 
 // default
 bool continuousMeasurement = true;
@@ -98,7 +109,8 @@ void setup() {
   enableLocks();
   // die default 115200 überschreiben, die von der Library gesetzt werden.
   // ansonsten gehen bei Processing Werte verloren.
-  Serial.begin(9600);  //115200
+  // Werte gehen nicht mehr verloren, seit jedes Kommando bestätigt und notfalls wiederholt wird
+  Serial.begin(BAUD_RATE);
 
   // // Phase-Correct PWM with duty cicle 1 over 255 https://docs.arduino.cc/tutorials/generic/secrets-of-arduino-pwm/
   // pinMode(3, OUTPUT);
@@ -131,127 +143,187 @@ void loop() {
 }
 
 
-char varSerialData[SERIAL_DATA_LENGTH];
-// the name of the value consists of the first 6 chars
-char varNameData[SERIAL_DATA_PREFIX_LENGTH];
-char varValueData[SERIAL_DATA_LENGTH - SERIAL_DATA_PREFIX_LENGTH];
+char configData[CONFIG_DATA_LENGTH];
+
+// Zustand beim Empfangen eines Frames
+enum FrameState { WAIT_START,
+                  READ_CMD,
+                  READ_SEQ,
+                  READ_LEN,
+                  READ_PAYLOAD,
+                  READ_CHECKSUM };
+FrameState frameState = WAIT_START;
+byte frameCmd = 0;
+byte frameSeq = 0;
+byte frameLen = 0;
+byte framePos = 0;
+byte frameSum = 0;
 
 /*
-  Kann auch mit Serial benutzt werden:
+  Variablen (Kommando 2 oder mehrere auf einmal mit Kommando 4):
 
   PWM405=<value>
   Del445=<value>
   Num445=<value>
   SetLED=<value> // drei Ziffern, stehehnd für RGB. 1 ist 0, 2 ist 1 usw.
+  ConMea=<value>
+  ExpDel=<value>
+
+  z. B. PWM405=<value>;Num445=<value>;Del445=<value>
 */
 
 void readSerial() {
 
-  if (!modeChanged) {
-    if (Serial.available() == 0)
+  while (Serial.available() > 0) {
+    if (receiveByte(Serial.read())) {
+      handleFrame();
       return;
+    }
+  }
+}
 
-    // // ist fünf schon zu viel?? Länge mal ausgeben lassen
-    // byte m = Serial.readBytesUntil('\n', varSerialData, 15);
-    // // clear buffer
-    // // while (Serial.available() > 0)
-    // //   Serial.read();
+// gibt true zurück, sobald ein vollständiger Frame mit korrekter Prüfsumme in frameCmd, frameSeq und configData steht
+bool receiveByte(byte b) {
 
-    // varSerialData[m] = '\0';
-    // // Serial.println(varSerialData);
+  switch (frameState) {
 
-    char newMode = Serial.read();
-    // Serial.println(newMode);
+    case WAIT_START:
+      if (b == FRAME_START)
+        frameState = READ_CMD;
+      return false;
 
+    case READ_CMD:
+      frameCmd = b;
+      frameSum = b;
+      frameState = READ_SEQ;
+      return false;
 
-    // update (bei einem continuousMeasurement)
-    if (continuousMeasurement && newMode == '3') {
-      lastUpdateTime = millis();
-      return;
-    }
+    case READ_SEQ:
+      frameSeq = b;
+      frameSum += b;
+      frameState = READ_LEN;
+      return false;
 
-    // es kann mehrmals nacheinander eine Variable gesetzt werden
-    if (newMode != mode || (mode == '2' && newMode == '2')) {
-      mode = newMode;
-      modeChanged = true;
-    }
-    return;
+    case READ_LEN:
+      if (b > FRAME_MAX_PAYLOAD) {
+        frameState = WAIT_START;
+        return false;
+      }
+      frameLen = b;
+      frameSum += b;
+      framePos = 0;
+      frameState = frameLen > 0 ? READ_PAYLOAD : READ_CHECKSUM;
+      return false;
+
+    case READ_PAYLOAD:
+      configData[framePos++] = b;
+      frameSum += b;
+      if (framePos == frameLen)
+        frameState = READ_CHECKSUM;
+      return false;
+
+    case READ_CHECKSUM:
+      frameState = WAIT_START;
+      if (b != frameSum) {
+        sendFrame(FRAME_NAK, frameSeq);
+        return false;
+      }
+      configData[frameLen] = '\0';
+      return true;
   }
+  return false;
+}
+
+void sendFrame(byte cmd, byte seq) {
+
+  byte frame[5] = { FRAME_START, cmd, seq, 0, (byte)(cmd + seq) };
+  Serial.write(frame, 5);
+}
 
-  // reset
-  modeChanged = false;
+void handleFrame() {
 
-  switch (mode) {
+  switch (frameCmd) {
 
     case '0':
+      sendFrame(FRAME_ACK, frameSeq);
+      mode = '0';
       turnLasersOff();
       break;
 
     case '1':
+      // vor dem Anschalten bestätigen, turnLasersOn kehrt erst beim Ausschalten zurück
+      sendFrame(FRAME_ACK, frameSeq);
       lastUpdateTime = millis();
-      turnLasersOn();
-      // Serial.println("turned on!");
+      // wird readSerial aus turnLasersOn aufgerufen, sind die Laser schon an
+      if (mode != '1') {
+        mode = '1';
+        turnLasersOn();
+      }
       break;
 
     case '2':
-      byte m = Serial.readBytesUntil('\n', varSerialData, SERIAL_DATA_LENGTH);
-
-      if (m < 6)
-        return;
+    case '4':
+      setVariables(configData);
+      sendFrame(FRAME_ACK, frameSeq);
+      break;
 
-      // add '\0'
-      varSerialData[m] = '\0';
-      // Serial.println(varSerialData);
+    // update (bei einem continuousMeasurement)
+    case '3':
+      if (continuousMeasurement)
+        lastUpdateTime = millis();
+      break;
 
-      varNameData[SERIAL_DATA_PREFIX_LENGTH - 1] = '\0';
-      for (int i = 0; i < SERIAL_DATA_PREFIX_LENGTH - 1; i++) {
-        varNameData[i] = varSerialData[i];
-      }
+    default:
+      sendFrame(FRAME_NAK, frameSeq);
+  }
+}
 
-      // // remove the name in the array
-      // memset(varSerialData, 0x30, SERIAL_DATA_PREFIX_LENGTH);
-      for (int i = 0; i < SERIAL_DATA_LENGTH - SERIAL_DATA_PREFIX_LENGTH - 1; i++) {
-        varValueData[i] = varSerialData[SERIAL_DATA_PREFIX_LENGTH + i];
-      }
+void setVariables(char *data) {
 
-      if (strcmp(varNameData, "PWM405") == 0) {
-        laser405Brightness = atoi(varValueData);
-        // Serial.println("Setting laser405Brightness");
-        // Serial.println(laser405Brightness, DEC);
-      } else if (strcmp(varNameData, "Del445") == 0) {
-        laser445PulseDelay = atoi(varValueData);
-        // Serial.println("Setting laser445PulseDelay");
-        // Serial.println(laser445PulseDelay, DEC);
-      } else if (strcmp(varNameData, "Num445") == 0) {
-        laser445PulseNum = atoi(varValueData);
-        if (!MODE_SWICH_445)
-          osp_setup();
-        // Serial.println("Setting laser445PulseNum");
-        // Serial.println(laser445PulseNum, DEC);
-      } else if (strcmp(varNameData, "SetLED") == 0) {
-        String data = (String)atoi(varValueData);  // z. B. 0000000222 zu 222
-        // Serial.println(data);
-        int r = data[0] - '0';
-        int g = data[1] - '0';
-        int b = data[2] - '0';
-        // 1 ist Null, weil sonst 002 zu 2 werden würde statt 002 (es soll sehr simpel sein)
-        setLED((r - 1) * 10, (g - 1) * 10, (b - 1) * 10);
-      } else if (strcmp(varNameData, "ConMea") == 0) {
-        continuousMeasurement = atoi(varValueData);
-        // Serial.println("Setting continuousMeasurement");
-        // Serial.println(continuousMeasurement);
-      } else if (strcmp(varNameData, "ExpDel") == 0) {
-        expectedDelay = atol(varValueData);
-        // Serial.println("Setting expectedDelay");
-        // Serial.println(varValueData);
-        // Serial.println(expectedDelay);
-      }
-      // reset array
-      memset(varSerialData, 0x00, SERIAL_DATA_LENGTH);
-      memset(varNameData, 0x00, SERIAL_DATA_PREFIX_LENGTH);
-      memset(varValueData, 0x00, SERIAL_DATA_LENGTH - SERIAL_DATA_PREFIX_LENGTH);
+  // Name=Wert-Paare sind durch ; getrennt
+  char *assignment = strtok(data, ";");
+  while (assignment != NULL) {
+    char *separator = strchr(assignment, '=');
+    if (separator != NULL) {
+      *separator = '\0';
+      setVariable(assignment, separator + 1);
+    }
+    assignment = strtok(NULL, ";");
+  }
+}
 
-      break;
+void setVariable(const char *varNameData, const char *varValueData) {
+  if (strcmp(varNameData, "PWM405") == 0) {
+    laser405Brightness = atoi(varValueData);
+    // Serial.println("Setting laser405Brightness");
+    // Serial.println(laser405Brightness, DEC);
+  } else if (strcmp(varNameData, "Del445") == 0) {
+    laser445PulseDelay = atoi(varValueData);
+    // Serial.println("Setting laser445PulseDelay");
+    // Serial.println(laser445PulseDelay, DEC);
+  } else if (strcmp(varNameData, "Num445") == 0) {
+    laser445PulseNum = atoi(varValueData);
+    if (!MODE_SWICH_445)
+      osp_setup();
+    // Serial.println("Setting laser445PulseNum");
+    // Serial.println(laser445PulseNum, DEC);
+  } else if (strcmp(varNameData, "SetLED") == 0) {
+    String data = (String)atoi(varValueData);  // z. B. 0000000222 zu 222
+    // Serial.println(data);
+    int r = data[0] - '0';
+    int g = data[1] - '0';
+    int b = data[2] - '0';
+    // 1 ist Null, weil sonst 002 zu 2 werden würde statt 002 (es soll sehr simpel sein)
+    setLED((r - 1) * 10, (g - 1) * 10, (b - 1) * 10);
+  } else if (strcmp(varNameData, "ConMea") == 0) {
+    continuousMeasurement = atoi(varValueData);
+    // Serial.println("Setting continuousMeasurement");
+    // Serial.println(continuousMeasurement);
+  } else if (strcmp(varNameData, "ExpDel") == 0) {
+    expectedDelay = atol(varValueData);
+    // Serial.println("Setting expectedDelay");
+    // Serial.println(varValueData);
+    // Serial.println(expectedDelay);
   }
 }
 
@@ -0,0 +1,109 @@
+import time
+
+import numpy as np
+
+
+class AcquisitionScheduler:
+    """Taktet die Phasen einer Wiederholung über absolute Deadlines statt über aneinandergereihte time.sleep.
+
+    Jede Phase hat eine geplante Dauer. Die Deadlines werden vom Start der Messung aus mit
+    time.perf_counter_ns berechnet, Verzögerungen (Treiber, Python, Arduino) summieren sich
+    also nicht auf. Phasen, die nicht kürzer werden dürfen (z. B. die Bestrahlung), dauern
+    mindestens ihre geplante Zeit. Verspätungen werden von den übrigen Phasen (vor allem
+    MEASUREMENT_DELAY) aufgefangen, sodass die Wiederholungsperiode konstant bleibt.
+
+        scheduler.begin_repetition()
+        ...  # Arduino
+        scheduler.end_phase()  # wartet bis zur Deadline der Phase
+    """
+
+    # die letzte Millisekunde vor einer Deadline wird aktiv gewartet (time.sleep ist zu ungenau)
+    SPIN_NS = 1_000_000
+
+    def __init__(self, phases, repetitions):
+        """phases: Liste aus (Name, geplante Dauer in ms, ob die Phase kürzer werden darf)."""
+
+        self.names = [phase[0] for phase in phases]
+        self.durations_ns = [int(phase[1] * 1_000_000) for phase in phases]
+        self.compressible = [phase[2] for phase in phases]
+        self.period_ns = sum(self.durations_ns)
+
+        # tatsächlicher Beginn, geplantes und tatsächliches Ende jeder Phase, relativ zum Start der Messung
+        self.started = np.zeros((repetitions, len(phases)), dtype=np.int64)
+        self.planned = np.zeros((repetitions, len(phases)), dtype=np.int64)
+        self.actual = np.zeros((repetitions, len(phases)), dtype=np.int64)
+
+        self.start_ns = None
+        self.next_start_ns = None
+        self.repetition = -1
+
+    @staticmethod
+    def wait_until(deadline_ns):
+        remaining = deadline_ns - time.perf_counter_ns()
+        if remaining > AcquisitionScheduler.SPIN_NS:
+            time.sleep((remaining - AcquisitionScheduler.SPIN_NS) / 1e9)
+        while time.perf_counter_ns() < deadline_ns:
+            pass
+
+    def begin_repetition(self):
+        now = time.perf_counter_ns()
+        if self.start_ns is None:
+            self.start_ns = now
+            self.next_start_ns = now
+        # mehr als eine ganze Periode zu spät: neu ausrichten, statt Wiederholungen ohne Pause nachzuholen
+        elif now - self.next_start_ns > self.period_ns:
+            self.next_start_ns = now
+
+        AcquisitionScheduler.wait_until(self.next_start_ns)
+
+        self.repetition += 1
+        self.phase = 0
+        self.deadline_ns = self.next_start_ns
+        self.phase_start_ns = time.perf_counter_ns()
+        self.next_start_ns += self.period_ns
+
+    def end_phase(self):
+        """Wartet bis zur Deadline der aktuellen Phase und protokolliert die tatsächliche Zeit."""
+
+        duration = self.durations_ns[self.phase]
+        self.deadline_ns += duration
+        target = (
+            self.deadline_ns
+            if self.compressible[self.phase]
+            else max(self.deadline_ns, self.phase_start_ns + duration)
+        )
+        AcquisitionScheduler.wait_until(target)
+
+        end = time.perf_counter_ns()
+        self.started[self.repetition][self.phase] = self.phase_start_ns - self.start_ns
+        self.planned[self.repetition][self.phase] = self.deadline_ns - self.start_ns
+        self.actual[self.repetition][self.phase] = end - self.start_ns
+        self.phase_start_ns = end
+        self.phase += 1
+
+    def report(self):
+        """Gibt Jitter-Statistiken der bisherigen Wiederholungen aus."""
+
+        n = self.repetition + 1
+        if n < 1:
+            return
+
+        planned = self.planned[:n] / 1e6
+        actual = self.actual[:n] / 1e6
+        durations = actual - self.started[:n] / 1e6
+        lateness = actual - planned
+        print(f"planned period: {self.period_ns / 1e6:.3f} ms")
+
+        print("phase: duration mean/std/max (ms) | lateness mean/max (ms)")
+        for k, name in enumerate(self.names):
+            print(
+                f"  {name}: {np.mean(durations[:, k]):.3f} / {np.std(durations[:, k]):.3f} / {np.max(durations[:, k]):.3f}"
+                + f" | {np.mean(lateness[:, k]):.3f} / {np.max(lateness[:, k]):.3f}"
+            )
+
+        if n > 1:
+            periods = np.diff(actual[:, -1])
+            print(
+                f"actual period: {np.mean(periods):.3f} ms, jitter (std): {np.std(periods):.3f} ms,"
+                + f" min: {np.min(periods):.3f} ms, max: {np.max(periods):.3f} ms"
+            )
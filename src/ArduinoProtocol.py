@@ -0,0 +1,156 @@
+import time
+
+
+class ArduinoError(RuntimeError):
+    pass
+
+
+class ArduinoProtocol:
+    """Framed Protokoll zum Arduino (siehe S231125_waveshare_AS7341_Syns_Laser.ino).
+
+    Ein Frame besteht aus START, Kommando, Sequenznummer, Länge der Payload, Payload und
+    einer Prüfsumme (Summe von Kommando bis Payload, modulo 256). Der Arduino bestätigt jedes
+    Kommando außer dem keep-alive mit einem ACK-Frame mit derselben Sequenznummer. Statt
+    ARDUINO_DELAY blind abzuwarten, wird also nur so lange gewartet, bis die Bestätigung da ist.
+    Kommt keine (oder ein NAK), wird das Kommando wiederholt. Alle Kommandos sind idempotent.
+
+        protocol.send(ArduinoProtocol.LASER_ON)
+        protocol.send(ArduinoProtocol.SET_VARIABLES, b"PWM405=20;Num445=3")
+    """
+
+    BAUDRATE = 115200
+
+    START = 0x7E
+    ACK = 0x06
+    NAK = 0x15
+    # CONFIG_DATA_LENGTH - 1 im Arduino-Code
+    MAX_PAYLOAD = 95
+
+    LASER_OFF = ord("0")
+    LASER_ON = ord("1")
+    SET_VARIABLE = ord("2")
+    KEEPALIVE = ord("3")
+    SET_VARIABLES = ord("4")
+
+    def __init__(self, port, ack_timeout=0.5, retries=3):
+        """port: ein serial.Serial (oder etwas mit write und read)."""
+
+        self.port = port
+        self.ack_timeout = ack_timeout
+        self.retries = retries
+        self.seq = 0
+        # empfangene, noch nicht verarbeitete Bytes
+        self.buffer = bytearray()
+
+        # Statistik (siehe report)
+        self.acked = 0
+        self.retransmissions = 0
+        self.naks = 0
+        self.round_trip_sum = 0.0
+        self.round_trip_max = 0.0
+
+    @staticmethod
+    def checksum(data):
+        return sum(data) & 0xFF
+
+    @staticmethod
+    def encode(cmd, seq, payload=b""):
+        if len(payload) > ArduinoProtocol.MAX_PAYLOAD:
+            raise ValueError(
+                f"Payload zu lang ({len(payload)} > {ArduinoProtocol.MAX_PAYLOAD} Bytes): {payload}"
+            )
+        body = bytes([cmd, seq, len(payload)]) + payload
+        return (
+            bytes([ArduinoProtocol.START])
+            + body
+            + bytes([ArduinoProtocol.checksum(body)])
+        )
+
+    def read_frame(self, deadline):
+        """Liest den nächsten gültigen Frame. Gibt (Kommando, Sequenznummer, Payload) zurück oder None nach der deadline."""
+
+        while True:
+            frame = self.parse_frame()
+            if frame is not None:
+                return frame
+            if time.perf_counter() >= deadline:
+                return None
+            self.buffer += self.port.read(1)
+
+    def parse_frame(self):
+        """Sucht im Empfangspuffer nach einem vollständigen Frame mit korrekter Prüfsumme."""
+
+        while True:
+            start = self.buffer.find(self.START)
+            if start < 0:
+                self.buffer.clear()
+                return None
+            del self.buffer[:start]
+            if len(self.buffer) < 4:
+                return None
+
+            length = self.buffer[3]
+            if length > self.MAX_PAYLOAD:
+                # kein Frame-Anfang, ab dem nächsten Byte weitersuchen
+                del self.buffer[:1]
+                continue
+            if len(self.buffer) < length + 5:
+                return None
+
+            frame = bytes(self.buffer[: length + 5])
+            if self.checksum(frame[1:-1]) != frame[-1]:
+                del self.buffer[:1]
+                continue
+            del self.buffer[: length + 5]
+            return frame[1], frame[2], frame[4:-1]
+
+    def send(self, cmd, payload=b"", wait=True):
+        """Sendet ein Kommando und wartet auf die Bestätigung. Gibt die Round-Trip-Zeit in ms zurück.
+
+        Das keep-alive wird nicht bestätigt, ebenso wird mit wait=False nicht gewartet (dann wird 0 zurückgegeben).
+        """
+
+        self.seq = (self.seq + 1) % 256
+        frame = self.encode(cmd, self.seq, payload)
+
+        if cmd == self.KEEPALIVE or not wait:
+            self.port.write(frame)
+            return 0.0
+
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                self.retransmissions += 1
+            start = time.perf_counter()
+            self.port.write(frame)
+
+            deadline = start + self.ack_timeout
+            while True:
+                response = self.read_frame(deadline)
+                if response is None:
+                    break
+                response_cmd, response_seq, _ = response
+                # verspätete Antworten auf frühere Kommandos ignorieren
+                if response_seq != self.seq:
+                    continue
+                if response_cmd == self.NAK:
+                    self.naks += 1
+                    break
+                if response_cmd == self.ACK:
+                    round_trip = (time.perf_counter() - start) * 1000
+                    self.acked += 1
+                    self.round_trip_sum += round_trip
+                    self.round_trip_max = max(self.round_trip_max, round_trip)
+                    return round_trip
+
+        raise ArduinoError(
+            f"Der Arduino hat Kommando {chr(cmd)} (seq {self.seq}, payload {payload}) nach {self.retries + 1} Versuchen nicht bestätigt."
+        )
+
+    def report(self):
+        if self.acked == 0:
+            return
+        print(
+            f"arduino: {self.acked} acked, {self.retransmissions} retransmissions, {self.naks} NAKs,"
+            + f" round trip mean/max: {self.round_trip_sum / self.acked:.3f} / {self.round_trip_max:.3f} ms",
+            flush=True,
+        )
@@ -0,0 +1,102 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import matplotlib.image
+import numpy as np
+from PIL import Image
+
+
+class FigureExporter:
+    """Speichert die Figuren von Laserplot.plot_results: einmal rendern, parallel als PNG kodieren.
+
+    export rendert die Figur einmal mit der höchsten DPI aus targets in einen RGBA-Puffer
+    (wie savefig, also auch mit bbox "tight" aus scienceplots). Das Komprimieren der PNGs
+    übernimmt ein Thread-Pool (zlib gibt den GIL frei), während matplotlib schon die nächste
+    Figur rendert. Targets mit kleinerer DPI werden aus dem gleichen Puffer verkleinert:
+
+        exporter = FigureExporter(targets=(("", 600), ("_preview", 150)), vector_formats=("pdf",))
+        saved = exporter.export(fig, "messungen/.../titel")  # titel.png, titel_preview.png, titel.pdf
+        exporter.wait()  # erst danach sind alle PNGs geschrieben
+
+    Vektorformate (pdf, svg, ...) brauchen ein eigenes Backend und werden direkt mit savefig
+    gespeichert.
+    """
+
+    def __init__(self, targets=(("", 600),), vector_formats=(), max_workers=None):
+        # (Suffix des Dateinamens, DPI), das erste Target ist das Bild, auf das plots/ verlinkt
+        self.targets = tuple(targets)
+        self.vector_formats = tuple(vector_formats)
+        # der Haupt-Thread rendert, die übrigen Kerne kodieren. Bei 0 wird direkt in export kodiert
+        self.max_workers = (
+            min(4, (os.cpu_count() or 1) - 1) if max_workers is None else max_workers
+        )
+        self.executor = None
+        self.futures = []
+
+    def __repr__(self):
+        return f"FigureExporter(targets={self.targets}, vector_formats={self.vector_formats})"
+
+    class RGBABuffer(io.RawIOBase):
+        """Nimmt den Puffer von savefig(format="raw") als Array (Zeilen, Spalten, RGBA) entgegen."""
+
+        def writable(self):
+            return True
+
+        def write(self, data):
+            # Agg schreibt den Puffer des Renderers als memoryview mit seiner Form (kopieren, der Puffer wird wiederverwendet)
+            self.rgba = np.array(data)
+            return self.rgba.nbytes
+
+    @staticmethod
+    def render(fig, dpi):
+        buffer = FigureExporter.RGBABuffer()
+        fig.savefig(buffer, format="raw", dpi=dpi)
+        return buffer.rgba
+
+    @staticmethod
+    def encode(rgba, path, dpi, scale):
+        if scale != 1:
+            image = Image.fromarray(rgba)
+            size = (
+                max(1, round(image.width * scale)),
+                max(1, round(image.height * scale)),
+            )
+            rgba = np.asarray(image.resize(size, Image.Resampling.BOX))
+        # wie savefig (print_png), also mit den gleichen Metadaten
+        matplotlib.image.imsave(path, rgba, format="png", dpi=dpi)
+        os.chmod(path, 0o777)
+
+    def export(self, fig, file_name):
+        """Speichert fig als file_name + Suffix + ".png" für jedes Target und in den Vektorformaten. Gibt die Pfade zurück."""
+
+        saved = []
+        max_dpi = max(dpi for _, dpi in self.targets)
+        rgba = FigureExporter.render(fig, max_dpi)
+
+        if self.executor is None and self.max_workers > 0:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        for suffix, dpi in self.targets:
+            path = file_name + suffix + ".png"
+            # absolut, plot_results wechselt für die Symlinks das Arbeitsverzeichnis, während die Threads schreiben
+            args = (rgba, os.path.abspath(path), dpi, dpi / max_dpi)
+            if self.executor is None:
+                FigureExporter.encode(*args)
+            else:
+                self.futures.append(self.executor.submit(FigureExporter.encode, *args))
+            saved.append(path)
+
+        for vector_format in self.vector_formats:
+            path = file_name + "." + vector_format
+            fig.savefig(path, format=vector_format)
+            os.chmod(path, 0o777)
+            saved.append(path)
+
+        return saved
+
+    def wait(self):
+        """Wartet, bis alle PNGs geschrieben sind. Fehler beim Kodieren werden hier geworfen."""
+
+        futures, self.futures = self.futures, []
+        for future in futures:
+            future.result()
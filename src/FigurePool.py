@@ -0,0 +1,107 @@
+import matplotlib.pyplot as plt
+
+
+class FigurePool:
+    """Verwendet die Figuren von Laserplot.plot_results über mehrere Aufrufe wieder.
+
+    Pro Art von Plot (REUSED) wird eine Figur behalten. get(kind) gibt sie zurück, nachdem
+    die Graphen, die Legende und die Achsengrenzen des letzten Plots entfernt wurden, statt
+    jedes Mal eine neue Figur mit Achsen, Ticks und Style zu erstellen:
+
+        fig, ax = pool.get("neutral")
+        ...
+        fig.savefig(...)
+        pool.release()  # die Figuren sind beim nächsten get wieder frei
+
+    Damit der Speicher eines Workers (generate_plots) nicht wächst, wird eine Figur nach
+    max_uses Plots geschlossen und neu erstellt, close() schließt alle.
+    """
+
+    KINDS = ("neutral", "colorful", "3d", "time")
+    # eine geleerte 3D-Achse (clear) behält Zustand vom letzten Plot, die Bilder hängen dann davon
+    # ab, was der Worker davor geplottet hat. 3D-Figuren werden deshalb jedes Mal neu erstellt.
+    REUSED = ("neutral", "colorful", "time")
+    SUBPLOT_KW = {"3d": {"projection": "3d"}}
+
+    def __init__(self, max_uses=50):
+        self.max_uses = max_uses
+        # kind -> Figur, die gerade nicht benutzt wird
+        self.free = {}
+        # (kind, Figur), die seit dem letzten release benutzt werden
+        self.used = []
+        self.uses = {}
+
+    def get(self, kind):
+        if kind not in self.KINDS:
+            raise ValueError(f"unknown kind {kind}")
+
+        fig = self.free.pop(kind, None)
+        # z. B. wurde das Fenster von plt.show geschlossen
+        if fig is not None and (
+            not plt.fignum_exists(fig.number) or self.uses[fig] >= self.max_uses
+        ):
+            self.discard(fig)
+            fig = None
+
+        if fig is None:
+            fig, ax = plt.subplots(subplot_kw=self.SUBPLOT_KW.get(kind))
+            self.uses[fig] = 0
+        else:
+            ax = fig.axes[0]
+            FigurePool.reset(ax)
+            # wie bei plt.subplots die aktuelle Figur (für plt.draw usw.)
+            plt.figure(fig.number)
+
+        self.uses[fig] += 1
+        self.used.append((kind, fig))
+        return fig, ax
+
+    @staticmethod
+    def reset(ax):
+        """Entfernt die Graphen und die Legende und setzt die Achsengrenzen zurück, Achsen und Ticks bleiben."""
+
+        # constrained layout geht von der aktuellen Position aus und kommt sonst nicht immer zum
+        # gleichen Ergebnis wie bei einer neuen Figur (set_position nimmt die Achse aus dem Layout)
+        ax.set_position(ax.get_subplotspec().get_position(ax.figure))
+        ax.set_in_layout(True)
+
+        for artist in [*ax.lines, *ax.collections, *ax.images, *ax.patches, *ax.texts]:
+            artist.remove()
+        if ax.get_legend() is not None:
+            ax.get_legend().remove()
+
+        # wie eine neue Achse: die Grenzen kommen wieder aus den Daten (set_xlim schaltet das aus)
+        ax.relim()
+        ax.ignore_existing_data_limits = True
+        ax.set_autoscale_on(True)
+        ax.set_xmargin(plt.rcParams["axes.xmargin"])
+        ax.set_ymargin(plt.rcParams["axes.ymargin"])
+
+    def release(self):
+        for kind, fig in self.used:
+            if kind not in self.REUSED or kind in self.free:
+                self.discard(fig)
+            else:
+                self.free[kind] = fig
+        self.used = []
+
+    def discard(self, fig):
+        plt.close(fig)
+        self.uses.pop(fig, None)
+
+    def figures(self):
+        return list(self.free.values()) + [fig for _, fig in self.used]
+
+    def close_others(self):
+        """Schließt alle Figuren von pyplot, die nicht zum Pool gehören."""
+
+        own = {fig.number for fig in self.figures()}
+        for number in plt.get_fignums():
+            if number not in own:
+                plt.close(number)
+
+    def close(self):
+        for fig in self.figures():
+            self.discard(fig)
+        self.free = {}
+        self.used = []
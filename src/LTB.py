@@ -125,6 +125,20 @@ class LTB:
             )
             return instance
         except serial.SerialException:
+            pass
+
+        try:
+            # simulierter Laser an einem Pseudo-Terminal, spricht dasselbe Protokoll
+            from VirtualLTBDevice import VirtualLTBDevice
+
+            instance.device = VirtualLTBDevice(baudrate)
+            instance.ser = serial.Serial(
+                port=instance.device.port, baudrate=baudrate, timeout=timeout
+            )
+            print("using virtual LTB LASER (pty)")
+            return instance
+        except ImportError:
+            # kein pty (z. B. unter Windows)
             print("using virtual LTB LASER")
             from VirtualLTB import LTB as VirtualLTB
 
@@ -191,7 +205,7 @@ class LTB:
             if da != self.SA or sa != self.DA:
                 raise LaserProtocolError("Invalid address in reply")
             return {"type": "Reply", "data": data}
-        elif response.startswith("\x1B\x1B"):
+        elif response.startswith("\x1b\x1b"):
             error_type = response[2] if len(response) > 2 else "Unknown"
             error_messages = {
                 "1": "Checksum Error",
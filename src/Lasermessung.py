@@ -1,11 +1,23 @@
 from multiprocessing import Process
-from Laserplot import Laserplot
+
+# Laserplot (und damit matplotlib, scienceplots und scipy) wird erst beim ersten Plot importiert (siehe get_plot),
+# die Live-GUI läuft in einem eigenen Prozess (siehe LiveViewer)
 from PlottingSettings import PlottingSettings
 
 from NKT import NKT
 from LTB import LTB
 
 from MeasurementSettings import MeasurementSettings
+from MeasurementRecorder import MeasurementRecorder
+from MeasurementReader import MeasurementReader
+from MeasurementSummary import MeasurementSummary
+from SpectrumRingBuffer import SpectrumRingBuffer
+from AcquisitionScheduler import AcquisitionScheduler
+from PhaseTimings import PhaseTimings
+from ArduinoProtocol import ArduinoProtocol
+from SpectrometerReader import SpectrometerReader
+from Messdata import Messdata
+from LiveViewer import LiveViewer
 
 import traceback
 import serial
@@ -15,37 +27,37 @@ import time
 import datetime
 import numpy as np
 import threading
+import signal
+import copy
+from math import ceil
+from dataclasses import fields
 
 np.set_printoptions(suppress=True)
 
-# Formatierung von Fehlern
-try:
-    from IPython.core import ultratb
-
-    sys.excepthook = ultratb.FormattedTB(
-        color_scheme="Linux", call_pdb=False  # mode="Verbose",
-    )
-except Exception as e:
-    print(f"Failed to load IPython for the formatting of errors: {e}")
 
+# Formatierung von Fehlern. IPython wird erst beim ersten Fehler importiert, der Import dauert länger als der Rest zusammen
+def excepthook(*args):
+    try:
+        from IPython.core import ultratb
 
-class Messdata:
-    def __init__(self, num_gradiants, repetitions, wav):
-        self.measurements = np.zeros(
-            (num_gradiants, repetitions, len(wav)), dtype=float
+        sys.excepthook = ultratb.FormattedTB(
+            color_scheme="Linux", call_pdb=False  # mode="Verbose",
         )
-        self.timestamps = np.zeros((num_gradiants, repetitions), dtype=float)
-        self.wav = wav
-        self.curr_gradiant = -1
-        self.curr_measurement_index = -1
+    except Exception as e:
+        print(f"Failed to load IPython for the formatting of errors: {e}")
+        sys.excepthook = sys.__excepthook__
+    sys.excepthook(*args)
 
-    def get_data(self):
-        return self.measurements, self.wav, self.curr_measurement_index
+
+sys.excepthook = excepthook
 
 
 class Lasermessung:
     """Wrapper für die Durchführung von Lasermessungen."""
 
+    # Auslesen eines Spektrums nach der Belichtung, grob geschätzt (wie in VirtualSpectrometer)
+    READOUT_MS = 2
+
     def is_docker(self):
         from pathlib import Path
 
@@ -88,6 +100,9 @@ class Lasermessung:
         self.DEBUG = DEBUG
 
         self.MEASUREMENT_SETTINGS = MEASUREMENT_SETTINGS
+        # zuletzt an die Geräte gesendete Werte, z. B. ("nkt", "pulse_frequency") (siehe set_laser_powers)
+        self.sent_values = {}
+        self.nkt_max_frequency = None
         self.spectrometer_setup()
         self.arduino_setup(arduino_path, 3)  # 1 ist definitiv zu kurz (getestet)
 
@@ -108,82 +123,115 @@ class Lasermessung:
         # aktuell noch keine Output-Power
         self.led_green()
 
-    def set_laser_powers(self, index):
+    def set_laser_powers(self, index, only_changed=True):
+        """Setzt die Parameter der Laser für den Gradienten index.
 
-        self.set_arduino_variable(
-            "PWM405", self.MEASUREMENT_SETTINGS.laser.INTENSITY_405[index]
-        )
-        self.set_arduino_variable(
-            "Num445", self.MEASUREMENT_SETTINGS.laser.NUM_PULSES_445[index]
-        )
-        self.set_arduino_variable(
-            "Del445", self.MEASUREMENT_SETTINGS.laser.PULSE_DELAY_445[index]
-        )
-        self.set_arduino_variable(
-            "ConMea", int(self.MEASUREMENT_SETTINGS.laser.CONTINOUS)
-        )
-        self.set_arduino_variable(
-            "ExpDel",
-            (
-                self.MEASUREMENT_SETTINGS.laser.MEASUREMENT_DELAY
-                + (
-                    self.MEASUREMENT_SETTINGS.laser.IRRADITION_TIME
-                    + self.MEASUREMENT_SETTINGS.laser.ARDUINO_DELAY * 2
-                    if not self.MEASUREMENT_SETTINGS.laser.CONTINOUS
-                    else 0
-                )
-                + self.MEASUREMENT_SETTINGS.specto.INTTIME
-                + self.MEASUREMENT_SETTINGS.WATCHDOG_GRACE
-            ),
-        )
+        Die Arduino-Variablen werden in einem einzigen Frame gesendet. Mit only_changed werden
+        nur Werte gesendet, die sich seit dem letzten Aufruf geändert haben.
+        """
 
-        print(
-            "Watchdog gesetzt auf: "
-            + str(
-                self.MEASUREMENT_SETTINGS.laser.MEASUREMENT_DELAY
-                + (
-                    self.MEASUREMENT_SETTINGS.laser.IRRADITION_TIME
-                    + self.MEASUREMENT_SETTINGS.laser.ARDUINO_DELAY * 2
-                    if not self.MEASUREMENT_SETTINGS.laser.CONTINOUS
-                    else 0
-                )
-                + self.MEASUREMENT_SETTINGS.specto.INTTIME
-                + self.MEASUREMENT_SETTINGS.WATCHDOG_GRACE
+        expected_delay = (
+            self.MEASUREMENT_SETTINGS.laser.MEASUREMENT_DELAY
+            + (
+                self.MEASUREMENT_SETTINGS.laser.IRRADITION_TIME
+                + self.MEASUREMENT_SETTINGS.laser.ARDUINO_DELAY * 2
+                if not self.MEASUREMENT_SETTINGS.laser.CONTINOUS
+                else 0
             )
+            + self.MEASUREMENT_SETTINGS.specto.INTTIME
+            + self.MEASUREMENT_SETTINGS.WATCHDOG_GRACE
+        )
+
+        self.set_arduino_variables(
+            {
+                "PWM405": self.MEASUREMENT_SETTINGS.laser.INTENSITY_405[index],
+                "Num445": self.MEASUREMENT_SETTINGS.laser.NUM_PULSES_445[index],
+                "Del445": self.MEASUREMENT_SETTINGS.laser.PULSE_DELAY_445[index],
+                "ConMea": int(self.MEASUREMENT_SETTINGS.laser.CONTINOUS),
+                "ExpDel": expected_delay,
+            },
+            only_changed,
         )
 
-        max_freq = self.nkt.get_register("max_frequency")  # 21502
-        print(f"max freq is {max_freq}")
+        print("Watchdog gesetzt auf: " + str(expected_delay))
+
+        # ändert sich nicht, also nur einmal abfragen
+        if self.nkt_max_frequency is None:
+            self.nkt_max_frequency = self.nkt.get_register("max_frequency")  # 21502
+            print(f"max freq is {self.nkt_max_frequency}")
         # um auch Bruchteile zu erlauben
         freq = int(
-            max_freq / 100 * self.MEASUREMENT_SETTINGS.laser.INTENSITY_NKT[index]
+            self.nkt_max_frequency
+            / 100
+            * self.MEASUREMENT_SETTINGS.laser.INTENSITY_NKT[index]
+        )
+        self.send_if_changed(
+            ("nkt", "pulse_frequency"),
+            freq,
+            lambda value: self.nkt.set_register("pulse_frequency", value),
+            only_changed,
+        )
+        self.send_if_changed(
+            ("nkt", "operating_mode"),
+            4,  # external trigger high signl
+            lambda value: self.nkt.set_register("operating_mode", value),
+            only_changed,
         )
-        self.nkt.set_register("pulse_frequency", freq)
-        print(f"Frequenz auf {freq} gesetzt.")
-        self.nkt.set_register("operating_mode", 4)  # external trigger high signl
 
-        self.ltb.set_hv_voltage(self.MEASUREMENT_SETTINGS.laser.INTENSITY_LTB[index])
-        self.ltb.set_repetition_rate(
-            self.MEASUREMENT_SETTINGS.laser.REPETITIONS_LTB[index]
+        self.send_if_changed(
+            ("ltb", "hv_voltage"),
+            self.MEASUREMENT_SETTINGS.laser.INTENSITY_LTB[index],
+            self.ltb.set_hv_voltage,
+            only_changed,
         )
+        self.send_if_changed(
+            ("ltb", "repetition_rate"),
+            self.MEASUREMENT_SETTINGS.laser.REPETITIONS_LTB[index],
+            self.ltb.set_repetition_rate,
+            only_changed,
+        )
+
+    def send_if_changed(self, key, value, send, only_changed=True):
+        """Ruft send(value) auf, außer der Wert wurde zuletzt schon gesetzt."""
+        if only_changed and key in self.sent_values and self.sent_values[key] == value:
+            return
+        send(value)
+        self.sent_values[key] = value
 
     def arduino_setup(self, port, wait):
+        """Verbindet sich mit dem Arduino. Nur im debug-mode (ohne Spektrometer) wird ersatzweise der VirtualArduino genutzt."""
+        self.virtual_arduino = None
         try:
-            """Verbindet sich mit dem Arduino."""
-            self.arduino = serial.Serial(port=port, baudrate=9600, timeout=5)
+            # kurzes Timeout, damit ArduinoProtocol.read_frame die Deadline einhalten kann
+            connection = serial.Serial(
+                port=port, baudrate=ArduinoProtocol.BAUDRATE, timeout=0.05
+            )
             # auf den Arduino warten
             time.sleep(wait)
-            self.arduino.flush()
+            connection.flush()
         except serial.serialutil.SerialException as e:
-            print(f"Failed to connect to the Arduino: {e}")
-
-            class Arduino:
-                def write(self, value):
-                    pass
+            # mit dem echten Spektrometer wäre es sonst eine echte Messung mit simulierten Lasern
+            if not self.DEBUG:
+                raise RuntimeError(f"Failed to connect to the Arduino: {e}") from e
+            # roter Text (31m Red color code), damit es nicht übersehen wird
+            print(
+                f"\033[31mFailed to connect to the Arduino: {e}\n"
+                + "debug-mode: using the VIRTUAL Arduino, the lasers are simulated\033[0m",
+                flush=True,
+            )
+            from VirtualArduino import VirtualArduino
+
+            # simuliert den Sketch (inkl. Watchdog) an einem Pseudo-Terminal
+            self.virtual_arduino = VirtualArduino()
+            connection = serial.Serial(
+                port=self.virtual_arduino.port,
+                baudrate=ArduinoProtocol.BAUDRATE,
+                timeout=0.05,
+            )
 
-            self.arduino = Arduino()
+        self.arduino = ArduinoProtocol(connection)
 
-    def set_arduino_variable(self, name, value):
+    def check_arduino_variable(self, name, value):
         if (
             len(str(value)) > 5 and "ExpDel" not in name
         ):  # int hat fünf chars als Maximum der Dezimalschreibweise. ExpDel ist schon auf long umgestellt (zehn Chars)
@@ -196,23 +244,40 @@ class Lasermessung:
                 f"Die Länge des Namens ist aktuell auf drei Chars gestellt. {name} auf {value} zu setzen ist daher wahrscheinlich eine schlechte Idee.",
                 flush=True,
             )
-        # 2 ist der Char-Code für "Variable setzen" (siehe Arduino-Code)
-        self.arduino.write(f"2{name}={value}\n".encode())
-        time.sleep(self.MEASUREMENT_SETTINGS.laser.ARDUINO_DELAY / 1000.0)
+
+    def set_arduino_variable(self, name, value):
+        self.check_arduino_variable(name, value)
+        self.arduino.send(ArduinoProtocol.SET_VARIABLE, f"{name}={value}".encode())
+
+    def set_arduino_variables(self, values, only_changed=True):
+        """Setzt mehrere Variablen mit einem Frame (Name=Wert;Name=Wert) und wartet auf die Bestätigung des Arduinos."""
+
+        values = {
+            name: value
+            for name, value in values.items()
+            if not only_changed or self.sent_values.get(("arduino", name)) != value
+        }
+        if not values:
+            return
+
+        for name, value in values.items():
+            self.check_arduino_variable(name, value)
+        payload = ";".join(f"{name}={value}" for name, value in values.items())
+        self.arduino.send(ArduinoProtocol.SET_VARIABLES, payload.encode())
+
+        for name, value in values.items():
+            self.sent_values[("arduino", name)] = value
 
     def send_arduino_signal(self, signal):
-        self.arduino.write(str(signal).encode())
-        time.sleep(self.MEASUREMENT_SETTINGS.laser.ARDUINO_DELAY / 1000.0)
+        self.arduino.send(ord(str(signal)))
 
-    def turn_on_laser(self):
-        """Sendet eine Eins als Byte zum Arduino, welche ein Anschalten der Laser signalisiert."""
-        self.arduino.write(b"1")
-        time.sleep(self.MEASUREMENT_SETTINGS.laser.ARDUINO_DELAY / 1000.0)
+    def turn_on_laser(self, wait=True):
+        """Sendet dem Arduino das Kommando zum Anschalten der Laser und wartet (mit wait) auf die Bestätigung."""
+        self.arduino.send(ArduinoProtocol.LASER_ON, wait=wait)
 
-    def turn_off_laser(self):
-        """Sendet eine Null als Byte zum Arduino, welche ein Ausschalten der Laser signalisiert."""
-        self.arduino.write(b"0")
-        time.sleep(self.MEASUREMENT_SETTINGS.laser.ARDUINO_DELAY / 1000.0)
+    def turn_off_laser(self, wait=True):
+        """Sendet dem Arduino das Kommando zum Ausschalten der Laser und wartet (mit wait) auf die Bestätigung."""
+        self.arduino.send(ArduinoProtocol.LASER_OFF, wait=wait)
 
     def spectrometer_setup(self):
         """Verbindet sich mit dem Spektrometer."""
@@ -279,6 +344,8 @@ class Lasermessung:
         # manuelles triggern erlauben und (vorsichtshalber) die power runterstellen.
         self.nkt.set_register("power", 1)
         self.nkt.set_register("operating_mode", 0)  # internal trigger
+        # der Zustand der Geräte ist danach unbekannt, beim nächsten Gradienten also alles neu senden
+        self.sent_values.clear()
         # Spektrometer freigeben
         self.sn.reset(self.spectrometer)
         self.led_green()
@@ -287,13 +354,20 @@ class Lasermessung:
         """Misst die Zeit, die ein Messvorgang dauert."""
 
         seconds_list = [time.time()]
+        timings = PhaseTimings(1, iters)
 
-        for _ in range(iters):
+        for i in range(iters):
+            timings.begin(0, i)
             self.turn_on_laser()
+            timings.lap("arduino_write")
             time.sleep(self.MEASUREMENT_SETTINGS.laser.IRRADITION_TIME / 1000.0)
+            timings.lap("laser_on")
             self.get_data()
+            timings.lap("read")
             self.turn_off_laser()
+            timings.lap("arduino_write")
             time.sleep(self.MEASUREMENT_SETTINGS.laser.MEASUREMENT_DELAY / 1000.0)
+            timings.lap("sleep")
             # print(i)
             seconds_list.append(time.time())
 
@@ -302,9 +376,9 @@ class Lasermessung:
         )
 
         print(f"measurements took: {total_time_millis} ms")
+        # die Arduino-Kommandos sind keine Wartezeit mehr, sondern Round-Trips (siehe ArduinoProtocol)
         delays_time = (
             self.MEASUREMENT_SETTINGS.laser.MEASUREMENT_DELAY
-            + 2 * self.MEASUREMENT_SETTINGS.laser.ARDUINO_DELAY
             + self.MEASUREMENT_SETTINGS.laser.IRRADITION_TIME
         ) * iters
         print(f"thereof delays: {delays_time} ms")
@@ -317,14 +391,17 @@ class Lasermessung:
         print(
             f"std: +/- {np.std(np.array(seconds_list) - seconds_list[0] - (delays_time))}"
         )
+        PhaseTimings.report(timings.timings, self.MEASUREMENT_SETTINGS.specto.INTTIME)
 
-    def time_measurement(self, measure):
+    def time_measurement(self, measure, scheduler=None):
 
         seconds = time.time()
 
         print("\nrepetitions:")
+        repetitions = 0
         for i in range(self.MEASUREMENT_SETTINGS.laser.REPETITIONS):
             measure(i)
+            repetitions = i + 1
             sys.stdout.write("\r")
             sys.stdout.write(" " + str(i))
             sys.stdout.flush()
@@ -339,6 +416,22 @@ class Lasermessung:
 
         total_time_millis = int(round(time.time() * 1000)) - int(round(seconds * 1000))
         print(f"measurements took: {total_time_millis} ms")
+
+        PhaseTimings.report(
+            self.messdata.timings.timings[self.messdata.curr_gradiant],
+            self.MEASUREMENT_SETTINGS.specto.INTTIME,
+            repetitions=repetitions,
+        )
+
+        self.arduino.report()
+        if self.virtual_arduino is not None:
+            self.virtual_arduino.report()
+
+        if scheduler is not None:
+            # gemessene statt geschätzte Zeiten
+            scheduler.report()
+            return
+
         delays_time = (
             self.MEASUREMENT_SETTINGS.laser.MEASUREMENT_DELAY
             + 2 * self.MEASUREMENT_SETTINGS.laser.ARDUINO_DELAY
@@ -373,10 +466,24 @@ class Lasermessung:
         #     print("Arduino not set up! Can not measure.")
         #     return
 
+        timings = self.messdata.timings
+        # das Auslesen läuft in einem eigenen Thread, hier wird nur noch gespeichert.
+        # Dadurch nähert sich die Wiederholungsperiode INTTIME an (ohne MEASUREMENT_DELAY und Python-Overhead)
+        reader = SpectrometerReader(self.get_data, len(self.messdata.wav))
+        read_timeout = (
+            self.MEASUREMENT_SETTINGS.specto.INTTIME
+            * self.MEASUREMENT_SETTINGS.specto.SCAN_AVG
+            / 1000.0
+            + 10
+        )
+
         def measure(i):
-            self.messdata.measurements[self.messdata.curr_gradiant][i] = self.get_data()
-            self.messdata.timestamps[self.messdata.curr_gradiant][i] = time.time()
-            time.sleep(self.MEASUREMENT_SETTINGS.laser.MEASUREMENT_DELAY / 1000.0)
+            timings.begin(self.messdata.curr_gradiant, i)
+            k, spectrum, timestamp = reader.get(timeout=read_timeout)
+            timings.lap("read")
+            self.messdata.store(i, spectrum, timestamp)
+            reader.release(k)
+            timings.lap("store")
 
         self.led_red()
         # auch, wenn Emission schon an ist, wird der LASER extern vom Arduino getriggert
@@ -394,7 +501,11 @@ class Lasermessung:
         def measure_func():
             self.turn_on_laser()
             print("turned on lasers", flush=True)
-            self.time_measurement(measure)
+            reader.start()
+            try:
+                self.time_measurement(measure)
+            finally:
+                reader.stop(timeout=read_timeout)
 
         self.watchdog_wrap(send_and_wait, measure_func)
 
@@ -404,23 +515,154 @@ class Lasermessung:
             print("Arduino not set up! Can not measure.")
             return
 
+        # Phasen einer Wiederholung: (Name, geplante Dauer in ms, darf kürzer werden)
+        # Bestrahlung und Arduino dauern mindestens ihre Zeit, Verspätungen fängt der Rest auf.
+        # Die Arduino-Phasen dauern genau bis zur Bestätigung des Kommandos (Round-Trip statt ARDUINO_DELAY)
+        scheduler = AcquisitionScheduler(
+            [
+                ("laser_on", 0, False),
+                ("irradiation", self.MEASUREMENT_SETTINGS.laser.IRRADITION_TIME, False),
+                ("read", self.MEASUREMENT_SETTINGS.specto.INTTIME, True),
+                ("laser_off", 0, False),
+                ("delay", self.MEASUREMENT_SETTINGS.laser.MEASUREMENT_DELAY, True),
+            ],
+            self.MEASUREMENT_SETTINGS.laser.REPETITIONS,
+        )
+        self.scheduler = scheduler
+
+        timings = self.messdata.timings
+
         def measure(i):
+            scheduler.begin_repetition()
+            timings.begin(self.messdata.curr_gradiant, i)
             self.turn_on_laser()
-            time.sleep(self.MEASUREMENT_SETTINGS.laser.IRRADITION_TIME / 1000.0)
-            self.messdata.measurements[self.messdata.curr_gradiant][i] = self.get_data()
-            self.messdata.timestamps[self.messdata.curr_gradiant][i] = time.time()
+            timings.lap("arduino_write")
+            scheduler.end_phase()
+            scheduler.end_phase()  # Bestrahlung
+            timings.lap("laser_on")
+            spectrum = self.get_data()
+            timings.lap("read")
+            self.messdata.store(i, spectrum, time.time())
+            timings.lap("store")
+            scheduler.end_phase()
+            timings.lap("sleep")
             self.turn_off_laser()
-            time.sleep(self.MEASUREMENT_SETTINGS.laser.MEASUREMENT_DELAY / 1000.0)
+            timings.lap("arduino_write")
+            scheduler.end_phase()
+            scheduler.end_phase()  # MEASUREMENT_DELAY
+            timings.lap("sleep")
 
         self.led_red()
         # auch, wenn Emission schon an ist, wird der LASER extern vom Arduino getriggert
         self.nkt.set_register("emission", 1)
-        self.time_measurement(measure)
+        self.time_measurement(measure, scheduler)
+
+    def enable_snapshots(self, DIR_PATH, snapshot_seconds):
+        """Speichert die letzten snapshot_seconds Sekunden des Ringpuffers bei SIGUSR1 oder Eingabe von "s"."""
 
-    def infinite_measuring(self, gui=True, nkt_on=True):
+        snapshot_event = threading.Event()
+
+        # der Handler wird im Main-Thread ausgeführt, daher nur das Event setzen
+        signal.signal(signal.SIGUSR1, lambda signum, frame: snapshot_event.set())
+
+        def read_keys():
+            for line in sys.stdin:
+                if line.strip() == "s":
+                    snapshot_event.set()
+
+        def snapshot_job():
+            while True:
+                snapshot_event.wait()
+                snapshot_event.clear()
+                self.save_snapshot(DIR_PATH, snapshot_seconds)
+
+        threading.Thread(target=read_keys, daemon=True).start()
+        threading.Thread(target=snapshot_job, daemon=True).start()
+        print(
+            f'snapshots: "kill -USR1 {os.getpid()}" oder "s" + Enter speichert die letzten {snapshot_seconds} s',
+            flush=True,
+        )
+
+    def save_snapshot(self, DIR_PATH, seconds):
+        """Schreibt die letzten seconds Sekunden des Ringpuffers als normale Messung (ein Gradient)."""
+
+        spectra, timestamps, _ = self.ring.last_seconds(seconds)
+        if len(spectra) == 0:
+            print("snapshot: noch keine Spektren vorhanden", flush=True)
+            return
+
+        settings = copy.deepcopy(self.MEASUREMENT_SETTINGS)
+        settings.laser.REPETITIONS = len(spectra)
+        # nur der Gradient, mit dem gerade gemessen wird
+        gradiant = max(self.messdata.curr_gradiant, 0)
+        for field in fields(settings.laser):
+            value = getattr(settings.laser, field.name)
+            if isinstance(value, list):
+                setattr(settings.laser, field.name, [value[gradiant]])
+        settings.laser.num_gradiants = 1
+
+        type_dir, code_name = self.get_file_name(DIR_PATH)
+        if not self.MEASUREMENT_SETTINGS.UNIQUE:
+            # sonst überschreibt jeder Snapshot den vorherigen (die Zeit des letzten Spektrums)
+            code_name += "_snapshot_" + str(
+                datetime.datetime.fromtimestamp(timestamps[-1])
+            ).replace(":", "_")
+        self.write_measurement(
+            type_dir + code_name,
+            settings,
+            np.array((spectra,)),
+            np.array((timestamps,)),
+        )
+        print(
+            f"snapshot mit {len(spectra)} Spektren gespeichert: {type_dir + code_name}",
+            flush=True,
+        )
+
+    def infinite_measuring(
+        self,
+        gui=True,
+        nkt_on=True,
+        DIR_PATH=None,
+        ring_seconds=600,
+        snapshot_seconds=60,
+        ring_max_bytes=256 * 1024**2,
+    ):
+        """Misst so lange, bis es per KeyboardInterrupt abgebrochen wird.
+
+        Die Spektren der letzten ring_seconds Sekunden liegen in einem Ringpuffer (float32,
+        höchstens ring_max_bytes groß). Ist ein DIR_PATH angegeben, können daraus Snapshots
+        gespeichert werden (siehe enable_snapshots).
+        """
         if nkt_on:
             self.nkt.set_register("operating_mode", 0)  # internal trigger
             self.nkt.set_register("emission", 1)
+            self.sent_values.pop(("nkt", "operating_mode"), None)
+
+        # so lange dauert ein Spektrum mindestens: belichten (SCAN_AVG mal), auslesen und warten
+        period_ms = (
+            self.MEASUREMENT_SETTINGS.specto.INTTIME
+            * self.MEASUREMENT_SETTINGS.specto.SCAN_AVG
+            + self.READOUT_MS
+            + self.MEASUREMENT_SETTINGS.laser.MEASUREMENT_DELAY
+        )
+        num_wav = len(self.messdata.wav)
+        capacity = min(
+            ceil(ring_seconds * 1000 / period_ms),
+            ring_max_bytes // (num_wav * np.dtype(np.float32).itemsize),
+        )
+        self.ring = SpectrumRingBuffer(capacity, num_wav, dtype=np.float32)
+        print(
+            f"ring buffer: {capacity} spectra ({self.ring.spectra.nbytes / 1024**2:.0f} MB),"
+            + f" about the last {capacity * period_ms / 1000:.0f} s",
+            flush=True,
+        )
+        if DIR_PATH is not None and capacity * period_ms / 1000 < snapshot_seconds:
+            print(
+                f"snapshots will cover less than {snapshot_seconds} s (ring_max_bytes)",
+                flush=True,
+            )
+        if DIR_PATH is not None:
+            self.enable_snapshots(DIR_PATH, snapshot_seconds)
 
         def send_and_wait():
             while True:
@@ -429,12 +671,6 @@ class Lasermessung:
                     self.MEASUREMENT_SETTINGS.specto.INTTIME / 1000
                     + self.MEASUREMENT_SETTINGS.laser.MEASUREMENT_DELAY / 1000
                 )
-                data = self.arduino.read(self.arduino.inWaiting())
-                if data != b"":
-                    print(
-                        "in waiting: " + str(data),
-                        flush=True,
-                    )  # flushInput()
 
         def infinite_measure():
             self.turn_on_laser()
@@ -446,9 +682,12 @@ class Lasermessung:
                     next_measurement_index = (
                         self.messdata.curr_measurement_index + 1
                     ) % len(self.messdata.measurements[self.messdata.curr_gradiant])
+                    spectrum = self.get_data()
+                    self.ring.push(spectrum, time.time())
+                    # für die GUI
                     self.messdata.measurements[self.messdata.curr_gradiant][
                         next_measurement_index
-                    ] = self.get_data()
+                    ] = spectrum
                     time.sleep(
                         self.MEASUREMENT_SETTINGS.laser.MEASUREMENT_DELAY / 1000.0
                     )
@@ -465,35 +704,44 @@ class Lasermessung:
         if gui:
             self.enable_gui()
 
-        for self.messdata.curr_gradiant in range(
-            self.MEASUREMENT_SETTINGS.laser.num_gradiants
-        ):
-
-            self.set_laser_powers(self.messdata.curr_gradiant)
-
-            def run():
-                if self.MEASUREMENT_SETTINGS.laser.CONTINOUS:
-                    self.continuous_measurement()
+        try:
+            for self.messdata.curr_gradiant in range(
+                self.MEASUREMENT_SETTINGS.laser.num_gradiants
+            ):
+
+                self.set_laser_powers(self.messdata.curr_gradiant)
+
+                def run():
+                    if self.MEASUREMENT_SETTINGS.laser.CONTINOUS:
+                        self.continuous_measurement()
+                    else:
+                        self.pulse_measurement()
+
+                if thread:
+                    t = threading.Thread(
+                        target=run,
+                        daemon=True,  # Main-Thread soll nicht auf den Thread warten
+                    )
+                    t.start()
+                    t.join()
                 else:
-                    self.pulse_measurement()
-
-            if thread:
-                t = threading.Thread(
-                    target=run,
-                    daemon=True,  # Main-Thread soll nicht auf den Thread warten
-                )
-                t.start()
-                t.join()
-            else:
-                run()
+                    run()
+        except BaseException:
+            # die bisherigen Spektren nicht verlieren (der Schreib-Thread ist ein daemon)
+            if self.messdata.recorder is not None:
+                self.messdata.recorder.close(complete=False)
+                self.messdata.recorder = None
+            # den GUI-Prozess beenden und das Shared Memory freigeben
+            self.disable_gui()
+            raise
 
         self.stop_all_devices()
 
         if gui:
             self.disable_gui()
 
-    def save(self, DIR_PATH, plt_only=False, measurements_only=False):
-        """Schreibt die Messdaten in einen spezifizierten Ordner."""
+    def get_file_name(self, DIR_PATH):
+        """Bestimmt den Ordner und den Namen, unter dem die Messung gespeichert wird."""
         # gemeinsame Typen werden in einem gemeinsamen Ordner gespeichert
 
         name = "DEBUG" if self.DEBUG else self.MEASUREMENT_SETTINGS.TYPE
@@ -509,61 +757,155 @@ class Lasermessung:
             # manche Dateisysteme unterstützen keinen Doppelpunkt im Dateinamen
             code_name = str(datetime.datetime.now()).replace(":", "_")
 
+        return type_dir, code_name
+
+    def start_recording(self, DIR_PATH):
+        """Schreibt die Spektren schon während der Messung auf die Festplatte (siehe MeasurementRecorder)."""
+
+        type_dir, code_name = self.get_file_name(DIR_PATH)
+        self.recording_name = (type_dir, code_name)
+
+        # die Einstellungen sofort schreiben, damit auch eine abgebrochene Messung geplottet werden kann
+        with open(
+            type_dir + code_name + ".json",
+            "w",
+            encoding="utf-8",
+        ) as json_file:
+            self.MEASUREMENT_SETTINGS.save_as_json(json_file)
+        os.chmod(type_dir + code_name + ".json", 0o777)
+
+        self.messdata.recorder = MeasurementRecorder(
+            type_dir + code_name,
+            self.MEASUREMENT_SETTINGS.laser.num_gradiants,
+            self.MEASUREMENT_SETTINGS.laser.REPETITIONS,
+            self.messdata.wav,
+        )
+
+    def save(self, DIR_PATH, plt_only=False, measurements_only=False):
+        """Schreibt die Messdaten in einen spezifizierten Ordner."""
+
+        if hasattr(self, "recording_name"):
+            # unter dem gleichen Namen wie die Aufnahme speichern
+            type_dir, code_name = self.recording_name
+        else:
+            type_dir, code_name = self.get_file_name(DIR_PATH)
+
         file_name = type_dir + code_name
 
+        if self.messdata.recorder is not None:
+            self.messdata.recorder.close()
+            self.messdata.recorder = None
+
         if not plt_only:
-            with open(
-                file_name + ".json",
-                "w",
-                encoding="utf-8",
-            ) as json_file:
-                self.MEASUREMENT_SETTINGS.save_as_json(json_file)
-
-            # metadata = np.zeros(9, dtype=int)
-            # metadata[0] = self.MEASUREMENT_SETTINGS["INTTIME"]
-            # metadata[1] = self.MEASUREMENT_SETTINGS["INTENSITY"]
-            # metadata[2] = self.MEASUREMENT_SETTINGS["SCAN_AVG"]
-            # metadata[3] = self.MEASUREMENT_SETTINGS["SMOOTH"]
-            # metadata[4] = self.MEASUREMENT_SETTINGS["XTIMING"]
-            # metadata[5] = self.MEASUREMENT_SETTINGS["laser"]["REPETITIONS"]
-            # metadata[6] = self.MEASUREMENT_SETTINGS["ARDUINO_DELAY"]
-            # metadata[7] = self.MEASUREMENT_SETTINGS["IRRADITION_TIME"]
-            # metadata[8] = int(self.MEASUREMENT_SETTINGS["laser"]["CONTINOUS"])
-
-            np.savez_compressed(
+            # nach einem TIMEOUT sind nicht alle Wiederholungen gemessen
+            written = self.messdata.written.copy()
+            # die laufenden Statistiken können nur genutzt werden, wenn jede Wiederholung genau einmal gemessen wurde
+            use_running = np.array_equal(self.messdata.count, written)
+
+            self.write_measurement(
                 file_name,
-                np.array(self.messdata.measurements),
-                np.array(self.messdata.wav),
-                np.array(self.messdata.timestamps),
+                self.MEASUREMENT_SETTINGS,
+                self.messdata.measurements,
+                self.messdata.timestamps,
+                written=written,
+                mean=self.messdata.running_mean if use_running else None,
+                std=(
+                    np.sqrt(self.messdata.running_m2 / self.messdata.count[:, None])
+                    if use_running
+                    else None
+                ),
             )
-            os.chmod(file_name + ".npz", 0o777)
+            # wohin die Zeit jeder Wiederholung geflossen ist (siehe PhaseTimings)
+            self.messdata.timings.save(file_name)
 
         if not measurements_only:
-            if not hasattr(self, "plot"):
-                self.plot = Laserplot()
-
-            self.plot.plot_results(
+            self.get_plot().plot_results(
                 [PlottingSettings(type_dir, code_name, True)],
                 self.MEASUREMENT_SETTINGS,
             )
 
-    def plot_path(self, settings, mSettings=None):
+    def write_measurement(
+        self,
+        file_name,
+        settings,
+        measurements,
+        timestamps,
+        written=None,
+        mean=None,
+        std=None,
+    ):
+        """Schreibt Einstellungen, Messdaten und Statistiken (siehe MeasurementSummary).
+
+        written: die Anzahl der gemessenen Wiederholungen pro Gradient (None: alle).
+        """
+
+        with open(
+            file_name + ".json",
+            "w",
+            encoding="utf-8",
+        ) as json_file:
+            settings.save_as_json(json_file)
+
+        # metadata = np.zeros(9, dtype=int)
+        # metadata[0] = self.MEASUREMENT_SETTINGS["INTTIME"]
+        # metadata[1] = self.MEASUREMENT_SETTINGS["INTENSITY"]
+        # metadata[2] = self.MEASUREMENT_SETTINGS["SCAN_AVG"]
+        # metadata[3] = self.MEASUREMENT_SETTINGS["SMOOTH"]
+        # metadata[4] = self.MEASUREMENT_SETTINGS["XTIMING"]
+        # metadata[5] = self.MEASUREMENT_SETTINGS["laser"]["REPETITIONS"]
+        # metadata[6] = self.MEASUREMENT_SETTINGS["ARDUINO_DELAY"]
+        # metadata[7] = self.MEASUREMENT_SETTINGS["IRRADITION_TIME"]
+        # metadata[8] = int(self.MEASUREMENT_SETTINGS["laser"]["CONTINOUS"])
+
+        np.savez_compressed(
+            file_name,
+            np.array(measurements),
+            np.array(self.messdata.wav),
+            np.array(timestamps),
+        )
+        os.chmod(file_name + ".npz", 0o777)
 
-        if not hasattr(self, "plot"):
-            self.plot = Laserplot()
+        if MeasurementRecorder.exists(file_name):
+            # die Aufnahme enthält bereits die gleichen Daten wie die .npz-Datei
+            MeasurementReader.register_source(file_name)
+
+        # Mittelwerte etc. vorberechnen, damit die Plots nicht alle Wiederholungen lesen müssen
+        MeasurementSummary.compute(
+            measurements,
+            [measurements.shape[1]] * len(measurements) if written is None else written,
+            mean=mean,
+            std=std,
+        ).save(file_name)
+
+    def plot_path(self, settings, mSettings=None):
 
-        self.plot.plot_results(
+        self.get_plot().plot_results(
             settings,
             self.MEASUREMENT_SETTINGS if mSettings == None else mSettings,
         )
 
+    def get_plot(self):
+        """Gibt den Laserplot zurück und erstellt ihn beim ersten Aufruf.
+
+        Erst hier wird Laserplot importiert, Messungen ohne GUI und Plots (z. B. measurements_only)
+        laden matplotlib, scienceplots und scipy also gar nicht.
+        """
+        if not hasattr(self, "plot"):
+            from Laserplot import Laserplot
+
+            self.plot = Laserplot()
+        return self.plot
+
     def enable_gui(self):
-        self.plot = Laserplot()
-        self.plot.start_gui(self.MEASUREMENT_SETTINGS.laser.REPETITIONS, self.messdata)
+        self.live_viewer = LiveViewer(
+            self.messdata, self.MEASUREMENT_SETTINGS.laser.REPETITIONS
+        )
+        self.live_viewer.start()
 
     def disable_gui(self):
-        self.plot.stop_gui()
-        del self.plot
+        if hasattr(self, "live_viewer"):
+            self.live_viewer.stop()
+            del self.live_viewer
 
     # def plot(self, settings, measurement_data, wav):
     #     self.plot.plot_results(
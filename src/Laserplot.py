@@ -1,15 +1,28 @@
 from MeasurementSettings import MeasurementSettings
 from PlottingSettings import PlottingSettings
+from MeasurementReader import measurement_cache
+from MeasurementSummary import MeasurementSummary
+from Messdata import Messdata
 
 import numpy as np
 from matplotlib.ticker import MultipleLocator
 
 # andere backends sind ebenfalls möglich, brauchen aber teilweise andere dependencies
 import matplotlib
+import os
 
-matplotlib.use("Gtk3Agg")
+# die Live-GUI braucht GTK. Für Plots ohne Fenster (generate_plots) reicht ein Backend ohne GUI-Toolkit,
+# z. B. LASERPLOT_BACKEND=Agg (Raster) oder pdf/svg (Vektor). Muss vor dem Import von Laserplot gesetzt sein.
+GUI_BACKEND = "Gtk3Agg"
+BACKEND = os.environ.get("LASERPLOT_BACKEND", GUI_BACKEND)
+matplotlib.use(BACKEND)
 import matplotlib.pyplot as plt
 import matplotlib.colors
+import matplotlib.path
+
+# braucht pyplot, also erst nach matplotlib.use
+from FigurePool import FigurePool
+from FigureExporter import FigureExporter
 
 # print(plt.style.available)
 # plt.style.use(["seaborn-v0_8-pastel"])
@@ -26,17 +39,15 @@ plt.style.use(["science"])
 plt.rcParams["figure.constrained_layout.use"] = True
 USE_GRID = False
 
-import os
 import subprocess
 from multiprocessing import Process
-import warnings
 
 import matplotlib.animation as animation
 import sys
 import time
 import scipy
-import threading
 import copy
+import functools
 from math import ceil, floor
 
 from dataclasses import dataclass
@@ -64,6 +75,25 @@ class Laserplot:
             0  # wie viele andere Graphen ebenfalls noch in den Plot kommen
         )
 
+    # wird nur zum Messen gesetzt (siehe PlotTimings und benchmark_plots.py)
+    timings = None
+
+    # die Figuren von plot_results, werden pro Prozess wiederverwendet
+    figures = FigurePool()
+    # speichert die Figuren von plot_results (DPI der Bilder, Vorschaubilder, Vektorformate)
+    exporter = FigureExporter()
+
+    @staticmethod
+    def start_stage(name):
+        """Beginnt den Schritt name (bis stop_stage), wenn Laserplot.timings gesetzt ist."""
+        if Laserplot.timings is not None:
+            Laserplot.timings.start(name)
+
+    @staticmethod
+    def stop_stage(name):
+        if Laserplot.timings is not None:
+            Laserplot.timings.stop(name)
+
     def __init__(self):
 
         self.live_fig, self.live_ax = plt.subplots()
@@ -73,16 +103,38 @@ class Laserplot:
         if USE_GRID:
             self.live_ax.grid(visible=True, which="both", linestyle="--", linewidth=0.5)
         # weniger Weiß an den Rändern
+        self.live_ax.xaxis.set_major_locator(MultipleLocator(100))
+        self.live_ax.tick_params(axis="both", labelsize=8)
+        # wie in data_to_plot: mindestens bis 2000 Counts
+        self.live_ax.set_ylim(0, 2000)
 
+        # die Artists werden nur einmal erstellt und in update_live_plot nur noch mit neuen Daten gefüllt
         self.scatter = self.live_ax.scatter(
-            [], [], label="Mittelwert von 0 Messungen", s=5
+            [], [], s=4, color="gray", alpha=0.4, label="Spektrum"
+        )
+        (self.live_line,) = self.live_ax.plot(
+            [], [], color="black", linestyle="-", label="geglättet"
+        )
+        (self.mean_line,) = self.live_ax.plot(
+            [], [], color="red", linestyle="-", label="Mittelwert"
+        )
+        # die Legende bleibt oben rechts, nur die Texte ändern sich
+        self.live_legend = self.live_ax.legend(
+            loc="upper right", frameon=True, fancybox=True, markerscale=2
+        )
+        self.live_artists = (
+            self.scatter,
+            self.live_line,
+            self.mean_line,
+            self.live_legend,
         )
 
-        self.past_measurement_index = -1
+        # (Gradient, Index) des zuletzt gezeichneten Spektrums
+        self.past_measurement = None
+        self.past_wav = None
 
         plt.ion()
         plt.show()
-        self.stop_event = threading.Event()
 
     @staticmethod
     def wavelength_to_rgb(wavelength, gamma=0.8):
@@ -95,60 +147,77 @@ class Laserplot:
         Based on code by Dan Bruton
         http://www.physics.sfasu.edu/astro/color/spectra.html
         Additionally alpha value set to 0.5 outside range
+
+        Mit NumPy für ganze Arrays von Wellenlängen: gibt für ein Array ein Array (len, 4)
+        zurück, für eine einzelne Wellenlänge wie bisher ein Tupel (r, g, b, a).
         """
-        wavelength = float(wavelength)
-        if wavelength >= 380 and wavelength <= 750:
-            a = 1.0
-        else:
-            a = 0.5
-        if wavelength < 380:
-            wavelength = 380.0
-        if wavelength > 750:
-            wavelength = 750.0
-        if wavelength >= 380 and wavelength <= 440:
-            attenuation = 0.3 + 0.7 * (wavelength - 380) / (440 - 380)
-            r = ((-(wavelength - 440) / (440 - 380)) * attenuation) ** gamma
-            g = 0.0
-            b = (1.0 * attenuation) ** gamma
-        elif wavelength >= 440 and wavelength <= 490:
-            r = 0.0
-            g = ((wavelength - 440) / (490 - 440)) ** gamma
-            b = 1.0
-        elif wavelength >= 490 and wavelength <= 510:
-            r = 0.0
-            g = 1.0
-            b = (-(wavelength - 510) / (510 - 490)) ** gamma
-        elif wavelength >= 510 and wavelength <= 580:
-            r = ((wavelength - 510) / (580 - 510)) ** gamma
-            g = 1.0
-            b = 0.0
-        elif wavelength >= 580 and wavelength <= 645:
-            r = 1.0
-            g = (-(wavelength - 645) / (645 - 580)) ** gamma
-            b = 0.0
-        elif wavelength >= 645 and wavelength <= 750:
-            attenuation = 0.3 + 0.7 * (750 - wavelength) / (750 - 645)
-            r = (1.0 * attenuation) ** gamma
-            g = 0.0
-            b = 0.0
-        else:
-            r = 0.0
-            g = 0.0
-            b = 0.0
-        return (r, g, b, a)
+        wavelength = np.asarray(wavelength, dtype=float)
+        scalar = wavelength.ndim == 0
+        wavelength = np.atleast_1d(wavelength)
+
+        rgba = np.zeros((len(wavelength), 4))
+        rgba[:, 3] = np.where((wavelength >= 380) & (wavelength <= 750), 1.0, 0.5)
+        wavelength = np.clip(wavelength, 380.0, 750.0)
+        r, g, b = rgba[:, 0], rgba[:, 1], rgba[:, 2]
+
+        # die Bereiche wie in der if/elif-Kette: die Grenze gehört jeweils zum unteren Bereich
+        violet = wavelength <= 440
+        blue = (wavelength > 440) & (wavelength <= 490)
+        cyan = (wavelength > 490) & (wavelength <= 510)
+        green = (wavelength > 510) & (wavelength <= 580)
+        orange = (wavelength > 580) & (wavelength <= 645)
+        red = wavelength > 645
+
+        w = wavelength[violet]
+        attenuation = 0.3 + 0.7 * (w - 380) / (440 - 380)
+        r[violet] = ((-(w - 440) / (440 - 380)) * attenuation) ** gamma
+        b[violet] = (1.0 * attenuation) ** gamma
+
+        g[blue] = ((wavelength[blue] - 440) / (490 - 440)) ** gamma
+        b[blue] = 1.0
+
+        g[cyan] = 1.0
+        b[cyan] = (-(wavelength[cyan] - 510) / (510 - 490)) ** gamma
+
+        r[green] = ((wavelength[green] - 510) / (580 - 510)) ** gamma
+        g[green] = 1.0
+
+        r[orange] = 1.0
+        g[orange] = (-(wavelength[orange] - 645) / (645 - 580)) ** gamma
+
+        attenuation = 0.3 + 0.7 * (750 - wavelength[red]) / (750 - 645)
+        r[red] = (1.0 * attenuation) ** gamma
+
+        if scalar:
+            return tuple(float(c) for c in rgba[0])
+        return rgba
 
     @staticmethod
-    def legend_collides(ax, px, py):
+    @functools.lru_cache(maxsize=None)
+    def spectral_colormap(clim=(350, 780), gamma=0.8):
+        """Die Colormap der bunten Plots (Wellenlänge -> Farbe), wird pro clim und gamma nur einmal pro Prozess erstellt."""
+        norm = plt.Normalize(*clim)
+        wl = np.arange(clim[0], clim[1] + 1, 2)
+        return matplotlib.colors.LinearSegmentedColormap.from_list(
+            "spectrum", list(zip(norm(wl), Laserplot.wavelength_to_rgb(wl, gamma)))
+        )
 
-        bbox_legend = ax.get_legend().get_window_extent()
-        # in Datenkoordinaten umrechnen
-        x0, y0 = ax.transData.inverted().transform((bbox_legend.x0, bbox_legend.y0))
-        x1, y1 = ax.transData.inverted().transform((bbox_legend.x1, bbox_legend.y1))
-        for x, y in zip(px, py):
-            if x >= x0 and x <= x1 and y >= y0 and y <= y1:
-                return True
+    @staticmethod
+    def legend_collides(ax, px, py, renderer=None):
+        """Prüft, ob einer der Punkte (px, py) unter der Legende liegt (in Pixeln, für alle Punkte auf einmal)."""
 
-        return False
+        bbox_legend = ax.get_legend().get_window_extent(renderer)
+        points = ax.transData.transform(
+            np.column_stack((np.asarray(px, dtype=float), np.asarray(py, dtype=float)))
+        )
+        return bool(
+            np.any(
+                (points[:, 0] >= bbox_legend.x0)
+                & (points[:, 0] <= bbox_legend.x1)
+                & (points[:, 1] >= bbox_legend.y0)
+                & (points[:, 1] <= bbox_legend.y1)
+            )
+        )
 
         # def is_overlapping(x0a, y0a, x1a, y1a, x0b, y0b, x1b, y1b):
         #     return not (x1a < x0b or x1b < x0a or y1a < y0b or y1b < y0a)
@@ -172,10 +241,13 @@ class Laserplot:
         # return False
 
     @staticmethod
-    def data_to_plot(settings: GraphSettings, collide_graph=False):
+    def data_to_plot(settings: GraphSettings):
 
         def smooth_curve(array):
-            return scipy.signal.savgol_filter(array, window_length=50, polyorder=5)
+            Laserplot.start_stage("savgol")
+            smoothed = scipy.signal.savgol_filter(array, window_length=50, polyorder=5)
+            Laserplot.stop_stage("savgol")
+            return smoothed
 
         line_data = (
             smooth_curve(settings.y_data)
@@ -184,8 +256,6 @@ class Laserplot:
         )
 
         if settings.rainbow and not settings.time_plot:
-            X, _ = np.meshgrid(settings.x_data, line_data)
-
             extent = (
                 np.min(settings.x_data),
                 np.max(settings.x_data),
@@ -194,23 +264,32 @@ class Laserplot:
             )
 
             clim = (350, 780)
-            norm = plt.Normalize(*clim)
-            wl = np.arange(clim[0], clim[1] + 1, 2)
-            colorlist = list(
-                zip(norm(wl), [Laserplot.wavelength_to_rgb(w) for w in wl])
-            )
-            spectralmap = matplotlib.colors.LinearSegmentedColormap.from_list(
-                "spectrum", colorlist
-            )
-            settings.ax.imshow(
-                X, clim=clim, extent=extent, cmap=spectralmap, aspect="auto"
+            spectralmap = Laserplot.spectral_colormap(clim)
+            # jede Spalte hat die Farbe ihrer Wellenlänge, eine Zeile reicht also (statt meshgrid über alle y-Werte)
+            rainbow = settings.ax.imshow(
+                np.asarray(settings.x_data, dtype=float)[np.newaxis, :],
+                clim=clim,
+                extent=extent,
+                cmap=spectralmap,
+                aspect="auto",
             )
-            settings.ax.fill_between(
-                settings.x_data,
-                line_data,
-                np.max(line_data) + settings.marker_size,
-                color="w",
+            # nur die Fläche unter dem Graphen zeigen (statt den Rest weiß zu übermalen)
+            area = matplotlib.path.Path(
+                np.concatenate(
+                    (
+                        [(settings.x_data[0], extent[2])],
+                        np.column_stack((settings.x_data, line_data)),
+                        [(settings.x_data[-1], extent[2])],
+                        # wird bei closed=True durch CLOSEPOLY ersetzt
+                        [(settings.x_data[0], extent[2])],
+                    )
+                ),
+                closed=True,
             )
+            rainbow.set_clip_path(area, transform=settings.ax.transData)
+            # der Wertebereich wie zuvor mit der weißen Fläche bis über das Maximum
+            settings.ax.update_datalim(((extent[0], extent[3] + settings.marker_size),))
+            settings.ax.autoscale_view()
 
         if settings.std is not None and not settings.time_plot:
 
@@ -272,6 +351,7 @@ class Laserplot:
             )
 
         if settings.interpolate:
+            Laserplot.start_stage("curve_fit")
             # den konstanten Teil am Ende wegschneiden (der eine sehr geringe Steigung hat)
             index = len(settings.y_data)
             step_size = ceil(len(settings.y_data) / 10)
@@ -308,8 +388,6 @@ class Laserplot:
                     m, "" if n < 0 else "+", n
                 ),
             )
-            # verhindern, dass das Label gar nicht erst erstellt wird (siehe if weiter unten)
-            settings.label = " " if settings.label is None else settings.label
 
             # bei Noise kommt manchmal ein OptimizeWarning
             parameter = scipy.optimize.curve_fit(
@@ -339,9 +417,14 @@ class Laserplot:
                 color="orange",
                 linewidth=settings.marker_size,
                 label=r"$\text{{exp}}(x) \approx {:.0f} e^{{ {} \cdot 10^{{{:.0f}}} t}} {}{:.0f}$".format(
-                    a, float(b_format[0]), float(b_format[1]), "" if c < 0 else "+", c
+                    a,
+                    float(b_format[0]),
+                    float(b_format[1]),
+                    "" if c < 0 else "+",
+                    c,
                 ),
             )
+            Laserplot.stop_stage("curve_fit")
 
         # die Daten im Scatter-Plot aktualisieren
         # self.scatter.set_offsets(np.column_stack((wav, measurement)))
@@ -382,6 +465,17 @@ class Laserplot:
         # weniger Weiß an den Rändern. Überschreibt aber constrained layout
         # fig.tight_layout()
 
+    @staticmethod
+    def place_legend(fig, ax, graphs):
+        """Platziert die Legende aller Graphen einer Figur in einem Durchgang.
+
+        Die Legende kommt zuerst in den Plot (loc "best"). Liegt ein Datenpunkt eines Graphen
+        (graphs: Liste von (x_data, y_data)) darunter, kommt sie unter die x-Achse, ein- oder
+        zweispaltig, je nachdem, was weniger Platz kostet. Die Figur wird dafür nur einmal
+        ohne Rendern gezeichnet, die Größen der Legenden kommen direkt vom Renderer. Ohne
+        graphs bleibt die Legende im Plot.
+        """
+
         options = {
             "frameon": True,
             "fancybox": True,
@@ -390,60 +484,61 @@ class Laserplot:
             # framealpha=0.3,
         }
 
-        if settings.label is not None:
-            settings.ax.legend(**options)
-            settings.fig.canvas.draw()
+        ax.legend(**options)
+        if not graphs:
+            return
+
+        # Layout (constrained layout) und die Position von loc="best" berechnen
+        fig.draw_without_rendering()
+        renderer = fig.canvas.get_renderer()
 
-            if (
-                Laserplot.legend_collides(
-                    settings.ax,
-                    settings.x_data,
-                    settings.y_data,
-                )
-                or collide_graph
-            ):
-
-                # ist in Pixeln
-                label_y = settings.ax.xaxis.get_tightbbox().y1
-                # in Pixel (dots) umgerechnet
-                fig_height = settings.fig.get_size_inches()[1] * settings.fig.dpi
-                # in Prozent umrechnen (für bbox_to_anchor)
-                label_y_normalized = label_y / fig_height
-
-                # drei Millimeter in Prozent
-                offset = 3 / 25.4 * settings.fig.dpi / fig_height
-
-                options.update(
-                    {
-                        "bbox_to_anchor": (0.5, -(label_y_normalized + offset)),
-                        "loc": "upper center",
-                        "ncols": 1,  # default
-                    }
-                )
+        if not any(Laserplot.legend_collides(ax, x, y, renderer) for x, y in graphs):
+            return
 
-                settings.ax.legend(**options)
+        # ist in Pixeln
+        label_y = ax.xaxis.get_tightbbox(renderer).y1
+        # in Pixel (dots) umgerechnet
+        fig_height = fig.get_size_inches()[1] * fig.dpi
+        # in Prozent umrechnen (für bbox_to_anchor)
+        label_y_normalized = label_y / fig_height
+
+        # drei Millimeter in Prozent
+        offset = 3 / 25.4 * fig.dpi / fig_height
+
+        options.update(
+            {
+                "bbox_to_anchor": (0.5, -(label_y_normalized + offset)),
+                "loc": "upper center",
+            }
+        )
 
-                settings.fig.canvas.draw()
-                orig_bounds = settings.ax.get_position().bounds
+        # die Größe der ein- und zweispaltigen Legende, ohne die Figur neu zu zeichnen
+        sizes = {}
+        for ncols in (1, 2):
+            sizes[ncols] = ax.legend(ncols=ncols, **options).get_window_extent(renderer)
+
+        # unter der Achse kostet die Legende Höhe, ist sie breiter als die Achse auch Breite
+        # (beides in Prozent der Figur, wie bei ax.get_position())
+        fig_width = fig.get_size_inches()[0] * fig.dpi
+        axes_width = ax.get_window_extent(renderer).width
+        height_gain = (sizes[1].height - sizes[2].height) / fig_height
+        width_loss = (
+            max(0, sizes[2].width - axes_width) - max(0, sizes[1].width - axes_width)
+        ) / fig_width
+        # zweispaltig nur, wenn der Höhengewinn größer als der Breitenverlust ist
+        if height_gain < width_loss:
+            ax.legend(ncols=1, **options)
 
-                # testen, ob zweispaltig besser ist
-                options["ncols"] = 2
-                settings.ax.legend(**options)
-                settings.fig.canvas.draw()
+    @staticmethod
+    def load_measurement(file_path, code_name):
+        """Öffnet eine gespeicherte Messung (siehe MeasurementReader und MeasurementCache).
 
-                # rückgängig machen, wenn height gain kleiner ist als width Verlust (-1 ist height, -2 ist width)
-                if (
-                    settings.ax.get_position().bounds[-1] - orig_bounds[-1]
-                    < orig_bounds[-1] - settings.ax.get_position().bounds[-2]
-                ):
-                    options["ncols"] = 1
-                    settings.ax.legend(**options)
-                    settings.fig.canvas.draw()
+        Gibt die Spektren, die Wellenlängen, die Zeitstempel und die Anzahl der gültigen
+        Wiederholungen pro Gradient zurück. Wird die gleiche Messung mehrmals geplottet,
+        wird sie nur beim ersten Mal gelesen.
+        """
 
-                # der Graph hat Funktionen, die mit der Legende kollidieren
-                return True
-            # der Graph hat aktuell noch keine Funktionen, die mit der Legende kollidieren
-            return False
+        return measurement_cache.get(file_path, code_name)
 
     @staticmethod
     def plot_results(
@@ -454,11 +549,16 @@ class Laserplot:
         # messdata: Messdata,
         # verbose=True,
     ):
-        """Erstellt einen Plot mit den in den Plotting-Settings definierten Graphen."""
+        """Erstellt einen Plot mit den in den Plotting-Settings definierten Graphen. Gibt die Pfade der gespeicherten Bilder zurück."""
 
         plt.ioff()
+        # die Figuren des letzten Plots sind wieder frei
+        Laserplot.figures.release()
+        if show_plots:
+            # plt.show würde auch die gerade nicht benutzten Figuren des Pools zeigen
+            Laserplot.figures.close()
         # dirty, aber: Irgendwo wird eine figure ohne Inhalt erstellt und nicht geschlossen?? Die dann unten gezeigt werden würde.
-        plt.close("all")
+        Laserplot.figures.close_others()
         # measurements, wav, curr_measurement_index = messdata.get_data()
 
         # # [:]: nutze eine Kopie von plotting_settings zum Iterieren
@@ -477,15 +577,19 @@ class Laserplot:
         #         print(f"the dir {setting.file_path} ist empty!")
         #         plotting_settings.remove(setting)
 
-        fig, ax = plt.subplots()  # plt.subplots(layout="constrained")
+        # ob mehrere Graphen geplottet werden
+        multiple_plots = len(plotting_settings) != 1
+        time_plot = not multiple_plots and plotting_settings[0].single_wav
+
+        fig, ax = Laserplot.figures.get("time" if time_plot else "neutral")
         # werden nicht immer benutz, daher nur bei Bedarf erstellen (damit keine leeren Plots erstelltt werden)
         fig_colorful, ax_colorful = (None, None)
-        # ob es Graphen in dem Plot gibt, die mit der Legende kollidieren, wenn diese nicht außerhalb des Plots ist
-        collide_graph = False
+        # alle Graphen des Plots, die Legende wird am Ende für alle auf einmal platziert (place_legend)
+        graphs = []
 
         # plt.grid(True)
         if USE_GRID:
-            plt.grid(visible=True, which="both", linestyle="--", linewidth=0.5)
+            ax.grid(visible=True, which="both", linestyle="--", linewidth=0.5)
 
         if colors is None:
             # colors = plt.cm.jet(np.linspace(0, 1, len(file_list) + 2))
@@ -493,9 +597,6 @@ class Laserplot:
                 np.linspace(0, 1, len(plotting_settings) + 2)
             )
 
-        # ob mehrere Graphen geplottet werden
-        multiple_plots = len(plotting_settings) != 1
-        time_plot = not multiple_plots and plotting_settings[0].single_wav
         for i, orig_setting in enumerate(plotting_settings):
 
             # file_list = [
@@ -504,23 +605,24 @@ class Laserplot:
             #     if f.endswith(".npz")
             # ]
 
-            file_name = os.path.join(
-                orig_setting.file_path, orig_setting.code_name + ".npz"
+            Laserplot.start_stage("load")
+            (
+                spectrometer_data_gradient,
+                x_data,  # die Wellenlängen des Spektrometers
+                time_stamps_gradient,
+                written,
+            ) = Laserplot.load_measurement(
+                orig_setting.file_path, orig_setting.code_name
             )
+            # vorberechnete Mittelwerte/Standardabweichungen, falls vorhanden (sonst None)
+            summary = MeasurementSummary.load(
+                os.path.join(orig_setting.file_path, orig_setting.code_name)
+            )
+            Laserplot.stop_stage("load")
 
-            loaded_array = np.load(file_name)
-            spectrometer_data_gradient = loaded_array["arr_0"]
-            # die Wellenlängen des Spektrometers
-            x_data = loaded_array["arr_1"]
-            time_stamps_gradient = loaded_array["arr_2"]
-            del loaded_array
-
-            # alte Messungen haben noch keine Gradiant-Messung, dort ist num_gradiants immer default 1
-            if len(spectrometer_data_gradient.shape) < 3:
-                spectrometer_data_gradient = np.array((spectrometer_data_gradient,))
-
-            if len(time_stamps_gradient.shape) < 2:
-                time_stamps_gradient = np.array((time_stamps_gradient,))
+            def has_summary(grad):
+                # eine unvollständige Aufnahme kann inzwischen mehr Wiederholungen haben
+                return summary is not None and summary.written[grad] == written[grad]
 
             assert (
                 measurement_settings.laser.num_gradiants
@@ -528,28 +630,42 @@ class Laserplot:
                 == len(time_stamps_gradient)
             )
 
+            # bei einer unvollständigen Aufnahme nur die Gradienten, die schon begonnen wurden
+            num_started = int(np.count_nonzero(written))
+
             if orig_setting.grad_end == orig_setting.default_max:
-                orig_setting.grad_end = len(spectrometer_data_gradient)
-            elif orig_setting.grad_end > len(spectrometer_data_gradient):
+                orig_setting.grad_end = num_started
+            elif orig_setting.grad_end > num_started:
                 raise ValueError(
                     "The specified number of gradients exceeds the number of gradients in the measurement."
                 )
 
             if orig_setting.grad_end - orig_setting.grad_start > 1:
-                fig3d, ax3d = plt.subplots(subplot_kw={"projection": "3d"})
+                fig3d, ax3d = Laserplot.figures.get("3d")
                 # TODO: die Werte nutzen
                 Y = np.array(list(range(orig_setting.grad_end)))[
                     orig_setting.grad_start : orig_setting.grad_end
                 ]
                 X = x_data
                 X, Y = np.meshgrid(X, Y)
-                Z = np.mean(
-                    spectrometer_data_gradient[
-                        orig_setting.grad_start : orig_setting.grad_end
-                    ],
-                    axis=1,
-                    dtype=float,
+                Laserplot.start_stage("reductions")
+                Z = np.array(
+                    [
+                        (
+                            summary.mean[grad]
+                            if has_summary(grad)
+                            else np.mean(
+                                spectrometer_data_gradient[grad][: written[grad]],
+                                axis=0,
+                                dtype=float,
+                            )
+                        )
+                        for grad in range(
+                            orig_setting.grad_start, orig_setting.grad_end
+                        )
+                    ]
                 )
+                Laserplot.stop_stage("reductions")
                 ax3d.plot_surface(
                     X,
                     Y,
@@ -606,8 +722,17 @@ class Laserplot:
 
             for grad_index in range(orig_setting.grad_start, orig_setting.grad_end):
 
-                spectrometer_data = spectrometer_data_gradient[grad_index]
-                time_stamps = time_stamps_gradient[grad_index].copy()
+                assert measurement_settings.laser.REPETITIONS == len(
+                    spectrometer_data_gradient[grad_index]
+                )
+
+                Laserplot.start_stage("slicing")
+                spectrometer_data = spectrometer_data_gradient[grad_index][
+                    : written[grad_index]
+                ]
+                time_stamps = np.array(
+                    time_stamps_gradient[grad_index][: written[grad_index]]
+                )
 
                 begin_time_offset = time_stamps[0] - time_stamps_gradient[0][0]
 
@@ -682,8 +807,6 @@ class Laserplot:
                 # if setting.zoom_start != 0:
                 #     setting.zoom_start = (np.abs(x_data - setting.zoom_start)).argmin()
 
-                assert measurement_settings.laser.REPETITIONS == len(spectrometer_data)
-
                 normalize_integrationtime_factor = (
                     measurement_settings.specto.INTTIME
                     if setting.normalize_integrationtime
@@ -703,17 +826,20 @@ class Laserplot:
                 #     )
                 # )
 
-                extracted_data = (
-                    spectrometer_data[
-                        setting.interval_start : setting.interval_end,
-                        setting.zoom_start : setting.zoom_end,
-                    ]
-                    / normalize_integrationtime_factor
-                    / normalize_power
-                )
-                if setting.single_wav:
-                    # setting.zoom_start : setting.zoom_end ist nur ein Element in diesem Fall
-                    extracted_data = extracted_data.flatten()
+                use_summary = not setting.single_wav and has_summary(grad_index)
+
+                if not use_summary:
+                    extracted_data = (
+                        spectrometer_data[
+                            setting.interval_start : setting.interval_end,
+                            setting.zoom_start : setting.zoom_end,
+                        ]
+                        / normalize_integrationtime_factor
+                        / normalize_power
+                    )
+                    if setting.single_wav:
+                        # setting.zoom_start : setting.zoom_end ist nur ein Element in diesem Fall
+                        extracted_data = extracted_data.flatten()
 
                 # # jede Wiederholung der Messung
                 # for i in range(len(spectrometer_data)):
@@ -733,11 +859,32 @@ class Laserplot:
                 #             / normalize_power
                 #         )
                 #     extracted_data[j] = np.array(intensities)
+                Laserplot.stop_stage("slicing")
+                Laserplot.start_stage("reductions")
                 del spectrometer_data
 
                 if setting.single_wav:
                     y_data = extracted_data
                     standard_deviation = None
+                elif use_summary:
+                    # aus den Blöcken der Summary statt aus allen Wiederholungen berechnen
+                    y_data, standard_deviation = summary.interval(
+                        spectrometer_data_gradient,
+                        grad_index,
+                        setting.interval_start,
+                        setting.interval_end,
+                        setting.zoom_start,
+                        setting.zoom_end,
+                    )
+                    y_data = y_data / normalize_integrationtime_factor / normalize_power
+                    # STD nicht plotten, wenn es mehrere Graphen sind (zu unübersichtlich)
+                    standard_deviation = (
+                        standard_deviation
+                        / normalize_integrationtime_factor
+                        / normalize_power
+                        if not multiple_plots
+                        else None
+                    )
                 else:
                     y_data = np.mean(extracted_data, axis=0, dtype=float)
                     # STD nicht plotten, wenn es mehrere Graphen sind (zu unübersichtlich)
@@ -748,6 +895,7 @@ class Laserplot:
                     )
                     if standard_deviation is not None:
                         assert len(y_data) == len(standard_deviation)
+                Laserplot.stop_stage("reductions")
                 assert len(y_data) == x_ax_len
 
                 # nimmt zu viel Platz ein: Einfach dazu schreiben
@@ -787,11 +935,12 @@ class Laserplot:
                     interpolate=setting.interpolate,
                     num_others=len(plotting_settings) - 1,
                 )
-                collide_graph = Laserplot.data_to_plot(graphSettings, collide_graph)
+                Laserplot.data_to_plot(graphSettings)
+                graphs.append((x_data, y_data))
 
                 if not multiple_plots and not setting.single_wav:
                     if fig_colorful is None and ax_colorful is None:
-                        fig_colorful, ax_colorful = plt.subplots()
+                        fig_colorful, ax_colorful = Laserplot.figures.get("colorful")
                     graphSettings.fig = fig_colorful
                     graphSettings.ax = ax_colorful
                     graphSettings.rainbow = True
@@ -830,6 +979,18 @@ class Laserplot:
 
         title = "__".join(titles)
 
+        # nur bei mehreren Zeitabschnitten kann die Legende die Graphen verdecken, sonst (z. B.
+        # die Gleichungen der Fits bei interpolate) bleibt sie im Plot
+        crowded = any(
+            tle_set.sliced and not tle_set.single_wav for tle_set in plotting_settings
+        )
+        Laserplot.start_stage("legend")
+        for legend_fig, legend_ax in ((fig, ax), (fig_colorful, ax_colorful)):
+            # eine Legende nur, wenn es Graphen mit Label gibt
+            if legend_ax is not None and legend_ax.get_legend_handles_labels()[1]:
+                Laserplot.place_legend(legend_fig, legend_ax, graphs if crowded else [])
+        Laserplot.stop_stage("legend")
+
         # plt.title(title)
 
         if show_plots:
@@ -871,143 +1032,133 @@ class Laserplot:
             paths.append(root_plot_dir + "3d/")
             suffixes.append("_3d")
 
-        for fig, path, suffix in zip(figures, paths, suffixes):
-            fig.savefig(
-                os.path.join(setting.file_path, title + suffix + ".png"),
-                dpi=600,
-            )
+        # die gespeicherten Bilder (für das Manifest von generate_plots)
+        saved = []
+        # auch bei einem Fehler auf die PNGs warten, sonst landen ihre Futures (und Fehler) beim nächsten Aufruf
+        try:
+            for fig, path, suffix in zip(figures, paths, suffixes):
+                # nur das Rendern, die PNGs werden im Hintergrund kodiert (siehe FigureExporter)
+                Laserplot.start_stage("savefig" + suffix)
+                saved += Laserplot.exporter.export(
+                    fig, os.path.join(setting.file_path, title + suffix)
+                )
+                Laserplot.stop_stage("savefig" + suffix)
 
-            os.makedirs(path, 0o777, exist_ok=True)
+                Laserplot.start_stage("symlink")
+                os.makedirs(path, 0o777, exist_ok=True)
 
-            # relpath, da docker und host unterschiedliche roots haben
-            rel_path = (
-                os.path.relpath(
-                    os.path.abspath(setting.file_path), os.path.abspath(path)
+                # relpath, da docker und host unterschiedliche roots haben
+                rel_path = (
+                    os.path.relpath(
+                        os.path.abspath(setting.file_path), os.path.abspath(path)
+                    )
+                    + "/"
                 )
-                + "/"
-            )
-            cwd = os.getcwd()
-            os.chdir(os.path.abspath(path))
-            try:
-                src = rel_path + title + suffix + ".png"
-                dest = title + suffix + ".png"
-                if os.path.islink(dest):
-                    os.remove(dest)
-                os.symlink(src, dest)
-            except FileExistsError as e:
-                print("could not create symlink")
-                print(e.strerror)
-
-            os.chdir(cwd)
-
-    def update_live_plot(self, i, messdata):
-        """Plottet die aktuell gemessene Messung."""
-
-        # print(threading.current_thread() == threading.main_thread())
-
-        wav = messdata.wav
-        measurements = messdata.measurements
-
-        # trying to calculate a signal to noise ratio...
-        # mean_measurement = np.mean(measurements, axis=0)
-        # std_measurement = np.std(measurements, axis=0)
-        # with np.errstate(divide="ignore", invalid="ignore"):
-        #     snr = np.true_divide(std_measurement, mean_measurement)
-        #     snr[~np.isfinite(snr)] = 0  # set inf and NaN to 0
-        # print(snr)
-
-        curr_measurement_index = messdata.curr_measurement_index
-        curr_gradiant = messdata.curr_gradiant
-
-        if (
-            len(measurements) == 0
-            or curr_measurement_index < 0
-            or self.past_measurement_index == curr_measurement_index
-        ):
-            return
-
-        measurement = measurements[curr_gradiant][curr_measurement_index]
+                cwd = os.getcwd()
+                os.chdir(os.path.abspath(path))
+                try:
+                    src = rel_path + title + suffix + ".png"
+                    dest = title + suffix + ".png"
+                    if os.path.islink(dest):
+                        os.remove(dest)
+                    os.symlink(src, dest)
+                except FileExistsError as e:
+                    print("could not create symlink")
+                    print(e.strerror)
+
+                os.chdir(cwd)
+                Laserplot.stop_stage("symlink")
+        finally:
+            Laserplot.start_stage("encode")
+            Laserplot.exporter.wait()
+            Laserplot.stop_stage("encode")
+
+        return saved
+
+    def update_live_plot(self, i, shared):
+        """Plottet das neueste Spektrum, das die Messung mit Messdata.publish in shared veröffentlicht hat.
+
+        Es werden nur die Daten der Artists aus __init__ ausgetauscht und diese zurückgegeben,
+        FuncAnimation zeichnet dann nur sie neu (blitting). Achsen, Ticks usw. werden nur dann
+        neu gezeichnet, wenn die Daten den aktuellen Wertebereich verlassen.
+        """
 
-        label = f"Spektrum von Messung {curr_measurement_index + 1}"
-        self.live_ax.clear()
+        latest = Messdata.read_shared(shared)
+        if latest is None or latest[:2] == self.past_measurement:
+            # nichts Neues, also auch nichts neu zeichnen
+            return ()
 
-        settings = self.GraphSettings(
-            self.live_fig, self.live_ax, wav, measurement, label, True, "black", "-"
+        curr_gradiant, curr_measurement_index, measurement, count, mean, m2 = latest
+        wav = shared["wav"]
+        smoothed = scipy.signal.savgol_filter(
+            measurement, window_length=50, polyorder=5
         )
-        self.data_to_plot(settings)
 
-        self.past_measurement_index = curr_measurement_index
-        return (self.scatter,)
-
-    def suppressed_pause(self):
-        # if self.stop_event.is_set():
-        #     print(self.stop_event.is_set())
-        #     return
-        with warnings.catch_warnings():
-            warnings.filterwarnings("ignore", category=UserWarning)
-            # UserWarning: Starting a Matplotlib GUI outside of the main thread will likely fail.
-            plt.pause(0.1)
-
-    def live_thread_job(self):
+        self.scatter.set_offsets(np.column_stack((wav, measurement)))
+        self.live_line.set_data(wav, smoothed)
+        texts = self.live_legend.get_texts()
+        texts[0].set_text(f"Spektrum von Messung {curr_measurement_index + 1}")
+
+        # der laufende Mittelwert konvergiert, während die Messung läuft (siehe Messdata.get_statistics)
+        count, mean, _, snr = Messdata.statistics(count, mean, m2)
+        if count > 1:
+            self.mean_line.set_data(wav, mean)
+            texts[2].set_text(
+                f"Mittelwert von {count} Messungen (SNR {np.median(snr):.1f})"
+            )
+        else:
+            self.mean_line.set_data([], [])
+            texts[2].set_text("Mittelwert")
+
+        # die Grenzen nur ändern, wenn die Daten herausfallen (oder sich die Wellenlängen ändern)
+        redraw = False
+        if self.past_wav is not wav:
+            self.live_ax.set_xlim(wav[0], wav[-1])
+            self.past_wav = wav
+            redraw = True
+        low, high = self.live_ax.get_ylim()
+        data_low = min(np.min(measurement), np.min(mean) if count > 1 else low)
+        data_high = max(np.max(measurement), np.max(mean) if count > 1 else high)
+        if data_low < low or data_high > high:
+            # mit 10 % Puffer, damit nicht bei jedem etwas größeren Wert neu gezeichnet wird
+            self.live_ax.set_ylim(
+                min(low, max(0, data_low)), max(high, data_high * 1.1)
+            )
+            redraw = True
+        if redraw:
+            # Achsen und Ticks neu zeichnen, die Artists sind animated und werden dabei ausgelassen.
+            # Der Hintergrund für das blitting wird danach neu kopiert, da sich die Grenzen geändert haben.
+            self.live_fig.canvas.draw()
 
-        pause_thread = threading.Thread(
-            target=lambda: self.suppressed_pause(),  # ohne lambda wird es direkt ausgeführt
-            daemon=True,
-        )
-        pause_thread.start()  # aus einem Grund, den ich nicht kenne, exited plt.pause nie. plt.draw() und dann plt.show(block=False) hat auch nicht funktioniert.
-        while not self.stop_event.is_set():
-            time.sleep(1)
-            # pause_thread.join(timeout=1)
+        self.past_measurement = latest[:2]
+        return self.live_artists
 
-        # plt.cla()
-        # plt.clf()
-        plt.close(self.live_fig)
+    def start_gui(self, frames, shared, stop_event):
+        """Zeigt die Live-GUI, bis stop_event gesetzt oder das Fenster geschlossen wird.
 
-    def start_gui(self, frames, messdata):
+        Läuft im eigenen Prozess des LiveViewer, shared ist das Shared Memory von Messdata.share.
+        """
 
         self.live_animation = animation.FuncAnimation(
             fig=self.live_fig,
             func=self.update_live_plot,
             interval=25,
             frames=frames,
-            fargs=(messdata,),
-            # blit=True,
-        )
-
-        # funktioniert nicht, da kein shared mem
-        # self.live_thread = Process(
-        #     target=lambda: [self.suppressed_pause() for _ in iter(int, 1)], daemon=True
-        # )
-
-        self.live_thread = threading.Thread(
-            # target=lambda: [
-            #     self.suppressed_pause() for _ in iter(int, 1)
-            # ],  #
-            target=self.live_thread_job,
-            daemon=True,  # Main-Thread soll nicht auf den Thread warten
+            fargs=(shared,),
+            # die Artists werden vor dem ersten Kopieren des Hintergrunds animated gesetzt
+            init_func=lambda: self.live_artists,
+            blit=True,
+            cache_frame_data=False,
         )
-        self.live_thread.start()
-
-        # threading.Thread(
-        #     target=plt.show(),  # instead of plt.show()
-        #     daemon=True,  # Main-Thread soll nicht auf den Thread warten
-        # ).start()
-
-        # plt.show()
-
-        # threading.Thread(target=send_plot, daemon=True).start()
-        # plt.ioff()
 
-        # warten, bis der Thread gestartet ist
-        time.sleep(0.5)
+        def check_stop():
+            if stop_event.is_set():
+                plt.close(self.live_fig)
 
-    def stop_gui(self):
-        if hasattr(self, "stop_event") and hasattr(self, "live_thread"):
-            self.stop_event.set()
-            self.live_thread.join(timeout=5)
-            # self.live_animation.event_source.stop()
+        # der Timer läuft in der Event-Loop der GUI, es braucht keine weiteren Threads
+        timer = self.live_fig.canvas.new_timer(interval=100)
+        timer.add_callback(check_stop)
+        timer.start()
 
-        # self.live_thread.terminate()
-        # self.live_thread.join(timeout=3)
-        # if self.live_thread.is_alive():
-        #     self.live_thread.kill()
+        plt.show(block=True)
+        timer.stop()
@@ -0,0 +1,49 @@
+import multiprocessing
+
+from SharedArrays import SharedArrays
+
+
+class LiveViewer:
+    """Startet die Live-GUI (Laserplot.start_gui) in einem eigenen Prozess.
+
+    Die Messung veröffentlicht das neueste Spektrum über Messdata.share/publish in Shared
+    Memory, die GUI liest es von dort. Sie konkurriert so nicht um den GIL mit dem Auslesen
+    des Spektrometers und dem Timing des Arduino und kann keine Wiederholung verzögern.
+    """
+
+    def __init__(self, messdata, frames):
+        self.messdata = messdata
+        self.frames = frames
+        # spawn statt fork: der Prozess startet ohne die Threads und Geräte der Messung und lädt GTK selbst
+        self.context = multiprocessing.get_context("spawn")
+        self.stop_event = self.context.Event()
+        self.process = None
+
+    def start(self):
+        info = self.messdata.share()
+        self.process = self.context.Process(
+            target=LiveViewer.run,
+            args=(info, self.frames, self.stop_event),
+            daemon=True,  # Main-Prozess soll nicht auf die GUI warten
+        )
+        self.process.start()
+
+    def stop(self, timeout=5):
+        self.stop_event.set()
+        if self.process is not None:
+            self.process.join(timeout=timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join(timeout=timeout)
+        self.messdata.unshare()
+
+    @staticmethod
+    def run(info, frames, stop_event):
+        # erst hier, der Prozess der Messung importiert matplotlib nicht
+        from Laserplot import Laserplot
+
+        shared = SharedArrays.attach(info)
+        try:
+            Laserplot().start_gui(frames, shared, stop_event)
+        finally:
+            shared.close()
@@ -0,0 +1,215 @@
+import json
+import os
+import sys
+from collections import OrderedDict
+
+import numpy as np
+
+from MeasurementRecorder import MeasurementRecorder
+
+
+class MeasurementReader:
+    """Liest eine Messung über memory mapping, ohne den gesamten Datenwürfel zu laden.
+
+    Als Speicherformat wird das unkomprimierte Layout des MeasurementRecorder genutzt.
+    Existiert zu einer .npz-Datei noch keines (oder ist die .npz-Datei neuer), wird sie
+    einmalig konvertiert. Alle weiteren Zugriffe lesen nur die Seiten, die tatsächlich
+    gebraucht werden, z. B. nur eine Spalte bei single_wav.
+
+        reader = MeasurementReader(path, name)
+        reader[grad, interval_start:interval_end, zoom_start:zoom_end]
+    """
+
+    def __init__(self, file_path, code_name):
+        self.file_name = os.path.join(file_path, code_name)
+
+        if MeasurementReader.needs_conversion(self.file_name):
+            MeasurementReader.convert(self.file_name)
+
+        (
+            self.spectra,
+            self.wav,
+            self.timestamps,
+            self.written,
+        ) = MeasurementRecorder.load(self.file_name)
+
+    def __getitem__(self, key):
+        return self.spectra[key]
+
+    @property
+    def num_gradiants(self):
+        return self.spectra.shape[0]
+
+    @property
+    def repetitions(self):
+        return self.spectra.shape[1]
+
+    @staticmethod
+    def needs_conversion(file_name):
+        npz_name = file_name + ".npz"
+        if not os.path.isfile(npz_name):
+            # es gibt nur die (eventuell unvollständige) Aufnahme
+            return False
+        if not MeasurementRecorder.exists(file_name):
+            return True
+
+        with open(file_name + MeasurementRecorder.SIDECAR_SUFFIX, "r") as sidecar:
+            source_mtime = json.load(sidecar).get("source_mtime_ns")
+        return source_mtime != os.stat(npz_name).st_mtime_ns
+
+    @staticmethod
+    def register_source(file_name):
+        """Vermerkt, dass die Aufnahme bereits dem Inhalt der .npz-Datei entspricht (keine erneute Konvertierung)."""
+
+        sidecar_name = file_name + MeasurementRecorder.SIDECAR_SUFFIX
+        with open(sidecar_name, "r") as sidecar:
+            info = json.load(sidecar)
+        info["source_mtime_ns"] = os.stat(file_name + ".npz").st_mtime_ns
+
+        MeasurementReader.write_json(sidecar_name, info)
+
+    @staticmethod
+    def convert(file_name):
+        """Entpackt die .npz-Datei einmalig in das unkomprimierte Layout."""
+
+        npz_name = file_name + ".npz"
+        source_mtime = os.stat(npz_name).st_mtime_ns
+
+        loaded_array = np.load(npz_name)
+        spectrometer_data_gradient = loaded_array["arr_0"]
+        wav = loaded_array["arr_1"]
+        time_stamps_gradient = loaded_array["arr_2"]
+        del loaded_array
+
+        # alte Messungen haben noch keine Gradiant-Messung, dort ist num_gradiants immer default 1
+        if len(spectrometer_data_gradient.shape) < 3:
+            spectrometer_data_gradient = np.array((spectrometer_data_gradient,))
+
+        if len(time_stamps_gradient.shape) < 2:
+            time_stamps_gradient = np.array((time_stamps_gradient,))
+
+        # erst in temporäre Dateien schreiben und dann atomar ersetzen, damit parallele Prozesse
+        # (generate_plots) niemals halb geschriebene Dateien öffnen
+        tmp_suffix = f".{os.getpid()}.tmp"
+
+        for suffix, array in (
+            (MeasurementRecorder.SPECTRA_SUFFIX, spectrometer_data_gradient),
+            (MeasurementRecorder.TIMESTAMPS_SUFFIX, time_stamps_gradient),
+            (MeasurementRecorder.WAV_SUFFIX, wav),
+        ):
+            with open(file_name + suffix + tmp_suffix, "wb") as npy_file:
+                np.save(npy_file, np.asarray(array, dtype=float))
+            os.replace(file_name + suffix + tmp_suffix, file_name + suffix)
+            os.chmod(file_name + suffix, 0o777)
+
+        # der Sidecar zuletzt: erst jetzt gilt die Konvertierung als abgeschlossen
+        MeasurementReader.write_json(
+            file_name + MeasurementRecorder.SIDECAR_SUFFIX,
+            {
+                "shape": list(spectrometer_data_gradient.shape),
+                "written": [spectrometer_data_gradient.shape[1]]
+                * len(spectrometer_data_gradient),
+                "complete": True,
+                "source_mtime_ns": source_mtime,
+            },
+        )
+        os.chmod(file_name + MeasurementRecorder.SIDECAR_SUFFIX, 0o777)
+
+    @staticmethod
+    def write_json(json_name, data):
+        tmp_name = json_name + f".{os.getpid()}.tmp"
+        with open(tmp_name, "w", encoding="utf-8") as json_file:
+            json.dump(data, json_file, indent=4)
+        os.replace(tmp_name, json_name)
+
+
+class MeasurementCache:
+    """Prozess-lokaler LRU-Cache für bereits gelesene Messungen.
+
+    Der Schlüssel ist der Dateiname zusammen mit der mtime der Quelle (.npz oder Aufnahme),
+    eine geänderte Messung wird also automatisch neu gelesen. Standardmäßig werden nur die
+    memory-mapped Arrays gehalten (der "Cache" ist dann das unkomprimierte Layout auf der
+    Festplatte bzw. der Page Cache, den sich alle Worker teilen), gelesen wird also weiterhin
+    nur, was ein Plot braucht. Mit in_memory=True werden die Arrays vollständig gelesen, das
+    lohnt sich nur für kleine Messungen, die oft geplottet werden, und kostet den Speicher in
+    jedem Prozess. Werden mehr als max_bytes belegt oder mehr als max_entries Messungen
+    gehalten, werden die am längsten nicht genutzten Messungen entfernt.
+    """
+
+    def __init__(self, max_bytes=256 * 1024**2, in_memory=False, max_entries=32):
+        self.max_bytes = max_bytes
+        self.in_memory = in_memory
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(file_path, code_name):
+        file_name = os.path.abspath(os.path.join(file_path, code_name))
+        source = (
+            file_name + ".npz"
+            if os.path.isfile(file_name + ".npz")
+            else file_name + MeasurementRecorder.SIDECAR_SUFFIX
+        )
+        return file_name, os.stat(source).st_mtime_ns
+
+    def get(self, file_path, code_name):
+        """Gibt die Spektren, die Wellenlängen, die Zeitstempel und written zurück (read-only)."""
+
+        key = MeasurementCache.key(file_path, code_name)
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key][0]
+
+        self.misses += 1
+        reader = MeasurementReader(file_path, code_name)
+        arrays = (reader.spectra, reader.wav, reader.timestamps, reader.written)
+        if self.in_memory:
+            arrays = tuple(np.array(array) for array in arrays)
+        for array in arrays:
+            array.setflags(write=False)
+
+        size = sum(array.nbytes for array in arrays) if self.in_memory else 0
+
+        # ältere Versionen der gleichen Messung werden nicht mehr gebraucht
+        for old_key in [k for k in self.entries if k[0] == key[0]]:
+            self.remove(old_key)
+
+        self.entries[key] = (arrays, size)
+        self.used_bytes += size
+        while len(self.entries) > 1 and (
+            self.used_bytes > self.max_bytes or len(self.entries) > self.max_entries
+        ):
+            self.remove(next(iter(self.entries)))
+
+        return arrays
+
+    def remove(self, key):
+        _, size = self.entries.pop(key)
+        self.used_bytes -= size
+
+    def clear(self):
+        self.entries.clear()
+        self.used_bytes = 0
+
+
+# wird von Laserplot genutzt, damit make_plots jede Messung nur einmal öffnet (memory-mapped, pro Worker)
+measurement_cache = MeasurementCache()
+
+
+if __name__ == "__main__":
+    # einmalige Konvertierung eines ganzen Ordners (z. B. messungen/)
+    from MeasurementSummary import MeasurementSummary
+
+    root = sys.argv[1] if len(sys.argv) > 1 else "messungen/"
+    for dir_path, _, files in os.walk(root):
+        for file in files:
+            if not file.endswith(".npz") or file.endswith(MeasurementSummary.SUFFIX):
+                continue
+            file_name = os.path.join(dir_path, os.path.splitext(file)[0])
+            if MeasurementReader.needs_conversion(file_name):
+                print(f"converting {file_name}")
+                MeasurementReader.convert(file_name)
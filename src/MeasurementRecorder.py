@@ -0,0 +1,140 @@
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+class MeasurementRecorder:
+    """Schreibt die Spektren einer laufenden Messung direkt auf die Festplatte.
+
+    Statt alles erst am Ende mit np.savez_compressed zu speichern, wird jedes Spektrum
+    (und sein Zeitstempel) sofort in eine unkomprimierte .npy-Datei (memmap) geschrieben.
+    Eine kleine JSON-Datei (Sidecar) hält fest, wie viele Wiederholungen pro Gradient
+    bereits geschrieben wurden. Stürzt die Messung ab, sind die Daten bis zum letzten
+    Flush trotzdem vorhanden und können von Laserplot geöffnet werden.
+
+    Layout (file_name ohne Endung):
+        <file_name>.spectra.npy     (num_gradiants, repetitions, len(wav)) float64
+        <file_name>.timestamps.npy  (num_gradiants, repetitions) float64
+        <file_name>.wav.npy         (len(wav),) float64
+        <file_name>.rec.json        Fortschritt (written) und ob die Messung fertig ist
+    """
+
+    SPECTRA_SUFFIX = ".spectra.npy"
+    TIMESTAMPS_SUFFIX = ".timestamps.npy"
+    WAV_SUFFIX = ".wav.npy"
+    SIDECAR_SUFFIX = ".rec.json"
+
+    def __init__(self, file_name, num_gradiants, repetitions, wav, flush_interval=1.0):
+        self.file_name = file_name
+        self.flush_interval = flush_interval
+
+        self.spectra = np.lib.format.open_memmap(
+            file_name + self.SPECTRA_SUFFIX,
+            mode="w+",
+            dtype=float,
+            shape=(num_gradiants, repetitions, len(wav)),
+        )
+        self.timestamps = np.lib.format.open_memmap(
+            file_name + self.TIMESTAMPS_SUFFIX,
+            mode="w+",
+            dtype=float,
+            shape=(num_gradiants, repetitions),
+        )
+        np.save(file_name + self.WAV_SUFFIX, np.asarray(wav, dtype=float))
+
+        # Anzahl der (zusammenhängend von vorne) geschriebenen Wiederholungen pro Gradient
+        self.written = [0] * num_gradiants
+        self.complete = False
+        self.write_sidecar()
+
+        # unbegrenzt, damit put() den Mess-Thread niemals blockiert
+        self.queue = queue.Queue()
+        self.writer_thread = threading.Thread(target=self.writer_job, daemon=True)
+        self.writer_thread.start()
+
+    def append(self, gradiant, index, spectrum, timestamp):
+        """Reiht ein Spektrum zum Schreiben ein. Wird vom Mess-Thread aufgerufen und kehrt sofort zurück."""
+        self.queue.put((gradiant, index, spectrum, timestamp))
+
+    def writer_job(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = ()
+
+            if item is None:
+                break
+
+            if item:
+                gradiant, index, spectrum, timestamp = item
+                self.spectra[gradiant][index] = spectrum
+                self.timestamps[gradiant][index] = timestamp
+                self.written[gradiant] = max(self.written[gradiant], index + 1)
+
+            if time.monotonic() - last_flush >= self.flush_interval:
+                self.flush()
+                last_flush = time.monotonic()
+
+        self.flush()
+
+    def flush(self):
+        # erst die Daten, dann den Fortschritt, damit der Sidecar nie mehr verspricht als vorhanden ist
+        self.spectra.flush()
+        self.timestamps.flush()
+        self.write_sidecar()
+
+    def write_sidecar(self):
+        tmp_name = self.file_name + self.SIDECAR_SUFFIX + ".tmp"
+        with open(tmp_name, "w", encoding="utf-8") as sidecar:
+            json.dump(
+                {
+                    "shape": list(self.spectra.shape),
+                    "written": self.written,
+                    "complete": self.complete,
+                },
+                sidecar,
+                indent=4,
+            )
+        # atomar, damit ein Leser niemals eine halb geschriebene Datei sieht
+        os.replace(tmp_name, self.file_name + self.SIDECAR_SUFFIX)
+
+    def close(self, complete=True):
+        """Schreibt alle noch ausstehenden Spektren und beendet den Schreib-Thread."""
+        self.queue.put(None)
+        self.writer_thread.join()
+        self.complete = complete
+        self.write_sidecar()
+        for suffix in (
+            self.SPECTRA_SUFFIX,
+            self.TIMESTAMPS_SUFFIX,
+            self.WAV_SUFFIX,
+            self.SIDECAR_SUFFIX,
+        ):
+            os.chmod(self.file_name + suffix, 0o777)
+
+    @staticmethod
+    def exists(file_name):
+        return os.path.isfile(file_name + MeasurementRecorder.SIDECAR_SUFFIX)
+
+    @staticmethod
+    def load(file_name):
+        """Öffnet eine (auch unvollständige) Aufnahme.
+
+        Gibt die Spektren, die Wellenlängen, die Zeitstempel und die Anzahl der
+        geschriebenen Wiederholungen pro Gradient zurück.
+        """
+        with open(file_name + MeasurementRecorder.SIDECAR_SUFFIX, "r") as sidecar:
+            written = json.load(sidecar)["written"]
+
+        return (
+            np.load(file_name + MeasurementRecorder.SPECTRA_SUFFIX, mmap_mode="r"),
+            np.load(file_name + MeasurementRecorder.WAV_SUFFIX),
+            np.load(file_name + MeasurementRecorder.TIMESTAMPS_SUFFIX, mmap_mode="r"),
+            np.array(written, dtype=int),
+        )
@@ -0,0 +1,193 @@
+import os
+import sys
+
+import numpy as np
+
+
+class MeasurementSummary:
+    """Vorberechnete Statistiken einer Messung, die neben der .npz-Datei gespeichert werden.
+
+    <file_name>.summary.npz enthält pro Gradient Mittelwert, Standardabweichung, Minimum
+    und Maximum über alle Wiederholungen und dazu pro Block von BLOCK Wiederholungen den
+    Mittelwert und die Summe der quadrierten Abweichungen (M2, wie bei Welford) als float32.
+    Mittelwert und Standardabweichung eines beliebigen Zeitabschnitts werden aus den
+    vollständig enthaltenen Blöcken zusammengesetzt, nur die Wiederholungen an den Rändern
+    werden aus den Rohdaten gelesen (höchstens 2 * BLOCK Zeilen). Die Datei ist damit etwa
+    1 / BLOCK so groß wie die Rohdaten.
+    """
+
+    SUFFIX = ".summary.npz"
+    BLOCK = 64
+
+    def __init__(self, mean, std, minimum, maximum, written, block_mean, block_m2):
+        self.mean = mean
+        self.std = std
+        self.min = minimum
+        self.max = maximum
+        self.written = written
+        # (num_gradiants, ceil(repetitions / BLOCK), len(wav)), unvollständige Blöcke sind 0
+        self.block_mean = block_mean
+        self.block_m2 = block_m2
+
+    @staticmethod
+    def compute(spectra, written, mean=None, std=None):
+        """Berechnet die Statistiken. Mittelwert und Standardabweichung können schon bekannt sein (siehe Messdata.get_statistics)."""
+        num_gradiants, repetitions, num_wav = spectra.shape
+        num_blocks = -(-repetitions // MeasurementSummary.BLOCK)
+
+        known_moments = mean is not None and std is not None
+        if not known_moments:
+            mean = np.zeros((num_gradiants, num_wav))
+            std = np.zeros((num_gradiants, num_wav))
+        minimum = np.zeros((num_gradiants, num_wav))
+        maximum = np.zeros((num_gradiants, num_wav))
+        block_mean = np.zeros((num_gradiants, num_blocks, num_wav), dtype=np.float32)
+        block_m2 = np.zeros((num_gradiants, num_blocks, num_wav), dtype=np.float32)
+
+        for grad in range(num_gradiants):
+            data = np.asarray(spectra[grad][: written[grad]], dtype=float)
+            if len(data) == 0:
+                continue
+            if not known_moments:
+                mean[grad] = np.mean(data, axis=0)
+                std[grad] = np.std(data, axis=0)
+            minimum[grad] = np.min(data, axis=0)
+            maximum[grad] = np.max(data, axis=0)
+
+            # nur vollständige Blöcke, der Rest wird bei interval aus den Rohdaten gelesen
+            full_blocks = len(data) // MeasurementSummary.BLOCK
+            blocks = data[: full_blocks * MeasurementSummary.BLOCK].reshape(
+                full_blocks, MeasurementSummary.BLOCK, num_wav
+            )
+            block_mean[grad][:full_blocks] = np.mean(blocks, axis=1)
+            block_m2[grad][:full_blocks] = np.sum(
+                (blocks - np.mean(blocks, axis=1, keepdims=True)) ** 2, axis=1
+            )
+
+        return MeasurementSummary(
+            mean,
+            std,
+            minimum,
+            maximum,
+            np.asarray(written, dtype=int),
+            block_mean,
+            block_m2,
+        )
+
+    def save(self, file_name):
+        np.savez(
+            file_name + self.SUFFIX,
+            mean=self.mean,
+            std=self.std,
+            min=self.min,
+            max=self.max,
+            written=self.written,
+            block_mean=self.block_mean,
+            block_m2=self.block_m2,
+        )
+        os.chmod(file_name + self.SUFFIX, 0o777)
+
+    @staticmethod
+    def load(file_name):
+        """Lädt die Statistiken. Gibt None zurück, wenn es keine gibt oder sie älter als die Messung sind."""
+
+        if not os.path.isfile(file_name + MeasurementSummary.SUFFIX):
+            return None
+
+        if (
+            os.path.isfile(file_name + ".npz")
+            and os.stat(file_name + ".npz").st_mtime_ns
+            > os.stat(file_name + MeasurementSummary.SUFFIX).st_mtime_ns
+        ):
+            return None
+
+        with np.load(file_name + MeasurementSummary.SUFFIX) as loaded_array:
+            # Statistiken aus einer älteren Version (ohne Blöcke) werden neu berechnet
+            if "block_mean" not in loaded_array:
+                return None
+            return MeasurementSummary(
+                loaded_array["mean"],
+                loaded_array["std"],
+                loaded_array["min"],
+                loaded_array["max"],
+                loaded_array["written"],
+                loaded_array["block_mean"],
+                loaded_array["block_m2"],
+            )
+
+    @staticmethod
+    def combine(counts, means, m2s):
+        """Fasst Teilmengen (Anzahl, Mittelwert, M2 entlang axis 0) zu Anzahl, Mittelwert und M2 zusammen (Chan et al.)."""
+
+        counts = np.asarray(counts, dtype=float).reshape(-1, 1)
+        n = np.sum(counts)
+        mean = np.sum(counts * means, axis=0) / n
+        m2 = np.sum(m2s + counts * (means - mean) ** 2, axis=0)
+        return n, mean, m2
+
+    def interval(
+        self, spectra, grad, interval_start, interval_end, zoom_start, zoom_end
+    ):
+        """Mittelwert und Standardabweichung der Wiederholungen [interval_start, interval_end) im Zoom-Bereich.
+
+        spectra: die Rohdaten der Messung (z. B. memory-mapped), für die Ränder des Zeitabschnitts.
+        """
+
+        interval_end = min(interval_end, self.written[grad])
+        # die Blöcke, die vollständig im Zeitabschnitt liegen
+        first_block = -(-interval_start // self.BLOCK)
+        last_block = max(first_block, interval_end // self.BLOCK)
+
+        counts, means, m2s = [], [], []
+        if last_block > first_block:
+            counts += [self.BLOCK] * (last_block - first_block)
+            means.append(
+                self.block_mean[grad][first_block:last_block, zoom_start:zoom_end]
+            )
+            m2s.append(self.block_m2[grad][first_block:last_block, zoom_start:zoom_end])
+            edges = (
+                (interval_start, first_block * self.BLOCK),
+                (last_block * self.BLOCK, interval_end),
+            )
+        else:
+            edges = ((interval_start, interval_end),)
+
+        for start, end in edges:
+            if end <= start:
+                continue
+            data = np.asarray(
+                spectra[grad][start:end, zoom_start:zoom_end], dtype=float
+            )
+            counts.append(len(data))
+            means.append(np.mean(data, axis=0, keepdims=True))
+            m2s.append(
+                np.sum((data - means[-1]) ** 2, axis=0, keepdims=True, dtype=float)
+            )
+
+        if not counts:
+            # leerer Zeitabschnitt, wie np.mean einer leeren Auswahl
+            empty = np.full(zoom_end - zoom_start, np.nan)
+            return empty, empty
+
+        n, mean, m2 = MeasurementSummary.combine(
+            counts, np.concatenate(means), np.concatenate(m2s)
+        )
+        return mean, np.sqrt(m2 / n)
+
+
+if __name__ == "__main__":
+    # Statistiken für bereits existierende Messungen nachträglich berechnen
+    from MeasurementReader import MeasurementReader
+
+    root = sys.argv[1] if len(sys.argv) > 1 else "messungen/"
+    for dir_path, _, files in os.walk(root):
+        for file in files:
+            if not file.endswith(".npz") or file.endswith(MeasurementSummary.SUFFIX):
+                continue
+            code_name = file[: -len(".npz")]
+            file_name = os.path.join(dir_path, code_name)
+            if MeasurementSummary.load(file_name) is not None:
+                continue
+            print(f"computing summary for {file_name}")
+            reader = MeasurementReader(dir_path, code_name)
+            MeasurementSummary.compute(reader.spectra, reader.written).save(file_name)
@@ -0,0 +1,164 @@
+import numpy as np
+
+from PhaseTimings import PhaseTimings
+from SharedArrays import SharedArrays
+
+
+class Messdata:
+    """Die Spektren und Zeitstempel einer Messung, mit laufenden Statistiken pro Gradient.
+
+    Mit share() wird das jeweils neueste Spektrum (samt Statistiken und Indizes) zusätzlich in
+    Shared Memory veröffentlicht, sobald curr_measurement_index gesetzt wird. Die Live-GUI liest
+    es in einem eigenen Prozess (siehe LiveViewer), ohne die Messung aufzuhalten.
+    """
+
+    def __init__(self, num_gradiants, repetitions, wav):
+        # siehe share
+        self.shared = None
+        self.measurements = np.zeros(
+            (num_gradiants, repetitions, len(wav)), dtype=float
+        )
+        self.timestamps = np.zeros((num_gradiants, repetitions), dtype=float)
+        self.wav = wav
+        self.curr_gradiant = -1
+        self.curr_measurement_index = -1
+        # schreibt die Spektren während der Messung auf die Festplatte (siehe Lasermessung.start_recording)
+        self.recorder = None
+
+        # wie viele Zeilen pro Gradient gemessen wurden (höchster Index + 1, wie beim MeasurementRecorder)
+        self.written = np.zeros(num_gradiants, dtype=int)
+        # laufender Mittelwert und Varianz pro Gradient (Welford-Algorithmus)
+        self.count = np.zeros(num_gradiants, dtype=int)
+        self.running_mean = np.zeros((num_gradiants, len(wav)), dtype=float)
+        self.running_m2 = np.zeros((num_gradiants, len(wav)), dtype=float)
+        # Zwischenspeicher, damit beim Aktualisieren nichts neu alloziert wird
+        self.delta = np.zeros(len(wav), dtype=float)
+        self.delta_new = np.zeros(len(wav), dtype=float)
+
+        # Dauer der einzelnen Schritte jeder Wiederholung
+        self.timings = PhaseTimings(num_gradiants, repetitions)
+
+    def get_data(self):
+        return self.measurements, self.wav, self.curr_measurement_index
+
+    def store(self, index, spectrum, timestamp):
+        """Speichert ein Spektrum des aktuellen Gradienten."""
+        self.measurements[self.curr_gradiant][index] = spectrum
+        self.timestamps[self.curr_gradiant][index] = timestamp
+        self.written[self.curr_gradiant] = max(
+            self.written[self.curr_gradiant], index + 1
+        )
+        self.update_statistics(self.curr_gradiant, spectrum)
+        if self.recorder is not None:
+            # die gespeicherte Zeile statt spectrum übergeben, spectrum kann ein wiederverwendeter Puffer sein
+            self.recorder.append(
+                self.curr_gradiant,
+                index,
+                self.measurements[self.curr_gradiant][index],
+                timestamp,
+            )
+
+    def update_statistics(self, gradiant, spectrum):
+        """Aktualisiert Mittelwert und Varianz in O(len(wav))."""
+        self.count[gradiant] += 1
+        mean = self.running_mean[gradiant]
+        np.subtract(spectrum, mean, out=self.delta)
+        np.divide(self.delta, self.count[gradiant], out=self.delta_new)
+        mean += self.delta_new
+        np.subtract(spectrum, mean, out=self.delta_new)
+        self.delta *= self.delta_new
+        self.running_m2[gradiant] += self.delta
+
+    def get_statistics(self, gradiant=None):
+        """Gibt die Anzahl der Spektren, den Mittelwert, die Standardabweichung und das SNR pro Wellenlänge zurück."""
+        if gradiant is None:
+            gradiant = self.curr_gradiant
+        return Messdata.statistics(
+            self.count[gradiant],
+            self.running_mean[gradiant].copy(),
+            self.running_m2[gradiant],
+        )
+
+    @staticmethod
+    def statistics(count, mean, m2):
+        """Berechnet Standardabweichung und SNR aus dem laufenden Mittelwert und m2 (siehe update_statistics)."""
+        # Standardabweichung der Grundgesamtheit, wie np.std
+        std = np.sqrt(m2 / count) if count else np.zeros_like(mean)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            snr = np.true_divide(mean, std)
+            snr[~np.isfinite(snr)] = 0  # inf und NaN auf 0 setzen
+        return count, mean, std, snr
+
+    @property
+    def curr_measurement_index(self):
+        return self._curr_measurement_index
+
+    @curr_measurement_index.setter
+    def curr_measurement_index(self, index):
+        self._curr_measurement_index = index
+        if self.shared is not None and index >= 0:
+            self.publish()
+
+    def share(self):
+        """Legt den Speicher für das neueste Spektrum an und gibt die Beschreibung für SharedArrays.attach zurück."""
+        num_wav = len(self.wav)
+        self.shared = SharedArrays(
+            {
+                # Gradient, Index und eine Versionsnummer (ungerade, solange geschrieben wird)
+                "state": ((3,), np.int64),
+                "wav": ((num_wav,), np.float64),
+                "spectrum": ((num_wav,), np.float64),
+                "timestamp": ((1,), np.float64),
+                "count": ((1,), np.int64),
+                "mean": ((num_wav,), np.float64),
+                "m2": ((num_wav,), np.float64),
+            }
+        )
+        self.shared["wav"][:] = self.wav
+        self.shared["state"][:2] = -1
+        return self.shared.info()
+
+    def unshare(self):
+        if self.shared is not None:
+            shared, self.shared = self.shared, None
+            shared.close()
+
+    def publish(self):
+        """Kopiert das aktuelle Spektrum in das Shared Memory (nur wenige KiB, unabhängig von der Anzahl der Wiederholungen)."""
+        gradiant = self.curr_gradiant
+        index = self._curr_measurement_index
+        shared = self.shared
+        state = shared["state"]
+        state[2] += 1
+        shared["spectrum"][:] = self.measurements[gradiant][index]
+        shared["timestamp"][0] = self.timestamps[gradiant][index]
+        shared["count"][0] = self.count[gradiant]
+        shared["mean"][:] = self.running_mean[gradiant]
+        shared["m2"][:] = self.running_m2[gradiant]
+        state[0] = gradiant
+        state[1] = index
+        state[2] += 1
+
+    @staticmethod
+    def read_shared(shared):
+        """Liest das neueste Spektrum aus dem Shared Memory eines anderen Prozesses.
+
+        Gibt (gradiant, index, spectrum, count, mean, m2) zurück, oder None, wenn noch nichts
+        veröffentlicht wurde oder gerade geschrieben wird.
+        """
+        state = shared["state"]
+        version = int(state[2])
+        if version % 2 == 1 or state[1] < 0:
+            return None
+        latest = (
+            int(state[0]),
+            int(state[1]),
+            shared["spectrum"].copy(),
+            int(shared["count"][0]),
+            shared["mean"].copy(),
+            shared["m2"].copy(),
+        )
+        # während des Kopierens wurde bereits das nächste Spektrum veröffentlicht
+        if int(state[2]) != version:
+            return None
+        return latest
@@ -0,0 +1,83 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+
+class PhaseTimings:
+    """Misst, wie lange die einzelnen Schritte jeder Wiederholung dauern.
+
+    Die Dauern (in ms) landen in einem strukturierten Array (num_gradiants, repetitions),
+    das als <file_name>.timings.npy neben den Spektren gespeichert wird.
+
+        timings.begin(gradiant, i)
+        self.turn_on_laser(wait=False)
+        timings.lap("arduino_write")  # Zeit seit dem letzten lap/begin aufaddieren
+    """
+
+    FIELDS = ("arduino_write", "laser_on", "read", "store", "sleep")
+    DTYPE = np.dtype([(field, np.float64) for field in FIELDS])
+    SUFFIX = ".timings.npy"
+
+    def __init__(self, num_gradiants, repetitions):
+        self.timings = np.zeros((num_gradiants, repetitions), dtype=self.DTYPE)
+        self.current = None
+        self.last_ns = 0
+
+    def begin(self, gradiant, index):
+        self.current = self.timings[gradiant][index]
+        self.last_ns = time.perf_counter_ns()
+
+    def lap(self, field):
+        now = time.perf_counter_ns()
+        self.current[field] += (now - self.last_ns) / 1e6
+        self.last_ns = now
+
+    def save(self, file_name):
+        np.save(file_name + self.SUFFIX, self.timings)
+        os.chmod(file_name + self.SUFFIX, 0o777)
+
+    @staticmethod
+    def report(timings, inttime, threshold=1.0, repetitions=None):
+        """Gibt Perzentile pro Schritt aus und listet Wiederholungen, deren Auslesen länger als INTTIME + threshold ms gedauert hat.
+
+        timings: Array mit PhaseTimings.DTYPE, (repetitions,) oder (num_gradiants, repetitions).
+        """
+
+        single_gradiant = timings.ndim == 1
+        timings = np.atleast_2d(timings)
+        if repetitions is not None:
+            timings = timings[:, :repetitions]
+
+        print("step: p50 / p90 / p99 / max (ms)")
+        for field in PhaseTimings.FIELDS:
+            p50, p90, p99, maximum = np.percentile(timings[field], (50, 90, 99, 100))
+            print(f"  {field}: {p50:.3f} / {p90:.3f} / {p99:.3f} / {maximum:.3f}")
+
+        total = sum(timings[field] for field in PhaseTimings.FIELDS)
+        print(f"  total: {np.median(total):.3f} ms (median)")
+
+        slow_reads = np.argwhere(timings["read"] > inttime + threshold)
+        if len(slow_reads):
+            print(
+                f"\033[31m{len(slow_reads)} reads took longer than {inttime} + {threshold} ms:\033[0m"
+            )
+            for gradiant, index in slow_reads[:20]:
+                print(
+                    "  "
+                    + ("" if single_gradiant else f"gradient {gradiant}, ")
+                    + f"repetition {index}: {timings['read'][gradiant][index]:.3f} ms"
+                )
+
+
+if __name__ == "__main__":
+    # Report zu einer gespeicherten Messung, z. B. python PhaseTimings.py messungen/<Typ>/Puls/<Name>
+    from MeasurementSettings import MeasurementSettings
+
+    file_name = sys.argv[1]
+    threshold = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    m_settings = MeasurementSettings.from_json(file_name + ".json")
+    PhaseTimings.report(
+        np.load(file_name + PhaseTimings.SUFFIX), m_settings.specto.INTTIME, threshold
+    )
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+
+
+class PlotManifest:
+    """Merkt sich für generate_plots, woraus die gespeicherten Bilder entstanden sind.
+
+    Pro Plot (ein Aufruf von Laserplot.plot_results, identifiziert über seine
+    PlottingSettings) stehen im Manifest der Hash der .npz- und .json-Datei der Messung, die
+    Version des Plot-Codes (Hash von CODE_FILES), die Einstellungen des Exports (config, z. B.
+    die DPI) und die gespeicherten Bilder. Ein Plot muss nur neu erstellt werden, wenn sich
+    davon etwas geändert hat oder ein Bild fehlt:
+
+        manifest = PlotManifest.load(PlotManifest.PATH, repr(FigureExporter(...)))
+        if not manifest.is_current(settings):
+            manifest.record(settings, Laserplot.plot_results(settings, m_settings))
+        manifest.save()
+
+    Die Hashes der Messungen werden mit Größe und mtime gespeichert und nur neu berechnet,
+    wenn sich diese geändert haben. Die .npy-Dateien und die MeasurementSummary werden aus
+    der .npz-Datei erzeugt und deshalb nicht mitgezählt.
+    """
+
+    PATH = "plots/manifest.json"
+    # alles, was das Aussehen der Bilder bestimmt
+    CODE_FILES = (
+        "Laserplot.py",
+        "FigurePool.py",
+        "FigureExporter.py",
+        "PlottingSettings.py",
+        "MeasurementSettings.py",
+        "MeasurementReader.py",
+        "MeasurementRecorder.py",
+        "MeasurementSummary.py",
+    )
+    SOURCE_SUFFIXES = (".npz", ".json")
+
+    def __init__(self, path, config="", plots=None, sources=None):
+        self.path = path
+        self.config = config
+        # Schlüssel der Settings -> {"sources", "code", "outputs"}
+        self.plots = {} if plots is None else plots
+        # Pfad -> {"size", "mtime_ns", "sha256"}
+        self.sources = {} if sources is None else sources
+        self.code = PlotManifest.code_version()
+        # die Plots, die in diesem Durchlauf geprüft wurden (für remove_unseen)
+        self.seen = set()
+
+    @staticmethod
+    def load(path, config=""):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                content = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return PlotManifest(path, config)
+        return PlotManifest(path, config, content["plots"], content["sources"])
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", 0o777, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"plots": self.plots, "sources": self.sources}, f, indent=1)
+        # erst ersetzen, wenn alles geschrieben ist
+        os.replace(tmp_path, self.path)
+        os.chmod(self.path, 0o777)
+
+    @staticmethod
+    def code_version():
+        directory = os.path.dirname(os.path.abspath(__file__))
+        sha = hashlib.sha256()
+        for file in PlotManifest.CODE_FILES:
+            with open(os.path.join(directory, file), "rb") as f:
+                sha.update(f.read())
+        return sha.hexdigest()
+
+    @staticmethod
+    def key(plotting_settings):
+        # vars, da plot_results die Settings verändert, muss der Schlüssel vorher erstellt werden
+        return json.dumps(
+            [vars(setting) for setting in plotting_settings],
+            sort_keys=True,
+            default=str,
+        )
+
+    def source_hash(self, path):
+        stat = os.stat(path)
+        cached = self.sources.get(path)
+        if (
+            cached is not None
+            and cached["size"] == stat.st_size
+            and cached["mtime_ns"] == stat.st_mtime_ns
+        ):
+            return cached["sha256"]
+
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha.update(chunk)
+        self.sources[path] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha.hexdigest(),
+        }
+        return self.sources[path]["sha256"]
+
+    def source_hashes(self, plotting_settings):
+        files = sorted(
+            {
+                os.path.join(setting.file_path, setting.code_name) + suffix
+                for setting in plotting_settings
+                for suffix in self.SOURCE_SUFFIXES
+            }
+        )
+        return {file: self.source_hash(file) for file in files}
+
+    def is_current(self, plotting_settings):
+        key = PlotManifest.key(plotting_settings)
+        self.seen.add(key)
+        entry = self.plots.get(key)
+        return (
+            entry is not None
+            and entry["code"] == self.code
+            and entry.get("config") == self.config
+            and entry["sources"] == self.source_hashes(plotting_settings)
+            and all(os.path.isfile(output) for output in entry["outputs"])
+        )
+
+    def record(self, plotting_settings, outputs):
+        """Vermerkt die Bilder eines Plots (mit den Settings vor plot_results, siehe key)."""
+
+        key = PlotManifest.key(plotting_settings)
+        self.seen.add(key)
+        old_outputs = self.plots.get(key, {"outputs": []})["outputs"]
+        self.plots[key] = {
+            "sources": self.source_hashes(plotting_settings),
+            "code": self.code,
+            "config": self.config,
+            "outputs": list(outputs),
+        }
+        # z. B. ein anderer Titel, weil sich die Länge der Messung geändert hat
+        PlotManifest.remove_files(set(old_outputs) - set(outputs))
+
+    def remove_unseen(self):
+        """Löscht die Bilder der Plots, die es nicht mehr gibt (z. B. Messung gelöscht, Plot deaktiviert)."""
+
+        current = {
+            output
+            for key in self.seen
+            if key in self.plots
+            for output in self.plots[key]["outputs"]
+        }
+        for key in set(self.plots) - self.seen:
+            PlotManifest.remove_files(set(self.plots.pop(key)["outputs"]) - current)
+        for path in set(self.sources):
+            if not os.path.isfile(path):
+                del self.sources[path]
+
+    @staticmethod
+    def remove_files(paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
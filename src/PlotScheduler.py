@@ -0,0 +1,249 @@
+import contextlib
+import heapq
+import io
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from MeasurementReader import MeasurementReader
+from MeasurementSettings import MeasurementSettings
+from MeasurementSummary import MeasurementSummary
+
+
+class PlotScheduler:
+    """Verteilt die Plots von generate_plots einzeln (ein Aufruf von Laserplot.plot_results pro Job) auf die Worker.
+
+    Pro Messung läuft zuerst ein Job, der sie vorbereitet: die .npz-Datei wird einmal in das
+    unkomprimierte Layout entpackt (MeasurementReader) und die MeasurementSummary berechnet,
+    falls es sie noch nicht gibt. Alle Plots der Messung lesen danach nur noch diese Dateien,
+    egal auf welchem Worker sie laufen. Die Dauer jedes Plots wird vorab aus der .json-Datei
+    geschätzt (siehe estimate). Über alle Messungen hinweg bekommt ein freier Worker immer
+    den teuersten Job, der laufen kann (ein Vorbereiten zählt so viel wie der teuerste Plot
+    seiner Messung). Die langen Plots laufen so zuerst und nicht erst am Ende, während die
+    übrigen Worker schon fertig sind.
+
+        scheduler = PlotScheduler()
+        scheduler.add(path, name, p_settings)
+        for job, result in scheduler.run():
+            ...
+
+    Fehler brechen den Durchlauf nicht ab, sie werden mit Traceback und der Ausgabe des Jobs
+    gesammelt (failures) und am Ende mit den Laufzeiten ausgegeben (report).
+    """
+
+    # grobe Schätzungen aus benchmark_plots.py, nur die Reihenfolge der Jobs hängt davon ab
+    SECONDS_PER_VALUE = 1e-8  # Lesen und Mitteln des Datenwürfels
+    SAVEFIG_SECONDS = {"neutral": 0.3, "colorful": 0.7, "3d": 0.5}
+    CURVE_FIT_SECONDS = 0.2  # pro Gradient
+    NUM_WAV = 2048  # Pixel des Spektrometers (siehe assert in Laserplot.plot_results)
+
+    def __init__(self, max_workers=None, export_targets=None, vector_formats=()):
+        self.max_workers = (
+            max(1, int(os.cpu_count() / 1.5)) if max_workers is None else max_workers
+        )
+        # für den FigureExporter jedes Workers (None: die Targets von FigureExporter)
+        self.export_targets = export_targets
+        self.vector_formats = vector_formats
+        # (path, name) -> Liste von p_settings (je ein Aufruf von plot_results)
+        self.measurements = {}
+        self.timings = []
+        self.failures = []
+
+    def add(self, path, name, p_settings):
+        self.measurements.setdefault((path, name), []).extend(p_settings)
+
+    @staticmethod
+    def estimate(p_settings, shape):
+        """Geschätzte Dauer eines Plots in Sekunden. shape: (Gradienten, Wiederholungen, Wellenlängen) der Messung."""
+
+        num_gradiants, repetitions, num_wav = shape
+        seconds = PlotScheduler.SAVEFIG_SECONDS["neutral"]
+        for setting in p_settings:
+            grads = min(setting.grad_end, num_gradiants) - setting.grad_start
+            # bei single_wav wird nur eine Spalte gelesen
+            values = grads * repetitions * (1 if setting.single_wav else num_wav)
+            seconds += values * PlotScheduler.SECONDS_PER_VALUE
+            if grads > 1:
+                seconds += PlotScheduler.SAVEFIG_SECONDS["3d"]
+            if setting.interpolate:
+                seconds += grads * PlotScheduler.CURVE_FIT_SECONDS
+        if len(p_settings) == 1 and not p_settings[0].single_wav:
+            seconds += PlotScheduler.SAVEFIG_SECONDS["colorful"]
+        return seconds
+
+    @staticmethod
+    def init_worker(export_targets, vector_formats):
+        """Läuft beim Start jedes Workers: stellt den FigureExporter von Laserplot ein.
+
+        Explizit statt über die Klassenattribute des Hauptprozesses, die ein Worker nur bei
+        fork erbt (nicht bei spawn, z. B. unter macOS und Windows).
+        """
+
+        from FigureExporter import FigureExporter
+        from Laserplot import Laserplot
+
+        Laserplot.exporter = (
+            FigureExporter(vector_formats=vector_formats)
+            if export_targets is None
+            else FigureExporter(export_targets, vector_formats)
+        )
+
+    @staticmethod
+    def shape(path, name):
+        """(Gradienten, Wiederholungen, Wellenlängen) der Messung, aus der .json-Datei."""
+
+        m_settings = MeasurementSettings.from_json(os.path.join(path, name + ".json"))
+        return (
+            m_settings.laser.num_gradiants,
+            m_settings.laser.REPETITIONS,
+            PlotScheduler.NUM_WAV,
+        )
+
+    @staticmethod
+    def capture(function, *args):
+        """Läuft im Worker: ruft function auf und fängt ihre Ausgabe (stdout und stderr) und Fehler ab.
+
+        Gibt (Ergebnis, Ausgabe, Dauer, Traceback) zurück, der Traceback ist None, wenn kein Fehler auftrat.
+        """
+
+        start = time.perf_counter()
+        result, error = None, None
+
+        # damit nicht alles durcheinander ist (wegen multiprocessing)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            try:
+                result = function(*args)
+            except Exception:
+                error = traceback.format_exc()
+        return result, output.getvalue(), time.perf_counter() - start, error
+
+    @staticmethod
+    def prepare(path, name):
+        """Läuft im Worker: entpackt die Messung und berechnet die MeasurementSummary."""
+
+        reader = MeasurementReader(path, name)
+        file_name = os.path.join(path, name)
+        summary = MeasurementSummary.load(file_name)
+        # auch, wenn die Summary andere Wiederholungen zählt als die Aufnahme (z. B. nach einem TIMEOUT)
+        if summary is None or not np.array_equal(summary.written, reader.written):
+            MeasurementSummary.compute(reader.spectra, reader.written).save(file_name)
+
+    @staticmethod
+    def plot(path, name, p_settings):
+        """Läuft im Worker: ein Aufruf von plot_results. Gibt die gespeicherten Bilder zurück."""
+
+        from Laserplot import Laserplot
+
+        m_settings = MeasurementSettings.from_json(os.path.join(path, name + ".json"))
+        return Laserplot.plot_results(p_settings, m_settings, show_plots=False)
+
+    def run(self):
+        """Führt alle Jobs aus und gibt für jeden erfolgreichen Plot (path, name, p_settings), (Bilder, Ausgabe, Dauer) zurück, sobald er fertig ist."""
+
+        self.timings = []
+        self.failures = []
+
+        # (-geschätzte Dauer, Nummer, Art, Job), die Nummer entscheidet bei gleicher Dauer (FIFO)
+        ready = []
+        # (path, name) -> [(geschätzte Dauer, p_settings)], werden nach dem Vorbereiten bereit
+        plots = {}
+        for (path, name), all_p_settings in self.measurements.items():
+            try:
+                shape = PlotScheduler.shape(path, name)
+            except Exception:
+                self.failures.append(
+                    ("prepare", (path, name), traceback.format_exc(), "")
+                )
+                continue
+            plots[(path, name)] = [
+                (PlotScheduler.estimate(p_settings, shape), p_settings)
+                for p_settings in all_p_settings
+            ]
+            ready.append(
+                (
+                    -max(seconds for seconds, _ in plots[(path, name)]),
+                    len(ready),
+                    "prepare",
+                    (path, name),
+                )
+            )
+        heapq.heapify(ready)
+        counter = len(ready)
+
+        with ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=PlotScheduler.init_worker,
+            initargs=(self.export_targets, self.vector_formats),
+        ) as executor:
+            # future -> (Art, Job)
+            pending = {}
+
+            while ready or pending:
+                # nur so viele Jobs abgeben, wie Worker frei sind, damit immer der teuerste als nächstes läuft
+                while ready and len(pending) < self.max_workers:
+                    _, _, kind, job = heapq.heappop(ready)
+                    function = (
+                        PlotScheduler.prepare
+                        if kind == "prepare"
+                        else PlotScheduler.plot
+                    )
+                    future = executor.submit(PlotScheduler.capture, function, *job)
+                    pending[future] = (kind, job)
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, job = pending.pop(future)
+                    try:
+                        result, output, seconds, error = future.result()
+                    except Exception as e:
+                        # z. B. ist der Worker abgestürzt (BrokenProcessPool)
+                        result, output, seconds = None, "", 0.0
+                        error = "".join(traceback.format_exception(e))
+
+                    if error is not None:
+                        self.failures.append((kind, job, error, output))
+                        continue
+
+                    if kind == "prepare":
+                        for estimate, p_settings in plots[job]:
+                            heapq.heappush(
+                                ready, (-estimate, counter, "plot", (*job, p_settings))
+                            )
+                            counter += 1
+                        continue
+
+                    self.timings.append((job, seconds))
+                    yield job, (result, output, seconds)
+
+    @staticmethod
+    def describe(p_settings):
+        setting = p_settings[0]
+        if len(p_settings) > 1:
+            return f"{len(p_settings)} graphs"
+        if setting.single_wav:
+            return f"{setting.single_wav} nm" + (
+                ", interpolated" if setting.interpolate else ""
+            )
+        return "spectrum"
+
+    def report(self, num=10):
+        """Gibt die langsamsten Plots und alle Fehler aus."""
+
+        print(f"{len(self.timings)} plots, {len(self.failures)} failed")
+        for (path, name, p_settings), seconds in sorted(
+            self.timings, key=lambda timing: timing[1], reverse=True
+        )[:num]:
+            print(
+                f"  {seconds:.2f} s: {os.path.join(path, name)} ({PlotScheduler.describe(p_settings)})"
+            )
+        for kind, job, error, output in self.failures:
+            # roter Text (31m Red color code, siehe make_plots)
+            print(f"\033[31m{kind} failed: {os.path.join(*job[:2])}\033[0m")
+            # die Ausgabe des Jobs bis zum Fehler
+            if output:
+                print(output)
+            print(error)
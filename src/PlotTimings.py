@@ -0,0 +1,68 @@
+import time
+
+
+class PlotTimings:
+    """Misst, wie lange die einzelnen Schritte von Laserplot.plot_results dauern.
+
+    Ist Laserplot.timings gesetzt, wird jeder Schritt (zwischen Laserplot.start_stage und
+    stop_stage) in seinem Namen aufaddiert:
+
+        Laserplot.timings = PlotTimings()
+        Laserplot.plot_results(...)
+        Laserplot.timings.report()
+
+    Das Rendern wird pro Figur gezählt (savefig, savefig_colorful, savefig_3d), encode ist das
+    Warten auf die PNGs, die der FigureExporter im Hintergrund kodiert.
+    """
+
+    STAGES = (
+        "load",
+        "slicing",
+        "reductions",
+        "savgol",
+        "curve_fit",
+        "legend",
+        "savefig",
+        "savefig_colorful",
+        "savefig_3d",
+        "encode",
+        "symlink",
+    )
+
+    def __init__(self):
+        self.seconds = {}
+        self.calls = {}
+        # name -> Beginn des laufenden Schritts
+        self.started = {}
+
+    def start(self, name):
+        self.started[name] = time.perf_counter()
+
+    def stop(self, name):
+        self.seconds[name] = (
+            self.seconds.get(name, 0.0) + time.perf_counter() - self.started.pop(name)
+        )
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def total(self):
+        return sum(self.seconds.values())
+
+    def report(self, total=None):
+        """Gibt die Dauer pro Schritt aus. total: die gesamte Laufzeit, der Rest wird als "other" ausgegeben."""
+
+        measured = self.total()
+        total = measured if total is None else total
+        print("stage: seconds / calls / share")
+        for name in self.STAGES + tuple(
+            name for name in self.seconds if name not in self.STAGES
+        ):
+            if name not in self.seconds:
+                continue
+            print(
+                f"  {name}: {self.seconds[name]:.3f} s / {self.calls[name]}"
+                + f" / {self.seconds[name] / total * 100 if total else 0:.1f} %"
+            )
+        if total > measured:
+            print(
+                f"  other: {total - measured:.3f} s / - / {(total - measured) / total * 100:.1f} %"
+            )
@@ -0,0 +1,69 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class SharedArrays:
+    """Numpy-Arrays in einem gemeinsamen multiprocessing.shared_memory-Block.
+
+    Der erstellende Prozess gibt info() an einen anderen Prozess weiter, der die gleichen
+    Arrays mit SharedArrays.attach(info) öffnet:
+
+        shared = SharedArrays({"spectrum": ((2048,), np.float64)})
+        shared["spectrum"][:] = spectrum
+        # im anderen Prozess
+        shared = SharedArrays.attach(info)
+
+    close() gibt den Speicher im erstellenden Prozess frei (unlink), in den anderen wird er nur geschlossen.
+    """
+
+    def __init__(self, layout, name=None):
+        self.layout = []
+        offset = 0
+        for array_name, (shape, dtype) in layout.items():
+            dtype = np.dtype(dtype)
+            # an 8 Byte ausrichten
+            offset = (offset + 7) // 8 * 8
+            self.layout.append((array_name, tuple(shape), dtype.str, offset))
+            offset += int(np.prod(shape)) * dtype.itemsize
+
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        else:
+            # Kind-Prozesse von multiprocessing teilen sich den resource_tracker mit dem erstellenden
+            # Prozess, die Registrierung beim Öffnen ist dort also doppelt und wird mit unlink entfernt
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        self.arrays = {
+            array_name: np.ndarray(
+                shape, dtype=dtype, buffer=self.shm.buf, offset=offset
+            )
+            for array_name, shape, dtype, offset in self.layout
+        }
+        if self.owner:
+            for array in self.arrays.values():
+                array.fill(0)
+
+    def __getitem__(self, array_name):
+        return self.arrays[array_name]
+
+    def info(self):
+        return {
+            "name": self.shm.name,
+            "layout": {
+                array_name: (shape, dtype)
+                for array_name, shape, dtype, _ in self.layout
+            },
+        }
+
+    @staticmethod
+    def attach(info):
+        return SharedArrays(info["layout"], name=info["name"])
+
+    def close(self):
+        # die Arrays zuerst freigeben, sonst kann der Puffer nicht geschlossen werden
+        self.arrays = {}
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -0,0 +1,72 @@
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+class SpectrometerReader:
+    """Liest das Spektrometer in einem eigenen Thread aus (double buffering).
+
+    Der Thread blockiert in get_data (sn.getSpectrum_Y) und kopiert jedes Spektrum in einen
+    von zwei vorab allozierten Puffern. Über eine begrenzte Queue bekommt der Mess-Thread
+    den Index des gefüllten Puffers und gibt ihn nach dem Speichern mit release wieder frei.
+    Ist kein Puffer frei oder die Queue voll, weil der Mess-Thread nicht hinterherkommt,
+    wird das Spektrum verworfen und als Overrun gezählt.
+
+        k, spectrum, timestamp = reader.get()
+        messdata.store(i, spectrum, timestamp)
+        reader.release(k)
+    """
+
+    def __init__(self, get_data, num_wav, queue_size=1):
+        self.get_data = get_data
+        self.buffers = np.zeros((2, num_wav), dtype=float)
+        self.filled = queue.Queue(maxsize=queue_size)
+        self.free = queue.Queue()
+        for k in range(len(self.buffers)):
+            self.free.put(k)
+
+        self.reads = 0
+        self.overruns = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.reader_job, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def reader_job(self):
+        while not self.stop_event.is_set():
+            spectrum = self.get_data()
+            timestamp = time.time()
+            self.reads += 1
+
+            try:
+                k = self.free.get_nowait()
+            except queue.Empty:
+                self.overruns += 1
+                continue
+
+            self.buffers[k] = spectrum
+            try:
+                self.filled.put_nowait((k, timestamp))
+            except queue.Full:
+                self.overruns += 1
+                self.free.put(k)
+
+    def get(self, timeout=None):
+        """Wartet auf das nächste Spektrum. Gibt den Puffer-Index, das Spektrum (eine View) und den Zeitstempel zurück."""
+        k, timestamp = self.filled.get(timeout=timeout)
+        return k, self.buffers[k], timestamp
+
+    def release(self, k):
+        self.free.put(k)
+
+    def stop(self, timeout=None):
+        """Beendet den Thread nach dem laufenden Auslesen."""
+        self.stop_event.set()
+        self.thread.join(timeout=timeout)
+        print(
+            f"spectrometer reader: {self.reads} reads, {self.overruns} overruns",
+            flush=True,
+        )
@@ -0,0 +1,58 @@
+import numpy as np
+
+
+class SpectrumRingBuffer:
+    """Ringpuffer fester Größe für Spektren, Zeitstempel und Sequenznummern.
+
+    Gedacht für genau einen schreibenden (Mess-Thread) und einen lesenden Thread
+    (z. B. Snapshot). Es gibt keine Locks: Vor dem Schreiben eines Slots wird dessen
+    Sequenznummer auf -1 gesetzt, danach auf die neue Nummer. Der Leser kopiert die Slots
+    und verwirft alle, deren Sequenznummer sich währenddessen geändert hat
+    (wie bei einem seqlock). Der Speicherverbrauch bleibt konstant.
+    """
+
+    def __init__(self, capacity, num_wav, dtype=float):
+        self.capacity = capacity
+        self.spectra = np.zeros((capacity, num_wav), dtype=dtype)
+        self.timestamps = np.zeros(capacity, dtype=float)
+        self.sequence = np.full(capacity, -1, dtype=np.int64)
+        # Sequenznummer des nächsten Spektrums (= Anzahl aller bisher geschriebenen)
+        self.write_seq = 0
+
+    def push(self, spectrum, timestamp):
+        """Schreibt ein Spektrum. Darf nur von einem Thread aufgerufen werden."""
+        seq = self.write_seq
+        slot = seq % self.capacity
+        self.sequence[slot] = -1
+        self.spectra[slot] = spectrum
+        self.timestamps[slot] = timestamp
+        self.sequence[slot] = seq
+        # erst jetzt ist das Spektrum für den Leser sichtbar
+        self.write_seq = seq + 1
+
+    def latest(self, n=None):
+        """Kopiert die (höchstens) n neuesten Spektren, älteste zuerst.
+
+        Gibt die Spektren, die Zeitstempel und die Sequenznummern zurück.
+        """
+        end = self.write_seq
+        n = self.capacity if n is None else min(n, self.capacity)
+        seqs = np.arange(max(0, end - n), end, dtype=np.int64)
+        slots = seqs % self.capacity
+
+        seq_before = self.sequence[slots]
+        spectra = self.spectra[slots]
+        timestamps = self.timestamps[slots]
+        seq_after = self.sequence[slots]
+
+        # vom Schreiber währenddessen überschriebene Slots verwerfen
+        valid = (seq_before == seqs) & (seq_after == seqs)
+        return spectra[valid], timestamps[valid], seqs[valid]
+
+    def last_seconds(self, seconds):
+        """Kopiert alle Spektren der letzten seconds Sekunden (relativ zum neuesten Spektrum)."""
+        spectra, timestamps, seqs = self.latest()
+        if len(timestamps) == 0:
+            return spectra, timestamps, seqs
+        in_range = timestamps >= timestamps[-1] - seconds
+        return spectra[in_range], timestamps[in_range], seqs[in_range]
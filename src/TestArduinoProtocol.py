@@ -0,0 +1,56 @@
+import unittest
+from ArduinoProtocol import ArduinoProtocol, ArduinoError
+
+
+class LossyArduino:
+    """Bestätigt jedes Kommando, verwirft aber die ersten drop Frames."""
+
+    def __init__(self, drop=0):
+        self.drop = drop
+        self.frames = []
+        self.buffer = bytearray()
+
+    def write(self, frame):
+        self.frames.append(frame)
+        if self.drop > 0:
+            self.drop -= 1
+            return
+        # Störbytes vor der Antwort
+        self.buffer += b"\x00\x7e" + ArduinoProtocol.encode(
+            ArduinoProtocol.ACK, frame[2]
+        )
+
+    def read(self, size=1):
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+
+class TestArduinoProtocol(unittest.TestCase):
+
+    def test_frame_layout(self):
+        frame = ArduinoProtocol.encode(ArduinoProtocol.SET_VARIABLE, 7, b"PWM405=3")
+
+        self.assertEqual(frame[:4], bytes([0x7E, ord("2"), 7, 8]))
+        self.assertEqual(frame[4:-1], b"PWM405=3")
+        self.assertEqual(frame[-1], sum(frame[1:-1]) % 256)
+
+    def test_retransmits_dropped_command(self):
+        arduino = LossyArduino(drop=2)
+        protocol = ArduinoProtocol(arduino, ack_timeout=0.01)
+
+        protocol.send(ArduinoProtocol.LASER_ON)
+
+        self.assertEqual(len(arduino.frames), 3)
+        self.assertEqual(protocol.retransmissions, 2)
+        self.assertEqual(protocol.acked, 1)
+
+    def test_gives_up(self):
+        protocol = ArduinoProtocol(LossyArduino(drop=10), ack_timeout=0.01, retries=1)
+
+        with self.assertRaises(ArduinoError):
+            protocol.send(ArduinoProtocol.LASER_OFF)
+
+
+if __name__ == "__main__":
+    unittest.main()
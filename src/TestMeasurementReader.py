@@ -0,0 +1,112 @@
+import unittest
+import json
+import os
+from tempfile import TemporaryDirectory
+from unittest import mock
+import numpy as np
+from MeasurementReader import MeasurementCache, MeasurementReader
+from MeasurementRecorder import MeasurementRecorder
+
+
+class TestMeasurementReader(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.path = self.temp_dir.name
+        self.wav = np.linspace(200, 1100, 16)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_npz(self, code_name, value, mtime_ns=None):
+        # wie Lasermessung.write_measurement: 2 Gradienten, 3 Wiederholungen
+        file_name = os.path.join(self.path, code_name)
+        np.savez_compressed(
+            file_name,
+            np.full((2, 3, len(self.wav)), value, dtype=float),
+            self.wav,
+            np.arange(6, dtype=float).reshape(2, 3),
+        )
+        if mtime_ns is not None:
+            os.utime(file_name + ".npz", ns=(mtime_ns, mtime_ns))
+        return file_name
+
+    def test_converts_once(self):
+        file_name = self.write_npz("messung", 1)
+
+        with mock.patch.object(
+            MeasurementReader, "convert", wraps=MeasurementReader.convert
+        ) as convert:
+            reader = MeasurementReader(self.path, "messung")
+            MeasurementReader(self.path, "messung")
+
+        self.assertEqual(convert.call_count, 1)
+        with open(file_name + MeasurementRecorder.SIDECAR_SUFFIX, "r") as sidecar:
+            self.assertEqual(
+                json.load(sidecar)["source_mtime_ns"],
+                os.stat(file_name + ".npz").st_mtime_ns,
+            )
+        self.assertIsInstance(reader.spectra, np.memmap)
+        np.testing.assert_array_equal(reader.written, [3, 3])
+        self.assertEqual(reader[1, 2, 0], 1)
+
+    def test_reconverts_changed_npz(self):
+        file_name = self.write_npz("messung", 1, mtime_ns=1_000_000_000)
+        MeasurementReader(self.path, "messung")
+
+        self.write_npz("messung", 2, mtime_ns=2_000_000_000)
+        self.assertTrue(MeasurementReader.needs_conversion(file_name))
+        reader = MeasurementReader(self.path, "messung")
+
+        self.assertEqual(reader[0, 0, 0], 2)
+        self.assertFalse(MeasurementReader.needs_conversion(file_name))
+
+
+class TestMeasurementCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.path = self.temp_dir.name
+        self.wav = np.linspace(200, 1100, 16)
+        for i in range(3):
+            np.savez_compressed(
+                os.path.join(self.path, f"messung{i}"),
+                np.full((1, 4, len(self.wav)), i, dtype=float),
+                self.wav,
+                np.arange(4, dtype=float).reshape(1, 4),
+            )
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def names(self, cache):
+        return [os.path.basename(file_name) for file_name, _ in cache.entries]
+
+    def test_evicts_by_max_entries(self):
+        cache = MeasurementCache(max_entries=2)
+        cache.get(self.path, "messung0")
+        cache.get(self.path, "messung1")
+        # messung0 wurde zuletzt benutzt, messung1 fliegt raus
+        cache.get(self.path, "messung0")
+        spectra = cache.get(self.path, "messung2")[0]
+
+        self.assertEqual(self.names(cache), ["messung0", "messung2"])
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+        self.assertEqual(cache.used_bytes, 0)
+        self.assertIsInstance(spectra, np.memmap)
+
+    def test_evicts_by_max_bytes_in_memory(self):
+        cache = MeasurementCache(in_memory=True)
+        cache.get(self.path, "messung0")
+        # Platz für genau eine Messung
+        cache.max_bytes = cache.used_bytes
+        spectra = cache.get(self.path, "messung1")[0]
+
+        self.assertEqual(self.names(cache), ["messung1"])
+        self.assertEqual(cache.used_bytes, cache.max_bytes)
+        self.assertNotIsInstance(spectra, np.memmap)
+        self.assertFalse(spectra.flags.writeable)
+
+
+if __name__ == "__main__":
+    unittest.main()
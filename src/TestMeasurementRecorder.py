@@ -0,0 +1,46 @@
+import unittest
+import os
+from tempfile import TemporaryDirectory
+import numpy as np
+from MeasurementRecorder import MeasurementRecorder
+
+
+class TestMeasurementRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.file_name = os.path.join(self.temp_dir.name, "messung")
+        self.wav = np.linspace(200, 1100, 16)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_complete_recording(self):
+        recorder = MeasurementRecorder(self.file_name, 2, 3, self.wav)
+        for grad in range(2):
+            for i in range(3):
+                recorder.append(grad, i, np.full(len(self.wav), grad * 10 + i), i)
+        recorder.close()
+
+        spectra, wav, timestamps, written = MeasurementRecorder.load(self.file_name)
+
+        np.testing.assert_array_equal(wav, self.wav)
+        np.testing.assert_array_equal(written, [3, 3])
+        self.assertEqual(spectra[1][2][0], 12)
+        self.assertEqual(timestamps[1][2], 2)
+
+    def test_partial_recording(self):
+        recorder = MeasurementRecorder(self.file_name, 2, 3, self.wav)
+        recorder.append(0, 0, np.ones(len(self.wav)), 0)
+        recorder.append(0, 1, np.ones(len(self.wav)), 1)
+        recorder.close(complete=False)
+
+        self.assertTrue(MeasurementRecorder.exists(self.file_name))
+        spectra, _, _, written = MeasurementRecorder.load(self.file_name)
+
+        np.testing.assert_array_equal(written, [2, 0])
+        self.assertEqual(spectra.shape, (2, 3, len(self.wav)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from MeasurementSummary import MeasurementSummary
+
+
+class TestMeasurementSummary(unittest.TestCase):
+
+    def setUp(self):
+        # 3 Gradienten, der letzte unvollständig (nicht durch BLOCK teilbar)
+        self.spectra = np.random.default_rng(0).random((3, 300, 16)) * 1000
+        self.written = [300, 300, 150]
+        self.summary = MeasurementSummary.compute(self.spectra, self.written)
+
+    def test_interval(self):
+        for grad, start, end, zoom_start, zoom_end in (
+            (0, 0, 300, 0, 16),
+            (0, 10, 20, 0, 16),  # innerhalb eines Blocks
+            (1, 64, 256, 3, 9),  # genau auf den Blockgrenzen
+            (1, 5, 299, 0, 16),
+            (2, 30, 300, 2, 12),  # über written hinaus
+        ):
+            data = self.spectra[grad][start : min(end, self.written[grad])]
+            mean, std = self.summary.interval(
+                self.spectra, grad, start, end, zoom_start, zoom_end
+            )
+            np.testing.assert_allclose(
+                mean, np.mean(data, axis=0)[zoom_start:zoom_end], rtol=1e-6
+            )
+            np.testing.assert_allclose(
+                std, np.std(data, axis=0)[zoom_start:zoom_end], rtol=1e-5
+            )
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, "messung")
+            self.summary.save(file_name)
+            loaded = MeasurementSummary.load(file_name)
+
+        np.testing.assert_array_equal(loaded.mean, self.summary.mean)
+        np.testing.assert_array_equal(loaded.written, self.written)
+        np.testing.assert_array_equal(loaded.block_m2, self.summary.block_m2)
+        # die Blöcke sind deutlich kleiner als die Rohdaten
+        self.assertLess(
+            loaded.block_mean.nbytes + loaded.block_m2.nbytes,
+            self.spectra.nbytes / 10,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
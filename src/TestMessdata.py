@@ -0,0 +1,50 @@
+import unittest
+import numpy as np
+from Messdata import Messdata
+from SharedArrays import SharedArrays
+
+
+class TestMessdata(unittest.TestCase):
+
+    def setUp(self):
+        self.wav = np.linspace(200, 1100, 32)
+        self.messdata = Messdata(2, 50, self.wav)
+        self.spectra = np.random.default_rng(0).random((50, len(self.wav))) * 1000
+
+    def test_running_statistics(self):
+        self.messdata.curr_gradiant = 1
+        for i, spectrum in enumerate(self.spectra):
+            self.messdata.store(i, spectrum, i)
+
+        count, mean, std, snr = self.messdata.get_statistics()
+
+        self.assertEqual(count, len(self.spectra))
+        np.testing.assert_allclose(mean, np.mean(self.spectra, axis=0))
+        np.testing.assert_allclose(std, np.std(self.spectra, axis=0))
+        np.testing.assert_allclose(snr, mean / std)
+        # der andere Gradient bleibt unberührt
+        self.assertEqual(self.messdata.get_statistics(0)[0], 0)
+        np.testing.assert_array_equal(self.messdata.written, [0, len(self.spectra)])
+
+    def test_shared_latest_spectrum(self):
+        shared = SharedArrays.attach(self.messdata.share())
+        try:
+            self.assertIsNone(Messdata.read_shared(shared))
+
+            self.messdata.curr_gradiant = 1
+            for i, spectrum in enumerate(self.spectra[:10]):
+                self.messdata.store(i, spectrum, i)
+                self.messdata.curr_measurement_index = i
+
+            gradiant, index, spectrum, count, mean, m2 = Messdata.read_shared(shared)
+            self.assertEqual((gradiant, index, count), (1, 9, 10))
+            np.testing.assert_array_equal(spectrum, self.spectra[9])
+            np.testing.assert_allclose(mean, np.mean(self.spectra[:10], axis=0))
+            np.testing.assert_array_equal(shared["wav"], self.wav)
+        finally:
+            shared.close()
+            self.messdata.unshare()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import os
+from tempfile import TemporaryDirectory
+from PlotManifest import PlotManifest
+from PlottingSettings import PlottingSettings
+
+
+class TestPlotManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.path = self.temp_dir.name
+        self.manifest_path = os.path.join(self.path, "plots", "manifest.json")
+        for suffix in PlotManifest.SOURCE_SUFFIXES:
+            self.write(f"messung{suffix}", "messung")
+        self.settings = [PlottingSettings(self.path, "messung", True)]
+        self.sliced = [PlottingSettings(self.path, "messung", True, interval_start=0.5)]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.path, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def record(self, manifest, settings, *names):
+        outputs = [self.write(name, "png") for name in names]
+        manifest.record(settings, outputs)
+        return outputs
+
+    def reload(self, manifest, config="config"):
+        manifest.save()
+        return PlotManifest.load(self.manifest_path, config)
+
+    def test_unchanged_plot_is_current(self):
+        manifest = PlotManifest.load(self.manifest_path, "config")
+        self.assertFalse(manifest.is_current(self.settings))
+        self.record(manifest, self.settings, "messung.png")
+
+        self.assertTrue(self.reload(manifest).is_current(self.settings))
+
+    def test_changes_make_plot_outdated(self):
+        manifest = PlotManifest.load(self.manifest_path, "config")
+        (output,) = self.record(manifest, self.settings, "messung.png")
+        manifest.save()
+
+        # andere Einstellungen des Exports (z. B. DPI)
+        self.assertFalse(
+            PlotManifest.load(self.manifest_path, "other").is_current(self.settings)
+        )
+
+        # fehlendes Bild
+        os.remove(output)
+        self.assertFalse(self.reload(manifest).is_current(self.settings))
+        self.write("messung.png", "png")
+
+        # geänderte Messung (andere Größe, also wird der Hash neu berechnet)
+        self.write("messung.npz", "neue messung")
+        self.assertFalse(self.reload(manifest).is_current(self.settings))
+
+    def test_record_removes_renamed_outputs(self):
+        manifest = PlotManifest.load(self.manifest_path, "config")
+        old_output, kept = self.record(
+            manifest, self.settings, "alt.png", "messung_3d.png"
+        )
+        # z. B. ein anderer Titel
+        new_output = self.write("neu.png", "png")
+        manifest.record(self.settings, [new_output, kept])
+
+        self.assertFalse(os.path.exists(old_output))
+        self.assertTrue(os.path.exists(new_output))
+        self.assertTrue(os.path.exists(kept))
+
+    def test_remove_unseen(self):
+        manifest = PlotManifest.load(self.manifest_path, "config")
+        self.record(manifest, self.settings, "messung.png")
+        only_sliced, shared = self.record(
+            manifest, self.sliced, "messung_sliced.png", "messung.png"
+        )
+
+        # im nächsten Durchlauf gibt es nur noch den ersten Plot
+        manifest = self.reload(manifest)
+        self.assertTrue(manifest.is_current(self.settings))
+        manifest.remove_unseen()
+
+        self.assertFalse(os.path.exists(only_sliced))
+        # wird vom ersten Plot noch gebraucht
+        self.assertTrue(os.path.exists(shared))
+        self.assertEqual(list(manifest.plots), [PlotManifest.key(self.settings)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+import numpy as np
+from SpectrumRingBuffer import SpectrumRingBuffer
+
+
+class TestSpectrumRingBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.ring = SpectrumRingBuffer(capacity=4, num_wav=3)
+
+    def test_wraps_around(self):
+        for i in range(10):
+            self.ring.push(np.full(3, i), 100 + i)
+
+        spectra, timestamps, seqs = self.ring.latest()
+
+        np.testing.assert_array_equal(seqs, [6, 7, 8, 9])
+        np.testing.assert_array_equal(timestamps, [106, 107, 108, 109])
+        np.testing.assert_array_equal(spectra[:, 0], [6, 7, 8, 9])
+
+    def test_last_seconds(self):
+        for i in range(3):
+            self.ring.push(np.full(3, i), 100 + i)
+
+        _, timestamps, _ = self.ring.last_seconds(1)
+
+        np.testing.assert_array_equal(timestamps, [101, 102])
+
+    def test_skips_slot_being_written(self):
+        for i in range(4):
+            self.ring.push(np.full(3, i), i)
+        # der Schreiber ist gerade mitten in Slot 0
+        self.ring.sequence[0] = -1
+
+        _, _, seqs = self.ring.latest()
+
+        np.testing.assert_array_equal(seqs, [1, 2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import time
+import unittest
+import serial
+from ArduinoProtocol import ArduinoProtocol
+from VirtualArduino import VirtualArduino
+
+
+class TestVirtualArduino(unittest.TestCase):
+
+    def setUp(self):
+        # die Zeit des Arduino wird vom Test vorgestellt (unabhängig von der Last der Maschine)
+        self.now = 0.0
+        self.arduino = VirtualArduino(clock=lambda: self.now)
+        self.connection = serial.Serial(
+            self.arduino.port, baudrate=ArduinoProtocol.BAUDRATE, timeout=0.05
+        )
+        self.protocol = ArduinoProtocol(self.connection)
+
+    def tearDown(self):
+        self.connection.close()
+        self.arduino.close()
+
+    def wait_for_frames(self, frames, timeout=5):
+        # das keep-alive wird nicht bestätigt, also warten, bis der Arduino es verarbeitet hat
+        deadline = time.monotonic() + timeout
+        while self.arduino.frames < frames:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.001)
+
+    def test_sets_variables(self):
+        self.protocol.send(ArduinoProtocol.SET_VARIABLES, b"PWM405=20;Num445=1234")
+
+        self.assertEqual(self.arduino.variables["PWM405"], 20)
+        self.assertEqual(self.arduino.variables["Num445"], 1234)
+
+    def test_watchdog(self):
+        self.protocol.send(
+            ArduinoProtocol.SET_VARIABLES, b"Num445=1234;ConMea=1;ExpDel=50"
+        )
+        self.protocol.send(ArduinoProtocol.LASER_ON)
+        self.assertTrue(self.arduino.lasers_on)
+
+        # keep-alive hält die Laser an
+        for _ in range(4):
+            frames = self.arduino.frames
+            self.now += 0.03
+            self.protocol.send(ArduinoProtocol.KEEPALIVE)
+            self.wait_for_frames(frames + 1)
+            self.arduino.check_watchdog()
+            self.assertTrue(self.arduino.lasers_on)
+
+        self.now += 0.1
+        self.arduino.check_watchdog()
+        self.assertFalse(self.arduino.lasers_on)
+        self.assertEqual(self.arduino.watchdog_trips, 1)
+
+    def test_close_stops_threads(self):
+        threads = list(self.arduino.threads)
+        self.arduino.close()
+        self.arduino.close = lambda: None  # tearDown
+
+        for thread in threads:
+            self.assertFalse(thread.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import re
+import threading
+import time
+
+from ArduinoProtocol import ArduinoProtocol
+from VirtualSerialDevice import VirtualSerialDevice
+
+
+class VirtualArduino(VirtualSerialDevice):
+    """Simuliert den Sketch S231125_waveshare_AS7341_Syns_Laser.ino an einem Pseudo-Terminal.
+
+    Die Frames werden wie im Sketch bestätigt, die Variablen gespeichert und der Watchdog
+    nachgebildet: Sind die Laser länger als ExpDel ms ohne Kommando bzw. keep-alive an,
+    werden sie ausgeschaltet. Solange die Laser gepulst an sind, liest der Sketch nur nach
+    jedem Puls (alle Del445 ms) von der Schnittstelle, entsprechend verzögert sich die Antwort.
+
+    clock gibt die Zeit in Sekunden zurück (für Tests austauschbar, siehe check_watchdog).
+    """
+
+    def __init__(self, baudrate=ArduinoProtocol.BAUDRATE, clock=time.perf_counter):
+        self.clock = clock
+        self.lock = threading.Lock()
+        # wie die Defaults im Sketch
+        self.variables = {
+            "PWM405": 0,
+            "Num445": 0,
+            "Del445": 65535,
+            "SetLED": 0,
+            "ConMea": 1,
+            "ExpDel": 0,
+        }
+        self.lasers_on = False
+        self.on_since = 0.0
+        self.last_update = 0.0
+
+        # Statistik
+        self.laser_on_seconds = 0.0
+        self.watchdog_trips = 0
+        self.frames = 0
+
+        # nur zum Parsen, die Bytes kommen über receive
+        self.parser = ArduinoProtocol(None)
+
+        super().__init__(baudrate)
+        self.start_thread(self.watchdog)
+
+    def receive(self, data):
+        self.parser.buffer += data
+        while True:
+            frame = self.parser.parse_frame()
+            if frame is None:
+                return
+            self.handle_frame(*frame)
+
+    @staticmethod
+    def atoi(value):
+        """Wie atoi im Sketch: die führende Ganzzahl, z. B. 12 für "12.5", sonst 0."""
+        match = re.match(r"\s*[-+]?\d+", value)
+        return int(match.group()) if match else 0
+
+    def pulsed(self):
+        return self.lasers_on and self.variables["Num445"] != 1234
+
+    def handle_frame(self, cmd, seq, payload):
+        # der Sketch liest erst nach dem laufenden Puls wieder von der Schnittstelle
+        if self.pulsed():
+            period = max(self.variables["Del445"], 1) / 1000
+            time.sleep(period - (self.clock() - self.on_since) % period)
+
+        with self.lock:
+            self.frames += 1
+            if cmd == ArduinoProtocol.KEEPALIVE:
+                if self.variables["ConMea"]:
+                    self.last_update = self.clock()
+                return
+
+            if cmd == ArduinoProtocol.LASER_OFF:
+                self.turn_lasers_off()
+            elif cmd == ArduinoProtocol.LASER_ON:
+                self.last_update = self.clock()
+                if not self.lasers_on:
+                    self.lasers_on = True
+                    self.on_since = self.last_update
+            elif cmd in (ArduinoProtocol.SET_VARIABLE, ArduinoProtocol.SET_VARIABLES):
+                for assignment in payload.decode().split(";"):
+                    name, _, value = assignment.partition("=")
+                    if name in self.variables:
+                        self.variables[name] = self.atoi(value)
+            else:
+                self.send(ArduinoProtocol.encode(ArduinoProtocol.NAK, seq))
+                return
+
+        self.send(ArduinoProtocol.encode(ArduinoProtocol.ACK, seq))
+
+    def turn_lasers_off(self):
+        if self.lasers_on:
+            self.laser_on_seconds += self.clock() - self.on_since
+        self.lasers_on = False
+
+    def watchdog(self):
+        while not self.stopped.wait(0.001):
+            self.check_watchdog()
+
+    def check_watchdog(self):
+        with self.lock:
+            if (
+                self.lasers_on
+                and self.clock() - self.last_update >= self.variables["ExpDel"] / 1000
+            ):
+                self.turn_lasers_off()
+                self.watchdog_trips += 1
+                print("virtual Arduino: watchdog turned the lasers off", flush=True)
+
+    def report(self):
+        with self.lock:
+            laser_on_seconds = self.laser_on_seconds
+            if self.lasers_on:
+                laser_on_seconds += self.clock() - self.on_since
+        print(
+            f"virtual Arduino: {self.frames} frames, lasers on for {laser_on_seconds:.3f} s,"
+            + f" {self.watchdog_trips} watchdog trips",
+            flush=True,
+        )
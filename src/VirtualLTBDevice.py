@@ -0,0 +1,162 @@
+import time
+
+from VirtualLTB import LTB, LaserFlags1, LaserMode
+from VirtualSerialDevice import VirtualSerialDevice
+
+
+class VirtualLTBDevice(VirtualSerialDevice):
+    """Simuliert den LTB-Laser an einem Pseudo-Terminal, mit dem Telegramm-Format aus LTB.py.
+
+    Anfragen: SC1 DA SA <Daten> FCS EC, Antworten: SC2 SA DA <Daten> FCS EC, Bestätigungen
+    nur EC und Fehler ESC ESC <Typ>. Nach "g" ist der Laser erst nach warmup_seconds bereit
+    (der echte braucht etwa 10 Sekunden).
+    """
+
+    # Fehlertypen (siehe LTB._parse_response)
+    CHECKSUM_ERROR = "1"
+    INCORRECT_FORMAT = "2"
+    INCORRECT_PARAMETER = "3"
+    FORBIDDEN_ERROR = "4"
+
+    def __init__(self, baudrate=9600, warmup_seconds=1.0, processing_seconds=0.002):
+        self.warmup_seconds = warmup_seconds
+        self.processing_seconds = processing_seconds
+
+        self.laser_on_time = None
+        self.mode = LaserMode.OFF
+        self.mode_since = 0.0
+        self.shutter_open = False
+        self.quantity = 0
+        self.repetition_rate = 0
+        self.hv = 0
+        self.stepper_position = 0
+        self.transmission = 0
+        self.shots = 0
+        self.telegrams = 0
+
+        self.buffer = b""
+        super().__init__(baudrate)
+
+    @staticmethod
+    def fcs(telegram):
+        return f"{sum(ord(c) for c in telegram) % 256:02X}"
+
+    def receive(self, data):
+        self.buffer += data
+        while LTB.EC.encode() in self.buffer:
+            telegram, _, self.buffer = self.buffer.partition(LTB.EC.encode())
+            self.telegrams += 1
+            time.sleep(self.processing_seconds)
+            self.send(self.handle(telegram.decode("ascii", errors="replace")).encode())
+
+    def reply(self, data):
+        telegram = f"{LTB.SC2}{LTB.SA}{LTB.DA}{data}"
+        return f"{telegram}{self.fcs(telegram)}{LTB.EC}"
+
+    def error(self, error_type):
+        telegram = f"\x1b\x1b{error_type}"
+        return f"{telegram}{self.fcs(telegram)}{LTB.EC}"
+
+    def flags1(self):
+        flags = int(self.mode)
+        if self.laser_on_time is not None:
+            flags |= LaserFlags1.LASER_ON
+            if time.perf_counter() - self.laser_on_time >= self.warmup_seconds:
+                flags |= LaserFlags1.LASER_READY
+        if self.shutter_open:
+            flags |= LaserFlags1.SHUTTER_OPEN
+        return flags
+
+    def set_mode(self, mode):
+        # Schüsse der bisherigen Betriebsart aufaddieren
+        if self.mode == LaserMode.REPETITION:
+            self.shots += int(
+                (time.perf_counter() - self.mode_since) * self.repetition_rate
+            )
+        self.mode = mode
+        self.mode_since = time.perf_counter()
+
+    def handle(self, telegram):
+        prefix = f"{LTB.SC1}{LTB.DA}{LTB.SA}"
+        if not telegram.startswith(prefix) or len(telegram) < len(prefix) + 3:
+            return self.error(self.INCORRECT_FORMAT)
+        if self.fcs(telegram[:-2]) != telegram[-2:]:
+            return self.error(self.CHECKSUM_ERROR)
+        data = telegram[len(prefix) : -2]
+
+        try:
+            return self.handle_data(data)
+        except ValueError:
+            return self.error(self.INCORRECT_PARAMETER)
+
+    def handle_data(self, data):
+        ready = self.flags1() & LaserFlags1.LASER_READY
+
+        # Abfragen
+        if data == "W":
+            return self.reply(f"W{self.flags1():02X}")
+        if data == "UT":
+            energy = int(self.hv / 100 * 64000)
+            return self.reply(
+                f"UT{self.flags1():02X}0000{self.quantity:04X}{self.repetition_rate:02X}"
+                + f"{self.hv:02X}0000{energy:04X}"
+            )
+        if data == "UU":
+            self.set_mode(self.mode)
+            energy = int(self.hv / 100 * 64000) if self.mode != LaserMode.OFF else 0
+            return self.reply(
+                f"UU0000{int(24 / 0.11):02X}{25:02X}{25:02X}{energy:04X}"
+                + f"{self.quantity:04X}{self.shots:08X}"
+            )
+        if data == "V3":
+            laser_type = "VIRTUAL"
+            return self.reply(f"V01000000V0.0.1  {len(laser_type)}{laser_type}")
+        if data == "US":
+            return self.reply("US000000000000")
+        if data == "UV":
+            return self.reply(
+                f"UV00{self.stepper_position:04X}{self.stepper_position:04X}{self.transmission:02X}"
+            )
+        if data == "P":
+            return self.reply("P0000")
+
+        # Kommandos, bestätigt nur mit EC
+        if data == "g":
+            if self.laser_on_time is None:
+                self.laser_on_time = time.perf_counter()
+        elif data == "X":
+            self.set_mode(LaserMode.OFF)
+            self.laser_on_time = None
+            self.shutter_open = False
+        elif data in ("h", "j", "u"):
+            if not ready:
+                return self.error(self.FORBIDDEN_ERROR)
+            self.set_mode(
+                {
+                    "h": LaserMode.REPETITION,
+                    "j": LaserMode.BURST,
+                    "u": LaserMode.EXTERNAL_TRIGGER,
+                }[data]
+            )
+        elif data == "i":
+            self.set_mode(LaserMode.OFF)
+        elif data.startswith("l"):
+            self.quantity = int(data[1:], 16)
+        elif data.startswith("m"):
+            self.set_mode(self.mode)
+            self.repetition_rate = int(data[1:], 16)
+        elif data.startswith("n"):
+            self.hv = int(data[1:], 16)
+        elif data in ("z0", "z1"):
+            if not ready:
+                return self.error(self.FORBIDDEN_ERROR)
+            self.shutter_open = data == "z1"
+        elif data.startswith("O3"):
+            self.stepper_position = int(data[2:], 16)
+        elif data.startswith("O4"):
+            self.transmission = int(data[2:], 16)
+        elif data.startswith("O5") or data.startswith("O6") or data == "s":
+            pass
+        else:
+            return self.error(self.INCORRECT_FORMAT)
+        return LTB.EC
@@ -1,10 +1,30 @@
+import time
+
+
 class NKT:
+    """Simuliert die Register des NKT-Lasers (Adressen siehe NKT.registers)."""
+
+    # Dauer eines Registerzugriffs über den Interbus
+    LATENCY = 0.005
+
+    # Register, die nicht 0 sind, solange sie nicht gesetzt wurden
+    DEFAULTS = {
+        0x1A: 12000,  # voltage (mV)
+        0x1B: 250,  # temperature (0.1 °C)
+        0x36: 21502,  # max_frequency
+    }
+
     @staticmethod
     def GenericInterbusDevice(laser_path):
         return NKT()
 
+    def __init__(self):
+        self.registers = dict(NKT.DEFAULTS)
+
     def ib_set_reg(self, laser_register, addr, value, val_type):
-        pass
+        time.sleep(self.LATENCY)
+        self.registers[addr] = value
 
     def ib_get_reg(self, laser_register, addr, val_type):
-        return 0
+        time.sleep(self.LATENCY)
+        return self.registers.get(addr, 0)
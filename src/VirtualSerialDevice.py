@@ -0,0 +1,66 @@
+import os
+import pty
+import select
+import threading
+import time
+import tty
+
+
+class VirtualSerialDevice:
+    """Basisklasse für simulierte Geräte an einer seriellen Schnittstelle.
+
+    Das Gerät läuft in einem Thread hinter einem Pseudo-Terminal. self.port kann wie ein
+    echter Port mit serial.Serial geöffnet werden. Die Übertragungszeit der Bytes bei der
+    eingestellten Baudrate (8N1, also 10 Bit pro Byte) wird nachgebildet. close() beendet
+    alle Threads des Geräts (threads) und schließt das Pseudo-Terminal.
+    """
+
+    # so lange wartet ein Thread höchstens, bis er merkt, dass das Gerät geschlossen wurde
+    POLL_SECONDS = 0.05
+
+    def __init__(self, baudrate):
+        self.baudrate = baudrate
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.master)
+        tty.setraw(self.slave)
+        # der slave bleibt offen, damit der master kein EOF liefert, wenn der Port geschlossen wird
+        self.port = os.ttyname(self.slave)
+
+        self.stopped = threading.Event()
+        self.threads = []
+        self.start_thread(self.serve)
+
+    def start_thread(self, target):
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def transmission_time(self, num_bytes):
+        return num_bytes * 10 / self.baudrate
+
+    def serve(self):
+        while not self.stopped.is_set():
+            try:
+                if not select.select([self.master], [], [], self.POLL_SECONDS)[0]:
+                    continue
+                data = os.read(self.master, 1024)
+            except OSError:
+                return
+            time.sleep(self.transmission_time(len(data)))
+            self.receive(data)
+
+    def receive(self, data):
+        """Wird mit den empfangenen Bytes aufgerufen."""
+        raise NotImplementedError
+
+    def send(self, data):
+        time.sleep(self.transmission_time(len(data)))
+        os.write(self.master, data)
+
+    def close(self):
+        self.stopped.set()
+        for thread in self.threads:
+            if thread is not threading.current_thread():
+                thread.join()
+        os.close(self.master)
+        os.close(self.slave)
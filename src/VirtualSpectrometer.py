@@ -1,6 +1,41 @@
 import numpy as np
 import time
 
+# Parameter der Simulation, änderbar mit configure
+SIMULATION = {
+    # Dauer des Auslesens über USB zusätzlich zur Integrationszeit (ms)
+    "readout_ms": 2.0,
+    # Counts pro ms Integrationszeit im Maximum der Fluoreszenz
+    "counts_per_ms": 2.0,
+    # Dunkelstrom-Offset (Counts)
+    "dark": 1000.0,
+    # Rauschen: Faktor auf das Schrotrauschen (sqrt(Counts)) und Ausleserauschen (Counts)
+    "noise": 1.0,
+    "read_noise": 10.0,
+    # Abklingzeit der Fluoreszenz (Photobleaching) in s, None für kein Abklingen
+    "decay_seconds": 60.0,
+    # (Wellenlänge, Breite, relative Höhe) der Banden, Chlorophyll und Streulicht der Laser
+    "bands": [(685, 10, 1.0), (740, 15, 0.5), (405, 2, 0.3), (445, 2, 0.3)],
+    "seed": None,
+}
+
+# über setParam gesetzt
+settings = {"INTTIME": 500, "SCAN_AVG": 1}
+# Zeitpunkt des ersten Spektrums (Beginn des Abklingens)
+start_time = None
+rng = np.random.default_rng(SIMULATION["seed"])
+
+
+def configure(**kwargs):
+    """Ändert Parameter der Simulation, z. B. configure(noise=0, decay_seconds=None)."""
+    global rng, start_time
+    for key in kwargs:
+        if key not in SIMULATION:
+            raise ValueError(f"Unknown simulation parameter: {key}")
+    SIMULATION.update(kwargs)
+    rng = np.random.default_rng(SIMULATION["seed"])
+    start_time = None
+
 
 # spectrometer, wav = sn.array_get_spec(0)
 def array_get_spec(*args, **kwargs):
@@ -13,7 +48,8 @@ def array_get_spec_only(*args, **kwargs):
 
 
 def getSpectrum_X(*args, **kwargs):
-    return np.sort(np.abs(np.random.rand(2048, 1) * 1000), axis=0)
+    # wie beim echten Spektrometer: wav[0], wav[-1] -> 285.24 1149.48
+    return np.linspace(285.24, 1149.48, 2048).reshape(2048, 1)
 
 
 # sn.getDeviceId(spectrometer))
@@ -27,8 +63,9 @@ def ext_trig(arg, *args, **kwargs):
 
 
 # sn.setParam(spectrometer, INTTIME, SCAN_AVG, SMOOTH, XTIMING, True)
-def setParam(arg, *args, **kwargs):
-    pass
+def setParam(arg, INTTIME, SCAN_AVG, *args, **kwargs):
+    settings["INTTIME"] = INTTIME
+    settings["SCAN_AVG"] = SCAN_AVG
 
 
 # var = sn.array_spectrum(spectrometer, wav)
@@ -38,26 +75,37 @@ def array_spectrum(arg, *args, **kwargs):
 
 # var = sn.getSpectrum_Y(spectrometer)
 def getSpectrum_Y(arg, *args, **kwargs):
-    # return np.abs(
-    #     np.random.rand(
-    #         2048,
-    #     )
-    #     * 100
-    # )
-
-    # Gauß:
-    time.sleep(0.5)
-    mu = 0
-    sigma = 1
-    x = np.linspace(-5, 5, 2048)
-    return (
-        (1 / (2 * np.sqrt(2 * np.pi)))
-        * np.exp(-0.5 * ((x - mu) / sigma) ** 2)
-        * 100
-        * 2000
+    """Blockiert wie das echte Spektrometer für INTTIME * SCAN_AVG (+ Auslesen) und gibt ein simuliertes Spektrum zurück."""
+    global start_time
+
+    time.sleep(
+        (settings["INTTIME"] * settings["SCAN_AVG"] + SIMULATION["readout_ms"]) / 1000
     )
 
+    now = time.time()
+    if start_time is None:
+        start_time = now
+    decay = (
+        1.0
+        if SIMULATION["decay_seconds"] is None
+        else np.exp(-(now - start_time) / SIMULATION["decay_seconds"])
+    )
+
+    wav = getSpectrum_X().reshape(2048)
+    signal = np.zeros(2048)
+    for center, width, height in SIMULATION["bands"]:
+        signal += height * np.exp(-0.5 * ((wav - center) / width) ** 2)
+    signal *= SIMULATION["counts_per_ms"] * settings["INTTIME"] * decay
+
+    # über SCAN_AVG Spektren gemittelt
+    sigma = np.sqrt(
+        SIMULATION["noise"] ** 2 * signal + SIMULATION["read_noise"] ** 2
+    ) / np.sqrt(settings["SCAN_AVG"])
+    spectrum = SIMULATION["dark"] + signal + rng.normal(0, 1, 2048) * sigma
+    return np.clip(spectrum, 0, 65535)
+
 
 # sn.reset(spectrometer)
 def reset(arg, *args, **kwargs):
-    pass
+    global start_time
+    start_time = None
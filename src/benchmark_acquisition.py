@@ -0,0 +1,319 @@
+"""Benchmark der Messung mit den virtuellen Geräten (VirtualSpectrometer, VirtualNKT, VirtualLTBDevice, VirtualArduino).
+
+python benchmark_acquisition.py [ergebnis.json]
+python benchmark_acquisition.py compare alt.json neu.json
+python benchmark_acquisition.py startup
+
+Jeder Fall der Matrix (Modus x INTTIME x REPETITIONS x Gradienten) läuft in einem eigenen
+Prozess, damit der RSS-Peak pro Fall gemessen wird und sich die Fälle nicht beeinflussen.
+"""
+
+from MeasurementSettings import MeasurementSettings
+from PhaseTimings import PhaseTimings
+
+import contextlib
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import resource
+import subprocess
+import sys
+import time
+import numpy as np
+
+MODES = ["pulse", "continuous"]
+INTTIMES = [5, 20]
+REPETITIONS = [50, 200]
+NUM_GRADIANTS = [1, 4]
+
+
+def make_settings(continuous, inttime, repetitions, num_gradiants):
+    return MeasurementSettings(
+        UNIQUE=True,
+        TYPE="Benchmark",
+        FENSTER_KUEVETTE=2,
+        TIMEOUT=1000000,
+        WATCHDOG_GRACE=200,
+        FUELLL_MENGE=3,
+        specto=MeasurementSettings.SpectoSettings(
+            INTTIME=inttime, SCAN_AVG=1, SMOOTH=0, XTIMING=3
+        ),
+        laser=MeasurementSettings.LaserSettings(
+            REPETITIONS=repetitions,
+            MEASUREMENT_DELAY=3,
+            IRRADITION_TIME=3,
+            ARDUINO_DELAY=3,
+            # die Gradienten unterscheiden sich in mehreren Geräten, damit set_laser_powers etwas zu tun hat
+            INTENSITY_NKT=f"np.linspace(0, 100, {num_gradiants})",
+            INTENSITY_405=f"np.linspace(0, 255, {num_gradiants})",
+            NUM_PULSES_445="1234",
+            PULSE_DELAY_445="1",
+            REPETITIONS_LTB="10",
+            INTENSITY_LTB="50",
+            ND_NKT=0,
+            ND_405=0,
+            ND_445=0,
+            CONTINOUS=continuous,
+        ),
+    )
+
+
+def summarize(values):
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return None
+    return {
+        "mean": float(np.mean(values)),
+        "std": float(np.std(values)),
+        "p50": float(np.percentile(values, 50)),
+        "p99": float(np.percentile(values, 99)),
+        "max": float(np.max(values)),
+    }
+
+
+def run_case(case, results):
+    """Läuft im Kind-Prozess: misst einen Fall und legt das Ergebnis in die Queue results."""
+
+    # erst hier importieren, der Import von Laserplot/matplotlib soll nicht in den Zahlen des Elternprozesses landen
+    from Lasermessung import Lasermessung
+
+    settings = make_settings(
+        case["mode"] == "continuous",
+        case["inttime"],
+        case["repetitions"],
+        case["num_gradiants"],
+    )
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        setup_start = time.perf_counter()
+        measurement = Lasermessung("", "", "", settings)
+        setup_seconds = time.perf_counter() - setup_start
+
+        measure_start = time.perf_counter()
+        measurement.measure(gui=False)
+        measure_seconds = time.perf_counter() - measure_start
+
+    messdata = measurement.messdata
+    timestamps = messdata.timestamps
+
+    # Abstände aufeinanderfolgender Spektren innerhalb eines Gradienten
+    periods = np.concatenate([np.diff(ts) for ts in timestamps]) * 1000
+    # Pause zwischen dem letzten Spektrum eines Gradienten und dem ersten des nächsten (set_laser_powers usw.)
+    gradient_switches = (timestamps[1:, 0] - timestamps[:-1, -1]) * 1000
+
+    timings = messdata.timings.timings
+    phases = {field: summarize(timings[field].ravel()) for field in PhaseTimings.FIELDS}
+    total = sum(timings[field] for field in PhaseTimings.FIELDS).ravel()
+
+    protocol = measurement.arduino
+    results.put(
+        {
+            **case,
+            "setup_seconds": setup_seconds,
+            "measure_seconds": measure_seconds,
+            "spectra": int(timestamps.size),
+            "rate_hz": float(timestamps.size / measure_seconds),
+            "period_ms": summarize(periods),
+            "jitter_ms": float(np.std(periods)),
+            "gradient_switch_ms": summarize(gradient_switches),
+            "phases_ms": phases,
+            # Zeit pro Wiederholung, die nicht integriert wird
+            "overhead_ms": float(np.mean(total) - case["inttime"]),
+            "arduino_round_trip_ms": (
+                protocol.round_trip_sum / protocol.acked if protocol.acked else None
+            ),
+            "arduino_retransmissions": protocol.retransmissions,
+            # auf Linux in KiB
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        }
+    )
+
+
+def run_benchmark(output):
+
+    cases = [
+        {
+            "mode": mode,
+            "inttime": inttime,
+            "repetitions": repetitions,
+            "num_gradiants": num_gradiants,
+        }
+        for mode in MODES
+        for inttime in INTTIMES
+        for repetitions in REPETITIONS
+        for num_gradiants in NUM_GRADIANTS
+    ]
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+
+    report = {
+        "commit": commit,
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cases": [],
+    }
+
+    print(
+        "mode / INTTIME / REPETITIONS / gradients: rate, period, jitter, overhead, gradient switch, RSS"
+    )
+    for case in cases:
+        results = multiprocessing.Queue()
+        # kein daemon, die Messung startet selbst Prozesse (watchdog_wrap)
+        p = multiprocessing.Process(target=run_case, args=(case, results))
+        p.start()
+        while True:
+            try:
+                result = results.get(timeout=1)
+                break
+            except queue.Empty:
+                if not p.is_alive():
+                    result = None
+                    break
+        p.join()
+
+        if result is None:
+            print(f"{case}: failed (exit code {p.exitcode})", flush=True)
+            report["cases"].append({**case, "error": p.exitcode})
+            continue
+
+        report["cases"].append(result)
+        switch = result["gradient_switch_ms"]
+        print(
+            f"{case['mode']} / {case['inttime']} ms / {case['repetitions']} / {case['num_gradiants']}:"
+            + f" {result['rate_hz']:.1f} Hz, {result['period_ms']['mean']:.3f} ms,"
+            + f" {result['jitter_ms']:.3f} ms, {result['overhead_ms']:.3f} ms,"
+            + (f" {switch['mean']:.1f} ms," if switch else " -,")
+            + f" {result['peak_rss_mb']:.0f} MB",
+            flush=True,
+        )
+
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"saved {output}")
+
+
+def import_costs(module="Lasermessung"):
+    """Importiert module in einem neuen Interpreter mit -X importtime.
+
+    Gibt die kumulierte Importzeit (in ms) von module und seiner direkten Imports zurück,
+    sortiert nach der Dauer.
+    """
+
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    ).stderr
+
+    costs = []
+    for line in stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # die Einrückung gibt die Tiefe an: module selbst hat eine, seine direkten Imports drei Leerzeichen
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth <= 1:
+            costs.append((name.strip(), int(cumulative) / 1000))
+    return sorted(costs, key=lambda cost: cost[1], reverse=True)
+
+
+def startup(num=10):
+    """Misst, wie lange es vom Start des Interpreters bis zum ersten Spektrum dauert und welche Imports wie viel davon ausmachen."""
+
+    print(f"import Lasermessung (top {num}):")
+    for name, milliseconds in import_costs()[:num]:
+        print(f"  {name}: {milliseconds:.1f} ms")
+
+    # eine einzige Wiederholung mit den virtuellen Geräten, ohne GUI und ohne Plots
+    code = (
+        "import time\n"
+        + "from Lasermessung import Lasermessung\n"
+        + "imported = time.time()\n"
+        + "from benchmark_acquisition import make_settings\n"
+        + "measurement = Lasermessung('', '', '', make_settings(True, 5, 1, 1))\n"
+        + "measurement.measure(gui=False)\n"
+        + "print(f'startup: {imported} {measurement.messdata.timestamps[0][0]}')\n"
+    )
+    start = time.time()
+    stdout = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    ).stdout
+    lines = [line for line in stdout.splitlines() if line.startswith("startup: ")]
+    if not lines:
+        print("could not measure the time to the first spectrum")
+        return
+    imported, first_spectrum = (float(t) for t in lines[-1].split()[1:])
+    print(
+        f"interpreter start to imported Lasermessung: {(imported - start) * 1000:.0f} ms"
+    )
+    print(
+        f"interpreter start to first spectrum: {(first_spectrum - start) * 1000:.0f} ms"
+    )
+
+
+def compare(old_path, new_path):
+    """Vergleicht zwei Ergebnisse (z. B. von zwei Commits) Fall für Fall."""
+
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    def key(case):
+        return (
+            case["mode"],
+            case["inttime"],
+            case["repetitions"],
+            case["num_gradiants"],
+        )
+
+    old_cases = {key(case): case for case in old["cases"]}
+    print(f"{old['commit']} -> {new['commit']}")
+    print("case: rate | jitter | overhead (alt -> neu)")
+    for case in new["cases"]:
+        if key(case) not in old_cases or "error" in case:
+            continue
+        before = old_cases[key(case)]
+        if "error" in before:
+            continue
+        line = f"{'/'.join(str(k) for k in key(case))}:"
+        for metric, unit in (
+            ("rate_hz", "Hz"),
+            ("jitter_ms", "ms"),
+            ("overhead_ms", "ms"),
+        ):
+            change = (
+                (case[metric] - before[metric]) / abs(before[metric]) * 100
+                if before[metric]
+                else 0
+            )
+            line += f" {before[metric]:.3f} -> {case[metric]:.3f} {unit} ({change:+.1f} %) |"
+        print(line.rstrip(" |"))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "compare":
+        compare(sys.argv[2], sys.argv[3])
+    elif len(sys.argv) > 1 and sys.argv[1] == "startup":
+        startup()
+    else:
+        run_benchmark(
+            sys.argv[1] if len(sys.argv) > 1 else "benchmark_acquisition.json"
+        )
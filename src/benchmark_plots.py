@@ -0,0 +1,338 @@
+"""Benchmark der Plot-Pipeline (Laserplot.plot_results und generate_plots.make_plots) mit synthetischen Messungen.
+
+python benchmark_plots.py [ergebnis.json]
+python benchmark_plots.py compare alt.json neu.json
+
+Für jede Größe (REPETITIONS x Gradienten, mit und ohne MeasurementSummary) wird eine
+Messung erzeugt (.npz/.json wie von Lasermessung.write_measurement) und jede Art von Plot
+in einem eigenen Prozess geplottet. Die Dauer jedes Schritts (siehe PlotTimings) wird
+über ROUNDS Durchläufe gemittelt, davor läuft ein Durchlauf zum Aufwärmen (Fonts, LaTeX).
+"""
+
+import os
+
+# wie generate_plots ohne GUI-Toolkit plotten (siehe Laserplot.BACKEND)
+os.environ.setdefault("LASERPLOT_BACKEND", "Agg")
+
+from MeasurementSettings import MeasurementSettings
+from MeasurementSummary import MeasurementSummary
+from PlotTimings import PlotTimings
+from PlottingSettings import PlottingSettings
+
+import contextlib
+import datetime
+import json
+import multiprocessing
+import platform
+import queue
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+REPETITIONS = [100, 1000]
+NUM_GRADIANTS = [1, 4]
+SUMMARY = [True, False]
+# single: neutral, colorful und (bei mehreren Gradienten) 3d; multi: drei Zeitabschnitte;
+# interpolate: eine Wellenlänge über die Zeit mit Fits; make_plots: alle Plots einer Messung wie generate_plots
+KINDS = ["single", "multi", "interpolate", "make_plots"]
+ROUNDS = 2
+
+CODE_NAME = "benchmark"
+
+
+def make_settings(repetitions, num_gradiants):
+    return MeasurementSettings(
+        UNIQUE=True,
+        TYPE="Benchmark",
+        FENSTER_KUEVETTE=2,
+        TIMEOUT=1000000,
+        WATCHDOG_GRACE=200,
+        FUELLL_MENGE=3,
+        specto=MeasurementSettings.SpectoSettings(
+            INTTIME=20, SCAN_AVG=1, SMOOTH=0, XTIMING=3
+        ),
+        laser=MeasurementSettings.LaserSettings(
+            REPETITIONS=repetitions,
+            MEASUREMENT_DELAY=3,
+            IRRADITION_TIME=3,
+            ARDUINO_DELAY=3,
+            INTENSITY_NKT=f"np.linspace(0, 100, {num_gradiants})",
+            INTENSITY_405="0",
+            NUM_PULSES_445="1234",
+            PULSE_DELAY_445="1",
+            REPETITIONS_LTB="10",
+            INTENSITY_LTB="50",
+            ND_NKT=0,
+            ND_405=0,
+            ND_445=0,
+            CONTINOUS=True,
+        ),
+    )
+
+
+def generate_measurement(path, repetitions, num_gradiants, summary, seed=0):
+    """Schreibt eine synthetische Messung: zwei Banden, deren Fluoreszenz über die Zeit abklingt, plus Rauschen."""
+
+    rng = np.random.default_rng(seed)
+    wav = np.linspace(285.24, 1149.48, 2048)
+    # ca. 25 ms pro Spektrum
+    seconds = np.arange(repetitions) * 0.025
+    timestamps = np.array(
+        [time.time() + g * seconds[-1] + seconds for g in range(num_gradiants)]
+    )
+
+    bands = 3000 * np.exp(-0.5 * ((wav - 450) / 15) ** 2) + 1500 * np.exp(
+        -0.5 * ((wav - 735) / 20) ** 2
+    )
+    decay = 0.5 + 0.5 * np.exp(-seconds / (seconds[-1] / 3 + 1e-9))
+    spectra = np.empty((num_gradiants, repetitions, len(wav)))
+    for g in range(num_gradiants):
+        spectra[g] = (
+            1000
+            + (g + 1) / num_gradiants * decay[:, None] * bands
+            + rng.normal(0, 20, (repetitions, len(wav)))
+        )
+
+    os.makedirs(path, 0o777, exist_ok=True)
+    file_name = os.path.join(path, CODE_NAME)
+    with open(file_name + ".json", "w", encoding="utf-8") as json_file:
+        make_settings(repetitions, num_gradiants).save_as_json(json_file)
+    np.savez_compressed(file_name, spectra, wav, timestamps)
+    if summary:
+        MeasurementSummary.compute(spectra, [repetitions] * num_gradiants).save(
+            file_name
+        )
+
+
+def plotting_settings(kind, path):
+    if kind == "single":
+        return [[PlottingSettings(path, CODE_NAME, smooth=True)]]
+    if kind == "multi":
+        return [
+            [
+                PlottingSettings(
+                    path,
+                    CODE_NAME,
+                    smooth=True,
+                    interval_start=start / 3,
+                    interval_end=(start + 1) / 3,
+                    line_style=style,
+                    color=color,
+                )
+                for start, style, color in (
+                    (0, "-", "black"),
+                    (1, "--", "red"),
+                    (2, ":", "blue"),
+                )
+            ]
+        ]
+    if kind == "interpolate":
+        return [
+            [
+                PlottingSettings(
+                    path,
+                    CODE_NAME,
+                    smooth=True,
+                    single_wav=735,
+                    scatter=True,
+                    interpolate=True,
+                )
+            ]
+        ]
+    raise ValueError(f"unknown kind {kind}")
+
+
+def run_case(case, directory, results):
+    """Läuft im Kind-Prozess: plottet einen Fall ROUNDS + 1 mal und legt das Ergebnis in die Queue results."""
+
+    from Laserplot import Laserplot
+    from MeasurementReader import measurement_cache
+    import generate_plots
+
+    # plot_results legt plots/ im Arbeitsverzeichnis an
+    os.chdir(directory)
+    path = os.path.join("messungen", "Benchmark", "Kontinuierlich")
+    m_settings = MeasurementSettings.from_json(os.path.join(path, CODE_NAME + ".json"))
+
+    def plot():
+        if case["kind"] == "make_plots":
+            generate_plots.make_plots(path, CODE_NAME)
+            return
+        for p_settings in plotting_settings(case["kind"], path):
+            Laserplot.plot_results(p_settings, m_settings, show_plots=False)
+
+    seconds = []
+    timings = PlotTimings()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for i in range(ROUNDS + 1):
+            # jeder Durchlauf liest die Messung neu (wie ein eigener Prozess in generate_plots)
+            measurement_cache.clear()
+            # der erste Durchlauf wärmt nur auf
+            Laserplot.timings = timings if i > 0 else PlotTimings()
+            start = time.perf_counter()
+            plot()
+            if i > 0:
+                seconds.append(time.perf_counter() - start)
+    Laserplot.timings = None
+
+    results.put(
+        {
+            **case,
+            "seconds": float(np.mean(seconds)),
+            "stages": {
+                name: {
+                    "seconds": timings.seconds[name] / ROUNDS,
+                    "calls": timings.calls[name] // ROUNDS,
+                }
+                for name in timings.seconds
+            },
+            # alles, was keinem Schritt zugeordnet ist (Artists erstellen, Layout, Titel usw.)
+            "other_seconds": float(np.mean(seconds)) - timings.total() / ROUNDS,
+            # auf Linux in KiB
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        }
+    )
+
+
+def print_case(result):
+    print(
+        f"{result['kind']} / {result['repetitions']} / {result['num_gradiants']}"
+        + f" / {'summary' if result['summary'] else 'no summary'}:"
+        + f" {result['seconds']:.3f} s, {result['peak_rss_mb']:.0f} MB",
+        flush=True,
+    )
+    stages = result["stages"]
+    for name in PlotTimings.STAGES + tuple(
+        name for name in stages if name not in PlotTimings.STAGES
+    ):
+        if name in stages:
+            print(
+                f"  {name}: {stages[name]['seconds']:.3f} s ({stages[name]['calls']}x,"
+                + f" {stages[name]['seconds'] / result['seconds'] * 100:.1f} %)"
+            )
+    print(
+        f"  other: {result['other_seconds']:.3f} s"
+        + f" ({result['other_seconds'] / result['seconds'] * 100:.1f} %)",
+        flush=True,
+    )
+
+
+def run_benchmark(output):
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+
+    report = {
+        "commit": commit,
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cases": [],
+    }
+
+    for repetitions in REPETITIONS:
+        for num_gradiants in NUM_GRADIANTS:
+            for summary in SUMMARY:
+                directory = tempfile.mkdtemp(prefix="benchmark_plots_")
+                try:
+                    generate_measurement(
+                        os.path.join(
+                            directory, "messungen", "Benchmark", "Kontinuierlich"
+                        ),
+                        repetitions,
+                        num_gradiants,
+                        summary,
+                    )
+                    for kind in KINDS:
+                        case = {
+                            "kind": kind,
+                            "repetitions": repetitions,
+                            "num_gradiants": num_gradiants,
+                            "summary": summary,
+                        }
+                        results = multiprocessing.Queue()
+                        p = multiprocessing.Process(
+                            target=run_case, args=(case, directory, results)
+                        )
+                        p.start()
+                        while True:
+                            try:
+                                result = results.get(timeout=1)
+                                break
+                            except queue.Empty:
+                                if not p.is_alive():
+                                    result = None
+                                    break
+                        p.join()
+
+                        if result is None:
+                            print(
+                                f"{case}: failed (exit code {p.exitcode})", flush=True
+                            )
+                            report["cases"].append({**case, "error": p.exitcode})
+                            continue
+
+                        report["cases"].append(result)
+                        print_case(result)
+                finally:
+                    shutil.rmtree(directory, ignore_errors=True)
+
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"saved {output}")
+
+
+def compare(old_path, new_path):
+    """Vergleicht zwei Ergebnisse (z. B. von zwei Commits) Fall für Fall und Schritt für Schritt."""
+
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    def key(case):
+        return (
+            case["kind"],
+            case["repetitions"],
+            case["num_gradiants"],
+            case["summary"],
+        )
+
+    old_cases = {key(case): case for case in old["cases"]}
+    print(f"{old['commit']} -> {new['commit']}")
+    print("case / stage: alt -> neu")
+    for case in new["cases"]:
+        if key(case) not in old_cases or "error" in case:
+            continue
+        before = old_cases[key(case)]
+        if "error" in before:
+            continue
+        change = (case["seconds"] - before["seconds"]) / before["seconds"] * 100
+        print(
+            f"{'/'.join(str(k) for k in key(case))}:"
+            + f" {before['seconds']:.3f} -> {case['seconds']:.3f} s ({change:+.1f} %)"
+        )
+        for name in case["stages"]:
+            if name in before["stages"]:
+                print(
+                    f"  {name}: {before['stages'][name]['seconds']:.3f}"
+                    + f" -> {case['stages'][name]['seconds']:.3f} s"
+                )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "compare":
+        compare(sys.argv[2], sys.argv[3])
+    else:
+        run_benchmark(sys.argv[1] if len(sys.argv) > 1 else "benchmark_plots.json")
@@ -1,16 +1,24 @@
+import os, sys, io
+
+# die Plots werden nur gespeichert, kein Worker braucht GTK (siehe Laserplot.BACKEND)
+os.environ.setdefault("LASERPLOT_BACKEND", "Agg")
+
 from Laserplot import Laserplot
 from PlottingSettings import PlottingSettings
 from MeasurementSettings import MeasurementSettings
-import os, sys, io
+from MeasurementSummary import MeasurementSummary
+from PlotManifest import PlotManifest
+from PlotScheduler import PlotScheduler
+from FigureExporter import FigureExporter
 import time
 import shutil
-from concurrent.futures import ProcessPoolExecutor
 import multiprocessing
 import copy
 from pathlib import Path
 
-
-delete_old_pictures = True
+# alle Bilder löschen und neu erstellen. Ansonsten werden nur die Plots erstellt, deren Messung,
+# Settings oder Plot-Code sich seit dem letzten Mal geändert haben (siehe PlotManifest)
+delete_old_pictures = False
 # um schnell bestimmtes zu exkludieren
 plot_general = True
 plot_fluo = True
@@ -19,51 +27,74 @@ dont_plot_interpolate = True
 assert (plot_interpolate_only and dont_plot_interpolate) is False
 plot_time_slices = True
 
+# (Suffix des Dateinamens, DPI) der Bilder, z. B. [("", 600), ("_preview", 150)] für zusätzliche Vorschaubilder
+export_targets = [("", 600)]
+# zusätzlich als Vektorgrafik speichern, z. B. ["pdf"] oder ["svg"]
+vector_formats = []
+
 # nur bestimmtes plotten. Leer ist disable (alles plotten). Enthält Keyword, welches in dem Namen sein muss.
 plot_list = ["Gradiant", "Tageslicht", "Neutral"]
 blacklist = True  # black- oder whitelist
 
 
 def sync_messungen_pics():
+    """Spiegelt messungen/ ohne die Messdaten nach messungen_pics/, kopiert aber nur geänderte Dateien."""
 
     # #!/bin/bash
-    # rm -r messungen_pics/
     # # damit die Bilder die gleiche Struktur behalten
-    # rsync -av --exclude='*.npz' --exclude='*.json' messungen/ messungen_pics/
-    messungen_pics_path = Path("messungen_pics")
-    if messungen_pics_path.exists():
-        shutil.rmtree(messungen_pics_path)
-
+    # rsync -av --delete --exclude='*.npz' --exclude='*.json' messungen/ messungen_pics/
     source = Path("messungen")
     destination = Path("messungen_pics")
 
+    synced = set()
     for root, dirs, files in os.walk(source):
         rel_path = Path(root).relative_to(source)
         dest_dir = destination / rel_path
         dest_dir.mkdir(parents=True, exist_ok=True)
+        synced.add(dest_dir)
 
         for file in files:
-            if file.endswith(".npz") or file.endswith(".json"):
+            # .npy sind die unkomprimierten Messdaten (siehe MeasurementReader)
+            if file.endswith((".npz", ".json", ".npy")):
                 continue
 
             src_file = Path(root) / file
             dest_file = dest_dir / file
+            synced.add(dest_file)
+            # copy2 übernimmt die mtime, wie bei rsync reichen Größe und mtime zum Vergleich
+            src_stat = src_file.stat()
+            if dest_file.is_file():
+                dest_stat = dest_file.stat()
+                if (
+                    dest_stat.st_size == src_stat.st_size
+                    and dest_stat.st_mtime_ns == src_stat.st_mtime_ns
+                ):
+                    continue
             shutil.copy2(src_file, dest_file)
 
+    # was es in messungen/ nicht mehr gibt, löschen (von unten nach oben, damit die Ordner leer sind)
+    for root, dirs, files in os.walk(destination, topdown=False):
+        for file in files:
+            if Path(root) / file not in synced:
+                os.remove(Path(root) / file)
+        if Path(root) not in synced:
+            shutil.rmtree(root, ignore_errors=True)
 
-def make_plots(path, name):
 
-    # damit nicht alles durcheinander ist (wegen multiprocessing)
-    original_stdout = sys.stdout
-    sys.stdout = io.StringIO()
+def remove_broken_symlinks(root):
+    """Entfernt die Symlinks in plots/, deren Bild gelöscht wurde."""
 
-    # grüner Text (\033[ ist Escape sequence start, 32m Green color code, 4m underline, 0m color reset)
-    print(f"{path}:")
-    print("\033[32m\033[4m" + name + "\033[0m")
+    for dir_path, dirs, files in os.walk(root):
+        for file in files:
+            link = os.path.join(dir_path, file)
+            if os.path.islink(link) and not os.path.exists(link):
+                os.remove(link)
 
-    p_settings = []
 
-    m_settings = MeasurementSettings.from_json(os.path.join(path, name + ".json"))
+def plotting_settings(path, name):
+    """Alle Plots einer Messung, jeder Eintrag ist ein Aufruf von Laserplot.plot_results."""
+
+    p_settings = []
 
     # Generellen Durchschnitt plotten
     if plot_general:
@@ -152,13 +183,36 @@ def make_plots(path, name):
             ]
         )
 
-    for p in p_settings:
-        Laserplot.plot_results(p, m_settings, show_plots=False)
+    return p_settings
+
 
-    sys.stdout.flush()
-    output = sys.stdout.getvalue()
-    sys.stdout = original_stdout
-    print(output)
+def make_plots(path, name, p_settings=None):
+    """Erstellt die Plots p_settings (default: alle) einer Messung und gibt die gespeicherten Bilder pro Plot zurück."""
+
+    if p_settings is None:
+        p_settings = plotting_settings(path, name)
+
+    # damit nicht alles durcheinander ist (wegen multiprocessing)
+    original_stdout = sys.stdout
+    sys.stdout = io.StringIO()
+
+    # grüner Text (\033[ ist Escape sequence start, 32m Green color code, 4m underline, 0m color reset)
+    print(f"{path}:")
+    print("\033[32m\033[4m" + name + "\033[0m")
+
+    m_settings = MeasurementSettings.from_json(os.path.join(path, name + ".json"))
+
+    outputs = []
+    try:
+        for p in p_settings:
+            outputs.append(Laserplot.plot_results(p, m_settings, show_plots=False))
+    finally:
+        sys.stdout.flush()
+        output = sys.stdout.getvalue()
+        sys.stdout = original_stdout
+        print(output)
+
+    return outputs
 
 
 if __name__ == "__main__":
@@ -183,13 +237,18 @@ if __name__ == "__main__":
 
     # exit()
 
-    # die ganzen Symblinks löschen
+    # die ganzen Symblinks löschen (und das Manifest, es wird also alles neu erstellt)
     if delete_old_pictures:
         try:
             shutil.rmtree("plots/")
         except FileNotFoundError:
             print("plots dir was already deleted")
 
+    # die Worker erstellen ihren Exporter selbst (PlotScheduler.init_worker), hier nur für das Manifest
+    manifest = PlotManifest.load(
+        PlotManifest.PATH, repr(FigureExporter(export_targets, vector_formats))
+    )
+
     paths = []
     root = "messungen/"
     for dir in os.listdir(root):
@@ -203,7 +262,11 @@ if __name__ == "__main__":
         names = [
             os.path.splitext(f)[0]
             for f in os.listdir(path)
-            if (f.endswith((".npz")) and "overwrite-messung" not in f)
+            if (
+                f.endswith((".npz"))
+                and not f.endswith(MeasurementSummary.SUFFIX)
+                and "overwrite-messung" not in f
+            )
         ]
 
         if delete_old_pictures:
@@ -222,31 +285,53 @@ if __name__ == "__main__":
             continue
 
         for name in names:
-            tasks.append((path, name))
+            # nur die Plots, deren Bilder nicht mehr aktuell sind
+            p_settings = [
+                p for p in plotting_settings(path, name) if not manifest.is_current(p)
+            ]
+            if p_settings:
+                tasks.append((path, name, p_settings))
+
+    print(f"{len(tasks)} measurements with outdated plots")
 
     # for task in tasks:
     #     make_plots(*task)
 
     # exit()
 
-    # lambda geht nicht...
-    def worker(args):
-        return make_plots(*args)
+    scheduler = PlotScheduler(
+        export_targets=export_targets, vector_formats=vector_formats
+    )
+    for task in tasks:
+        scheduler.add(*task)
 
     start_time = time.time()
 
     try:
-        with ProcessPoolExecutor(max_workers=int(os.cpu_count() / 1.5)) as executor:
-            executor.map(worker, tasks)
+        for (path, name, p_settings), (saved, output, seconds) in scheduler.run():
+            print(output)
+            manifest.record(p_settings, saved)
     except KeyboardInterrupt:
         multiprocessing.active_children()
         for p in multiprocessing.active_children():
             p.terminate()
         exit()
+    finally:
+        # die bis hierhin erstellten Plots müssen beim nächsten Mal nicht neu erstellt werden
+        manifest.save()
 
+    scheduler.report()
     print(f"took: {time.time() - start_time:.2f} s")
 
+    manifest.remove_unseen()
+    manifest.save()
+    remove_broken_symlinks("plots/")
+
     sync_messungen_pics()
+
+    # die fehlgeschlagenen Plots sind nicht im Manifest, werden beim nächsten Mal also erneut versucht
+    if scheduler.failures:
+        exit(1)
     # 12: took: 44.83 s
     # 8: took: 49.54 s
     # 4: took: 83.07 s
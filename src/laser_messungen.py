@@ -61,17 +61,19 @@ if __name__ == "__main__":
             CONTINOUS=True,
         ),
     )
-    # TODO: alle paar Sekunden Messergebnisse zwischenspeichern (Daten von einem separaten Process kopieren und speichern)
 
     measurement_settings.print_status()
     # exit()
     measurement = Lasermessung(ARDUINO_PATH, NKT_PATH, LTB_PATH, measurement_settings)
 
-    # measurement.infinite_measuring()
-    # exit()
-
-    measurement.measure()
     DIR_PATH = os.path.join(
         os.path.dirname(os.path.abspath(__file__)), "..", "messungen/"
     )
+
+    # measurement.infinite_measuring(DIR_PATH=DIR_PATH)  # Snapshots mit "s" + Enter
+    # exit()
+
+    # schon während der Messung speichern, damit bei einem Absturz nicht alles verloren ist
+    measurement.start_recording(DIR_PATH)
+    measurement.measure()
     measurement.save(DIR_PATH)